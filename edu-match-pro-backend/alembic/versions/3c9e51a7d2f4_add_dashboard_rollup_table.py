@@ -0,0 +1,87 @@
+"""add dashboard rollup table
+
+Revision ID: 3c9e51a7d2f4
+Revises: 8f3a1d6c2b07
+Create Date: 2026-10-18 14:02:17.530981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e51a7d2f4'
+down_revision: Union[str, None] = '8f3a1d6c2b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('dashboard_rollup',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('total_needs', sa.Integer(), nullable=False),
+        sa.Column('active_needs', sa.Integer(), nullable=False),
+        sa.Column('completed_needs', sa.Integer(), nullable=False),
+        sa.Column('students_benefited', sa.Integer(), nullable=False),
+        sa.Column('completed_projects', sa.Integer(), nullable=False),
+        sa.Column('students_helped', sa.Integer(), nullable=False),
+        sa.Column('sdg_contributions', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # 以現有需求與捐贈資料回填彙總
+    op.execute("""
+        INSERT INTO dashboard_rollup (
+            user_id, total_needs, active_needs, completed_needs, students_benefited,
+            completed_projects, students_helped, sdg_contributions, updated_at
+        )
+        SELECT
+            school_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE status = 'active'),
+            COUNT(*) FILTER (WHERE status = 'completed'),
+            COALESCE(SUM(student_count) FILTER (WHERE status = 'completed'), 0),
+            0, 0, '{}'::jsonb, now() AT TIME ZONE 'utc'
+        FROM need
+        GROUP BY school_id
+    """)
+    op.execute("""
+        INSERT INTO dashboard_rollup (
+            user_id, total_needs, active_needs, completed_needs, students_benefited,
+            completed_projects, students_helped, sdg_contributions, updated_at
+        )
+        SELECT
+            totals.company_id, 0, 0, 0, 0,
+            totals.completed_projects, totals.students_helped,
+            COALESCE(sdgs.contributions, '{}'::jsonb), now() AT TIME ZONE 'utc'
+        FROM (
+            SELECT
+                d.company_id,
+                COUNT(*) FILTER (WHERE d.status = 'completed') AS completed_projects,
+                COALESCE(SUM(n.student_count) FILTER (WHERE d.status = 'completed'), 0) AS students_helped
+            FROM donation d
+            JOIN need n ON n.id = d.need_id
+            GROUP BY d.company_id
+        ) AS totals
+        LEFT JOIN (
+            SELECT company_id, jsonb_object_agg(sdg::text, contribution) AS contributions
+            FROM (
+                SELECT d.company_id, s.sdg, COUNT(*) AS contribution
+                FROM donation d
+                JOIN need n ON n.id = d.need_id
+                CROSS JOIN LATERAL unnest(n.sdgs) AS s(sdg)
+                GROUP BY d.company_id, s.sdg
+            ) AS per_sdg
+            GROUP BY company_id
+        ) AS sdgs ON sdgs.company_id = totals.company_id
+        ON CONFLICT (user_id) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('dashboard_rollup')
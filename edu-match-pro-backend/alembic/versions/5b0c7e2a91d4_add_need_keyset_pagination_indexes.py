@@ -0,0 +1,45 @@
+"""add need keyset pagination indexes
+
+Revision ID: 5b0c7e2a91d4
+Revises: e68d7d298e9f
+Create Date: 2026-10-18 10:03:17.552891
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0c7e2a91d4'
+down_revision: Union[str, None] = 'e68d7d298e9f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 列表排序與 keyset 分頁：ORDER BY created_at DESC, id DESC（btree 可反向掃描）
+    op.create_index('ix_need_created_at_id', 'need', ['created_at', 'id'], unique=False)
+    op.create_index('ix_need_status_created_at_id', 'need', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_need_category_created_at_id', 'need', ['category', 'created_at', 'id'], unique=False)
+    op.create_index('ix_need_urgency_created_at_id', 'need', ['urgency', 'created_at', 'id'], unique=False)
+    op.create_index('ix_need_school_id_created_at_id', 'need', ['school_id', 'created_at', 'id'], unique=False)
+
+    # location 前綴比對（LIKE '花蓮縣%'）
+    op.create_index(
+        'ix_need_location_pattern', 'need', ['location'], unique=False,
+        postgresql_ops={'location': 'text_pattern_ops'}
+    )
+    # SDG 成員查詢（sdgs && ARRAY[...]）
+    op.create_index('ix_need_sdgs', 'need', ['sdgs'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_need_sdgs', table_name='need')
+    op.drop_index('ix_need_location_pattern', table_name='need')
+    op.drop_index('ix_need_school_id_created_at_id', table_name='need')
+    op.drop_index('ix_need_urgency_created_at_id', table_name='need')
+    op.drop_index('ix_need_category_created_at_id', table_name='need')
+    op.drop_index('ix_need_status_created_at_id', table_name='need')
+    op.drop_index('ix_need_created_at_id', table_name='need')
@@ -0,0 +1,31 @@
+"""add search sync indexes
+
+Revision ID: 8f3a1d6c2b07
+Revises: 5b0c7e2a91d4
+Create Date: 2026-10-18 11:26:05.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a1d6c2b07'
+down_revision: Union[str, None] = '5b0c7e2a91d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 全文檢索索引依 created_at / updated_at 增量同步
+    op.create_index('ix_need_updated_at', 'need', ['updated_at'], unique=False)
+    op.create_index('ix_impact_story_created_at', 'impact_story', ['created_at'], unique=False)
+    op.create_index('ix_impact_story_updated_at', 'impact_story', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_impact_story_updated_at', table_name='impact_story')
+    op.drop_index('ix_impact_story_created_at', table_name='impact_story')
+    op.drop_index('ix_need_updated_at', table_name='need')
@@ -0,0 +1,60 @@
+"""add foreign key and filter indexes
+
+Revision ID: b7e4f0a3c915
+Revises: 3c9e51a7d2f4
+Create Date: 2026-10-18 14:12:40.318265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4f0a3c915'
+down_revision: Union[str, None] = '3c9e51a7d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 學校儀表板：WHERE school_id = ? 依 status 計數並加總 student_count（index-only scan）
+    op.create_index(
+        'ix_need_school_id_status', 'need', ['school_id', 'status'], unique=False,
+        postgresql_include=['id', 'student_count']
+    )
+
+    # 企業儀表板與「我的捐贈」：WHERE company_id = ? 依 status 篩選、依 created_at 排序
+    op.create_index(
+        'ix_donation_company_id_status', 'donation', ['company_id', 'status'], unique=False,
+        postgresql_include=['need_id']
+    )
+    op.create_index(
+        'ix_donation_company_id_created_at', 'donation', ['company_id', sa.text('created_at DESC')], unique=False
+    )
+    # Need → Donation 關聯與需求異動時調整捐贈企業的彙總
+    op.create_index(
+        'ix_donation_need_id_status', 'donation', ['need_id', 'status'], unique=False,
+        postgresql_include=['company_id']
+    )
+
+    op.create_index('ix_impact_story_donation_id', 'impact_story', ['donation_id'], unique=False)
+    op.create_index('ix_profile_user_id', 'profile', ['user_id'], unique=False)
+
+    # 個人活動紀錄與最新活動列表：ORDER BY created_at DESC
+    op.create_index(
+        'ix_activity_log_user_id_created_at', 'activity_log', ['user_id', sa.text('created_at DESC')], unique=False
+    )
+    op.create_index('ix_activity_log_created_at', 'activity_log', [sa.text('created_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_activity_log_created_at', table_name='activity_log')
+    op.drop_index('ix_activity_log_user_id_created_at', table_name='activity_log')
+    op.drop_index('ix_profile_user_id', table_name='profile')
+    op.drop_index('ix_impact_story_donation_id', table_name='impact_story')
+    op.drop_index('ix_donation_need_id_status', table_name='donation')
+    op.drop_index('ix_donation_company_id_created_at', table_name='donation')
+    op.drop_index('ix_donation_company_id_status', table_name='donation')
+    op.drop_index('ix_need_school_id_status', table_name='need')
@@ -0,0 +1,98 @@
+"""partition activity_log by month
+
+Revision ID: c4d2a8e6f017
+Revises: b7e4f0a3c915
+Create Date: 2026-10-18 15:04:52.771903
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2a8e6f017'
+down_revision: Union[str, None] = 'b7e4f0a3c915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 預先建立的未來月份數（之後由應用程式啟動時與 cli.py activity-partitions 維護）
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, created_at, updated_at, user_id, activity_type, description, extra_data"
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    op.execute('ALTER TABLE activity_log RENAME TO activity_log_legacy')
+    op.execute('ALTER INDEX activity_log_pkey RENAME TO activity_log_legacy_pkey')
+    op.drop_index('ix_activity_log_user_id_created_at', table_name='activity_log_legacy')
+    op.drop_index('ix_activity_log_created_at', table_name='activity_log_legacy')
+
+    # 分區表的主鍵必須包含分區鍵
+    op.execute("""
+        CREATE TABLE activity_log (
+            id UUID NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            user_id UUID NOT NULL,
+            activity_type activitytype NOT NULL,
+            description VARCHAR NOT NULL,
+            extra_data VARCHAR,
+            CONSTRAINT activity_log_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.create_index(
+        'ix_activity_log_user_id_created_at', 'activity_log', ['user_id', sa.text('created_at DESC')], unique=False
+    )
+    op.create_index('ix_activity_log_created_at', 'activity_log', [sa.text('created_at DESC')], unique=False)
+    # 預設分區只承接尚未建立月份分區的資料，建立月份分區時會搬移過去
+    op.execute('CREATE TABLE activity_log_default PARTITION OF activity_log DEFAULT')
+
+    oldest = conn.execute(sa.text('SELECT min(created_at) FROM activity_log_legacy')).scalar()
+    today = date.today()
+    month = date((oldest or today).year, (oldest or today).month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE activity_log_y{month.year:04d}m{month.month:02d} PARTITION OF activity_log "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+    op.execute(f'INSERT INTO activity_log ({COLUMNS}) SELECT {COLUMNS} FROM activity_log_legacy')
+    op.drop_table('activity_log_legacy')
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE activity_log RENAME TO activity_log_partitioned')
+    op.execute('ALTER INDEX activity_log_pkey RENAME TO activity_log_partitioned_pkey')
+    op.drop_index('ix_activity_log_user_id_created_at', table_name='activity_log_partitioned')
+    op.drop_index('ix_activity_log_created_at', table_name='activity_log_partitioned')
+    op.execute("""
+        CREATE TABLE activity_log (
+            id UUID NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE,
+            user_id UUID NOT NULL,
+            activity_type activitytype NOT NULL,
+            description VARCHAR NOT NULL,
+            extra_data VARCHAR,
+            CONSTRAINT activity_log_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f'INSERT INTO activity_log ({COLUMNS}) SELECT {COLUMNS} FROM activity_log_partitioned')
+    # 刪除分區表時會一併刪除所有分區
+    op.execute('DROP TABLE activity_log_partitioned')
+    op.create_index(
+        'ix_activity_log_user_id_created_at', 'activity_log', ['user_id', sa.text('created_at DESC')], unique=False
+    )
+    op.create_index('ix_activity_log_created_at', 'activity_log', [sa.text('created_at DESC')], unique=False)
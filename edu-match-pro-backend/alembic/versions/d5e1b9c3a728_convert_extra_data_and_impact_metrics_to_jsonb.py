@@ -0,0 +1,66 @@
+"""convert extra_data and impact_metrics to jsonb
+
+Revision ID: d5e1b9c3a728
+Revises: c4d2a8e6f017
+Create Date: 2026-10-18 17:26:31.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e1b9c3a728'
+down_revision: Union[str, None] = 'c4d2a8e6f017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 舊資料是手動組成的 JSON 字串；無法解析或不是物件的值保留在 {"legacy": ...} 中，不讓遷移失敗
+TO_JSONB_OBJECT = """
+    CREATE FUNCTION pg_temp.to_jsonb_object(value text) RETURNS jsonb AS $$
+    BEGIN
+        IF value IS NULL OR btrim(value) = '' THEN
+            RETURN NULL;
+        END IF;
+        BEGIN
+            IF jsonb_typeof(value::jsonb) = 'object' THEN
+                RETURN value::jsonb;
+            END IF;
+            RETURN jsonb_build_object('legacy', value::jsonb);
+        EXCEPTION WHEN invalid_text_representation THEN
+            RETURN jsonb_build_object('legacy', value);
+        END;
+    END
+    $$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+
+def upgrade() -> None:
+    op.execute(TO_JSONB_OBJECT)
+    # 分區表的欄位型別變更會套用到所有分區
+    op.execute(
+        'ALTER TABLE activity_log ALTER COLUMN extra_data TYPE JSONB USING pg_temp.to_jsonb_object(extra_data)'
+    )
+    op.execute(
+        'ALTER TABLE impact_story ALTER COLUMN impact_metrics TYPE JSONB '
+        'USING pg_temp.to_jsonb_object(impact_metrics)'
+    )
+    op.create_index(
+        'ix_activity_log_extra_data', 'activity_log', ['extra_data'], unique=False,
+        postgresql_using='gin', postgresql_ops={'extra_data': 'jsonb_path_ops'}
+    )
+    op.create_index(
+        'ix_impact_story_impact_metrics', 'impact_story', ['impact_metrics'], unique=False,
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_impact_story_impact_metrics', table_name='impact_story')
+    op.drop_index('ix_activity_log_extra_data', table_name='activity_log')
+    op.alter_column(
+        'impact_story', 'impact_metrics', type_=sa.String(), postgresql_using='impact_metrics::text'
+    )
+    op.alter_column('activity_log', 'extra_data', type_=sa.String(), postgresql_using='extra_data::text')
@@ -0,0 +1,27 @@
+"""add estimated_cost to need
+
+Revision ID: e68d7d298e9f
+Revises: d0b5c13235bd
+Create Date: 2026-10-18 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e68d7d298e9f'
+down_revision: Union[str, None] = 'd0b5c13235bd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 需求的預估金額（新台幣），供預算配置最佳化使用
+    op.add_column('need', sa.Column('estimated_cost', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('need', 'estimated_cost')
@@ -1,19 +1,73 @@
-from fastapi import Depends, HTTPException, status
+import uuid
+from typing import AsyncGenerator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
 from app.models.user import User
-from app.crud.user_crud import get_user_by_email
+from app.crud.user_crud import get_user_by_email, get_user_by_id
+from app.crud.profile_crud import get_profiles_by_user_ids
+from app.core.dataloader import DataLoader
+from app.core.cache import principal_cache
+from app.core.config import settings
 from app.core.security import decode_access_token
+from app.schemas.token_schemas import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+# /batch 把已驗證的使用者放在子請求的 scope state，子請求不再重複驗證 token
+BATCH_PRINCIPAL = "batch_principal"
 
 
 async def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_session)
 ) -> User:
     """獲取當前登入的使用者"""
+    principal = getattr(request.state, BATCH_PRINCIPAL, None)
+    if principal is not None:
+        return principal
+    return await authenticate_token(session, token)
+
+
+async def get_optional_user(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    session: AsyncSession = Depends(get_session)
+) -> Optional[User]:
+    """有帶 token 時驗證並回傳使用者，未帶 token 時回傳 None（公開端點使用）"""
+    if token is None:
+        return None
+    principal = getattr(request.state, BATCH_PRINCIPAL, None)
+    if principal is not None:
+        return principal
+    return await authenticate_token(session, token)
+
+
+async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    """只允許 ADMIN_EMAILS 內的使用者（管理端點使用）"""
+    if current_user.email not in settings.admin_emails:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+
+async def get_profile_loader(session: AsyncSession = Depends(get_session)) -> AsyncGenerator[DataLoader, None]:
+    """請求範圍的個人檔案載入器：同一請求共用，組裝回應時需要的 user_id 合併成一次查詢"""
+    loader = DataLoader(lambda user_ids: get_profiles_by_user_ids(session, user_ids))
+    try:
+        yield loader
+    finally:
+        # 請求被取消時，在 session 關閉前停止仍在執行的批次
+        await loader.close()
+
+
+async def authenticate_token(session: AsyncSession, token: str) -> User:
+    """驗證存取 token 並回傳對應的使用者"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -22,16 +76,32 @@ async def get_current_user(
     
     try:
         # 解碼 token
-        payload = decode_access_token(token)
-        email: str = payload.get("sub")
-        if email is None:
+        token_data = TokenData(**decode_access_token(token))
+        if token_data.sub is None:
             raise credentials_exception
     except Exception:
         raise credentials_exception
     
-    # 從資料庫獲取使用者
-    user = await get_user_by_email(session, email)
+    # 先查快取，命中時不需存取資料庫
+    user = principal_cache.get(token_data.sub)
+    if user is not None and (token_data.uid is None or str(user.id) == token_data.uid):
+        return user
+    
+    # 從資料庫獲取使用者；新版 token 帶有 uid，可直接以主鍵查詢
+    if token_data.uid is not None:
+        try:
+            user_id = uuid.UUID(token_data.uid)
+        except ValueError:
+            raise credentials_exception
+        user = await get_user_by_id(session, user_id)
+        if user is not None and user.email != token_data.sub:
+            user = None
+    else:
+        user = await get_user_by_email(session, token_data.sub)
     if user is None:
         raise credentials_exception
     
+    # 與 session 脫離後再放入快取，避免之後的 commit 影響快取物件
+    session.expunge(user)
+    principal_cache.set(token_data.sub, user)
     return user
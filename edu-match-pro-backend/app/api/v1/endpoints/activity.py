@@ -1,11 +1,17 @@
+import uuid
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
 from app.api.v1.dependencies import get_current_user
 from app.models.user import User
-from app.schemas.activity_log_schemas import ActivityLogPublic
-from app.crud.activity_log_crud import get_activity_logs_by_user, get_recent_activity_logs
+from app.core.serialization import ORJSONResponse
+from app.schemas.activity_log_schemas import ACTIVITY_LOG_PUBLIC, ActivityLogPublic
+from app.crud.activity_log_crud import (
+    get_activity_logs_by_donation, get_activity_logs_by_user, get_recent_activity_logs
+)
+from app.crud.donation_crud import get_donation_by_id
+from app.services.recent_activity import recent_activity_feed
 
 router = APIRouter(prefix="/activity", tags=["Activity"])
 
@@ -19,17 +25,7 @@ async def get_my_activity_logs(
     """取得我的活動記錄"""
     logs = await get_activity_logs_by_user(session, current_user.id, limit)
     
-    return [
-        ActivityLogPublic(
-            id=log.id,
-            user_id=log.user_id,
-            activity_type=log.activity_type,
-            description=log.description,
-            extra_data=log.extra_data,
-            created_at=log.created_at
-        )
-        for log in logs
-    ]
+    return ORJSONResponse(ACTIVITY_LOG_PUBLIC.many(logs))
 
 
 @router.get("/recent", response_model=List[ActivityLogPublic])
@@ -37,17 +33,35 @@ async def get_recent_activities(
     session: AsyncSession = Depends(get_session),
     limit: int = 50
 ):
-    """取得最近的活動記錄（公開）"""
+    """取得最近的活動記錄（公開）；快取範圍內直接回傳預先序列化的 JSON"""
+    if limit <= recent_activity_feed.capacity:
+        if not recent_activity_feed.primed:
+            await recent_activity_feed.prime(session)
+        return Response(content=recent_activity_feed.render(limit), media_type="application/json")
     logs = await get_recent_activity_logs(session, limit)
     
-    return [
-        ActivityLogPublic(
-            id=log.id,
-            user_id=log.user_id,
-            activity_type=log.activity_type,
-            description=log.description,
-            extra_data=log.extra_data,
-            created_at=log.created_at
+    return ORJSONResponse(ACTIVITY_LOG_PUBLIC.many(logs))
+
+
+@router.get("/donation/{donation_id}", response_model=List[ActivityLogPublic])
+async def get_donation_activities(
+    donation_id: uuid.UUID,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    limit: int = 50
+):
+    """取得特定捐贈的活動記錄（限捐贈企業與需求學校）"""
+    donation = await get_donation_by_id(session, donation_id)
+    if not donation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Donation not found"
         )
-        for log in logs
-    ]
+    if current_user.id not in (donation.company_id, donation.need.school_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to view this donation"
+        )
+    logs = await get_activity_logs_by_donation(session, donation_id, limit)
+    
+    return ORJSONResponse(ACTIVITY_LOG_PUBLIC.many(logs))
@@ -0,0 +1,95 @@
+import time
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_session
+from app.api.v1.dependencies import get_current_user
+from app.models.user import User
+from app.schemas.allocation_schemas import AllocationRequest, AllocationResult, AllocatedNeed
+from app.crud.need_crud import get_allocation_candidates
+from app.services.allocation_optimizer import optimize_allocation, remoteness_multiplier
+from app.services.remoteness import load_remoteness_index
+
+router = APIRouter(prefix="/allocations", tags=["Allocations"])
+
+
+@router.post("/optimize", response_model=AllocationResult)
+async def optimize_budget_allocation(
+    request_in: AllocationRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """在預算與類別配比下，選出受益學生數（依偏遠程度加權）最高的需求組合"""
+    # 檢查使用者角色是否為企業
+    if current_user.role != "company":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only companies can optimize budget allocation"
+        )
+    
+    # 驗證預算與類別配比
+    if request_in.budget <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Budget must be positive"
+        )
+    category_mix = request_in.category_mix or None
+    if category_mix is not None and (
+        any(share <= 0 for share in category_mix.values()) or sum(category_mix.values()) > 1.0 + 1e-9
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Category shares must be positive and sum to at most 1"
+        )
+    
+    # 載入候選需求與地區屬性
+    rows = await get_allocation_candidates(
+        session, list(category_mix.keys()) if category_mix else None
+    )
+    remoteness_index = await load_remoteness_index(session)
+    remoteness = [remoteness_index.classify(row.location) for row in rows]
+    costs = np.array([row.estimated_cost for row in rows], dtype=np.int64)
+    values = np.array(
+        [row.student_count * remoteness_multiplier(attribute) for row, attribute in zip(rows, remoteness)],
+        dtype=np.int64
+    )
+    
+    # 求解
+    started = time.perf_counter()
+    try:
+        selected, exact = optimize_allocation(
+            [row.category for row in rows], costs, values,
+            request_in.budget, category_mix, request_in.mode.value
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{e}; use approximate mode instead"
+        )
+    solve_ms = (time.perf_counter() - started) * 1000
+    
+    needs = [
+        AllocatedNeed(
+            need_id=rows[i].id,
+            title=rows[i].title,
+            category=rows[i].category,
+            location=rows[i].location,
+            student_count=rows[i].student_count,
+            estimated_cost=rows[i].estimated_cost,
+            remoteness=remoteness[i],
+            weighted_students=int(values[i])
+        )
+        for i in selected
+    ]
+    total_cost = int(costs[selected].sum()) if len(selected) else 0
+    
+    return AllocationResult(
+        needs=needs,
+        total_cost=total_cost,
+        total_students=sum(need.student_count for need in needs),
+        weighted_students=int(values[selected].sum()) if len(selected) else 0,
+        remaining_budget=request_in.budget - total_cost,
+        candidate_count=len(rows),
+        exact=exact,
+        solve_ms=round(solve_ms, 3)
+    )
@@ -4,14 +4,26 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
 from app.schemas.user_schemas import UserCreate, UserPublic
 from app.schemas.token_schemas import Token
-from app.crud.user_crud import get_user_by_email, create_user
-from app.core.security import verify_password, create_access_token
+from app.crud.user_crud import get_user_by_email, create_user, update_user_password_hash
+from app.core.security import (
+    PasswordHashingBusy, create_access_token, hash_password_async,
+    password_needs_rehash, verify_password_async
+)
 from app.api.v1.dependencies import get_current_user
-from app.models.user import User
+from app.models.user import User, UserRole
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+def _hashing_busy_exception() -> HTTPException:
+    """密碼雜湊佇列已滿時回應 429，請客戶端稍後重試"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many authentication requests, please retry later",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=UserPublic, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_in: UserCreate,
@@ -27,7 +39,10 @@ async def register_user(
         )
     
     # 建立新使用者
-    new_user = await create_user(session, user_in)
+    try:
+        new_user = await create_user(session, user_in)
+    except PasswordHashingBusy:
+        raise _hashing_busy_exception()
     
     # 回傳公開的使用者資訊 (不包含密碼)
     return UserPublic(
@@ -54,15 +69,30 @@ async def login_for_access_token(
         )
     
     # 驗證密碼
-    if not verify_password(form_data.password, user.password):
+    try:
+        password_ok = await verify_password_async(form_data.password, user.password)
+    except PasswordHashingBusy:
+        raise _hashing_busy_exception()
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # 建立 JWT token
-    access_token = create_access_token(data={"sub": user.email})
+    # cost 設定變更後，於登入時以新的 cost 重新雜湊（佇列忙碌時下次再處理）
+    if password_needs_rehash(user.password):
+        try:
+            new_hash = await hash_password_async(form_data.password)
+        except PasswordHashingBusy:
+            new_hash = None
+        if new_hash is not None:
+            await update_user_password_hash(session, user, new_hash)
+    
+    # 建立 JWT token；sub 維持 email 以相容舊 token，另帶 uid 與 role
+    access_token = create_access_token(
+        data={"sub": user.email, "uid": str(user.id), "role": UserRole(user.role).value}
+    )
     
     return Token(access_token=access_token, token_type="bearer")
 
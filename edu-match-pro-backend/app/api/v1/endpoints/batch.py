@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import get_session
+from app.api.v1.dependencies import BATCH_PRINCIPAL, get_optional_user
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.batch_schemas import BatchRequest, BatchResponse, BatchSubRequest
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+API_PREFIX = "/api/v1/"
+# 串流端點不會結束，批次本身會造成遞迴，都不能放進批次
+EXCLUDED_PREFIXES = ("/api/v1/batch", "/api/v1/realtime", "/api/v1/exports")
+# 轉給子請求的標頭
+FORWARDED_HEADERS = {b"authorization", b"accept-language", b"user-agent"}
+# 不放進子回應結果的標頭
+DROPPED_HEADERS = {"content-length"}
+# 每個事件迴圈一個共用的子請求並行上限
+_SLOTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _sub_request_slots() -> asyncio.Semaphore:
+    """整個 worker 共用的子請求並行上限：每個子請求各佔一條連線，同時進行的批次不會耗盡連線池"""
+    loop = asyncio.get_running_loop()
+    slots = _SLOTS.get(loop)
+    if slots is None:
+        slots = _SLOTS[loop] = asyncio.Semaphore(settings.batch_max_concurrency)
+    return slots
+
+
+def _validate(sub_requests: List[BatchSubRequest]) -> None:
+    """檢查子請求數量、路徑與 id，不合法時回傳 400"""
+    if not sub_requests or len(sub_requests) > settings.batch_max_requests:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"requests 必須包含 1 到 {settings.batch_max_requests} 個子請求"
+        )
+    if len({sub.id for sub in sub_requests}) != len(sub_requests):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="子請求的 id 不可重複")
+    for sub in sub_requests:
+        if not sub.path.startswith(API_PREFIX) or sub.path.startswith(EXCLUDED_PREFIXES):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支援的子請求路徑: {sub.path}"
+            )
+
+
+async def _dispatch(request: Request, sub: BatchSubRequest, user: Optional[User]) -> bytes:
+    """在行程內經由完整的 ASGI 堆疊執行一個 GET 子請求，回傳已編碼的 BatchSubResponse"""
+    path, _, query = sub.path.partition("?")
+    query_string = "&".join(part for part in (query, urlencode(sub.params, doseq=True)) if part)
+    state: Dict[str, Any] = dict(request.scope.get("state") or {})
+    if user is not None:
+        state[BATCH_PRINCIPAL] = user
+    scope = {
+        **{key: request.scope[key] for key in ("asgi", "http_version", "scheme", "client", "server", "root_path") if key in request.scope},
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query_string.encode("latin-1"),
+        "headers": [(name, value) for name, value in request.scope["headers"] if name in FORWARDED_HEADERS],
+        "state": state,
+    }
+    received = False
+    status_code: Optional[int] = None
+    headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # 子請求沒有客戶端可斷線，等到完成或逾時
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            for name, value in message.get("headers", []):
+                name = name.decode("latin-1")
+                if name not in DROPPED_HEADERS:
+                    headers[name] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    async with _sub_request_slots():
+        # 逾時與耗時只計算實際執行的時間，不含等待名額
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(request.app(scope, receive, send), settings.batch_timeout_seconds)
+        except asyncio.TimeoutError:
+            status_code, headers, chunks = status.HTTP_504_GATEWAY_TIMEOUT, {}, []
+        except Exception:
+            # ServerErrorMiddleware 送出 500 後仍會拋出例外
+            logger.exception("Batch sub-request %s failed", sub.path)
+            if status_code is None:
+                status_code, headers, chunks = status.HTTP_500_INTERNAL_SERVER_ERROR, {}, []
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    body = b"".join(chunks)
+    if not body:
+        body = b"null"
+    elif not headers.get("content-type", "").startswith("application/json"):
+        body = orjson.dumps(body.decode("utf-8", "replace"))
+    meta = orjson.dumps({"id": sub.id, "status": status_code, "headers": headers, "duration_ms": duration_ms})
+    # JSON 回應原樣嵌入，不必解碼後再編碼一次
+    return meta[:-1] + b',"body":' + body + b"}"
+
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(
+    batch_in: BatchRequest,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    user: Optional[User] = Depends(get_optional_user)
+):
+    """同時執行多個 GET 子請求並合併回應（一次往返載入整個頁面）
+
+    只驗證一次身分，子請求各自從連線池取得連線並行執行（整個 worker 同時最多 BATCH_MAX_CONCURRENCY 個），
+    結果依請求順序回傳並附上各自耗時。
+    """
+    _validate(batch_in.requests)
+    # 驗證完成後立即歸還連線，子請求各自取得連線
+    await session.close()
+    started = time.perf_counter()
+    parts = await asyncio.gather(*(_dispatch(request, sub, user) for sub in batch_in.requests))
+    duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    content = b'{"responses":[' + b",".join(parts) + b'],"duration_ms":' + orjson.dumps(duration_ms) + b"}"
+    return Response(content=content, media_type="application/json")
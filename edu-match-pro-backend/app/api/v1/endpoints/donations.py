@@ -1,22 +1,59 @@
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
 from app.models.user import User
-from app.schemas.donation_schemas import DonationCreate, DonationPublic
-from app.schemas.profile_schemas import ProfilePublic
-from app.crud.donation_crud import create_donation, get_donations_by_company
-from app.api.v1.dependencies import get_current_user
+from app.core.config import settings
+from app.core.dataloader import DataLoader
+from app.core.serialization import ORJSONResponse, parse_fields, sparse_rows
+from app.schemas.donation_schemas import (
+    DONATION_PUBLIC, AlternativeNeedPublic, DonationBundleConflictDetail, DonationBundleCreate, DonationBundleItem,
+    DonationBundleMode, DonationBundlePublic, DonationConflictDetail, DonationCreate, DonationPublic, DonationSparse
+)
+from app.schemas.need_schemas import NeedPublic
+from app.crud.donation_crud import (
+    DONATION_COLUMNS, create_donation, create_donation_bundle, get_donations_by_company
+)
+from app.crud.need_crud import NEED_COLUMNS, get_alternative_needs, get_need_by_id
+from app.crud.profile_crud import attach_donation_profiles
+from app.api.v1.dependencies import get_current_user, get_profile_loader
 
 router = APIRouter(prefix="/donations", tags=["Donations"])
 
 
-@router.post("/", response_model=DonationPublic, status_code=status.HTTP_201_CREATED)
+def _parse_fields(value: Optional[str], allowed) -> Optional[List[str]]:
+    """解析 fields / include 參數，有未知欄位時回傳 400"""
+    try:
+        return parse_fields(value, allowed)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _parse_include(include: Optional[str]) -> Optional[List[str]]:
+    """include=need 嵌入完整的需求；include=need.title,need.location 只嵌入指定的需求欄位"""
+    items = _parse_fields(include, ["need", *(f"need.{name}" for name in NEED_COLUMNS)])
+    if items is None:
+        return None
+    if "need" in items:
+        return [name for name in NeedPublic.model_fields if name in NEED_COLUMNS]
+    return [item.partition(".")[2] for item in items]
+
+
+@router.post(
+    "/",
+    response_model=DonationPublic,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_409_CONFLICT: {"description": "需求已被認捐，detail 為 DonationConflictDetail"}}
+)
 async def create_new_donation(
     donation_in: DonationCreate,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    profiles: DataLoader = Depends(get_profile_loader)
 ):
     """發起捐贈 (認捐)"""
     # 檢查使用者角色是否為企業
@@ -31,28 +68,39 @@ async def create_new_donation(
         new_donation = await create_donation(session, donation_in, current_user.id)
         
         if not new_donation:
+            need = await get_need_by_id(session, donation_in.need_id)
+            if not need:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="需求不存在"
+                )
+            # 認捐競爭的輸家立即得到 409 與其他可認捐的需求
+            alternatives = await get_alternative_needs(session, current_user.id, need)
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="需求不存在或已被認捐"
+                status_code=status.HTTP_409_CONFLICT,
+                detail=DonationConflictDetail(
+                    message="需求已被認捐",
+                    alternatives=[
+                        AlternativeNeedPublic(
+                            id=alternative.id,
+                            title=alternative.title,
+                            category=alternative.category,
+                            location=alternative.location,
+                            student_count=alternative.student_count,
+                            urgency=alternative.urgency
+                        )
+                        for alternative in alternatives
+                    ]
+                ).model_dump(mode="json")
             )
         
         # 重新載入關聯資料
         await session.refresh(new_donation, ["need"])
         
-        # 轉換為公開格式
-        return DonationPublic(
-            id=new_donation.id,
-            need_id=new_donation.need_id,
-            company_id=new_donation.company_id,
-            donation_type=new_donation.donation_type,
-            description=new_donation.description,
-            progress=new_donation.progress,
-            status=new_donation.status,
-            donation_date=new_donation.created_at,
-            completion_date=new_donation.completion_date,
-            need=new_donation.need,
-            company=None  # 暫時設為 None，稍後可以單獨查詢
-        )
+        # 轉換為公開格式並附上企業與學校的個人檔案
+        content = DONATION_PUBLIC(new_donation)
+        await attach_donation_profiles([content], profiles)
+        return ORJSONResponse(content, status_code=status.HTTP_201_CREATED)
             
     except HTTPException:
         raise
@@ -63,12 +111,59 @@ async def create_new_donation(
         )
 
 
-@router.get("/my", response_model=List[DonationPublic])
-async def get_my_donations(
+@router.post(
+    "/bundle",
+    response_model=DonationBundlePublic,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_409_CONFLICT: {"description": "沒有建立任何捐贈，detail 為 DonationBundleConflictDetail"}}
+)
+async def create_bundle_donation(
+    bundle_in: DonationBundleCreate,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """取得我的捐贈歷史"""
+    """一次認捐多筆需求（企業）"""
+    if current_user.role != "company":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only companies can create donations"
+        )
+    if not bundle_in.need_ids or len(set(bundle_in.need_ids)) > settings.donation_bundle_max_needs:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"need_ids 必須包含 1 到 {settings.donation_bundle_max_needs} 筆需求"
+        )
+    
+    donations, unavailable = await create_donation_bundle(session, bundle_in, current_user.id)
+    if not donations:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=DonationBundleConflictDetail(
+                message="部分需求無法認捐，未建立任何捐贈" if bundle_in.mode == DonationBundleMode.all_or_nothing else "沒有可認捐的需求",
+                unavailable=unavailable
+            ).model_dump(mode="json")
+        )
+    
+    return DonationBundlePublic(
+        mode=bundle_in.mode,
+        donations=[DonationBundleItem(id=donation.id, need_id=donation.need_id) for donation in donations],
+        unavailable=unavailable
+    )
+
+
+@router.get("/my", response_model=Union[List[DonationPublic], List[DonationSparse]])
+async def get_my_donations(
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    profiles: DataLoader = Depends(get_profile_loader),
+    fields: Optional[str] = Query(default=None, description="只回傳這些捐贈欄位（以逗號分隔，一律包含 id）"),
+    include: Optional[str] = Query(default=None, description="嵌入的需求：need 或 need.title,need.location 等欄位")
+):
+    """取得我的捐贈歷史
+
+    未指定 fields 與 include 時回傳完整的捐贈與需求，企業與學校的個人檔案整頁只查詢一次；指定任一參數時只從資料庫取出要求的欄位，
+    指定 fields 但沒有 include 時不嵌入需求。
+    """
     # 檢查使用者角色是否為企業
     if current_user.role != "company":
         raise HTTPException(
@@ -77,22 +172,13 @@ async def get_my_donations(
         )
     
     # 獲取企業的所有捐贈專案
-    donations = await get_donations_by_company(session, current_user.id)
+    selected = _parse_fields(fields, DONATION_COLUMNS)
+    need_fields = _parse_include(include)
+    donations = await get_donations_by_company(session, current_user.id, selected, need_fields)
     
     # 轉換為公開格式
-    return [
-        DonationPublic(
-            id=donation.id,
-            need_id=donation.need_id,
-            company_id=donation.company_id,
-            donation_type=donation.donation_type,
-            description=donation.description,
-            progress=donation.progress,
-            status=donation.status,
-            donation_date=donation.created_at,
-            completion_date=donation.completion_date,
-            need=donation.need,
-            company=None  # 暫時設為 None
-        )
-        for donation in donations
-    ]
+    if selected is None and need_fields is None:
+        content = DONATION_PUBLIC.many(donations)
+        await attach_donation_profiles(content, profiles)
+        return ORJSONResponse(content)
+    return ORJSONResponse(sparse_rows(donations))
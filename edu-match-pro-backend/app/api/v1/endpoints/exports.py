@@ -0,0 +1,71 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+from app.db import get_session
+from app.api.v1.dependencies import get_current_user
+from app.core.config import settings
+from app.core.export import MEDIA_TYPES, stream_export
+from app.crud.donation_crud import donation_export_query
+from app.crud.need_crud import need_export_query
+from app.crud.open_data_crud import open_data_export_query
+from app.models.need import NeedStatus, UrgencyLevel
+from app.models.user import User
+from app.schemas.export_schemas import ExportFormat, OpenDataTable
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+
+def _export_response(
+    session: AsyncSession, statement: Executable, name: str, export_format: ExportFormat, gzip: bool
+) -> StreamingResponse:
+    """以串流回應匯出查詢結果；gzip 時回傳 .gz 檔"""
+    filename = f"{name}.{export_format.value}"
+    media_type = MEDIA_TYPES[export_format.value]
+    if gzip:
+        filename, media_type = f"{filename}.gz", "application/gzip"
+    return StreamingResponse(
+        stream_export(session, statement, export_format.value, gzip, settings.export_chunk_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/needs")
+async def export_needs(
+    session: AsyncSession = Depends(get_session),
+    format: ExportFormat = ExportFormat.ndjson,
+    gzip: bool = False,
+    need_status: Optional[NeedStatus] = Query(default=None, alias="status"),
+    category: Optional[str] = None,
+    urgency: Optional[UrgencyLevel] = None,
+    location: Optional[str] = None,
+    sdg: Optional[List[int]] = Query(default=None)
+):
+    """串流匯出所有符合條件的需求（公開，篩選條件同需求列表）"""
+    statement = need_export_query(need_status, category, urgency, location, sdg)
+    return _export_response(session, statement, "needs", format, gzip)
+
+
+@router.get("/donations")
+async def export_donations(
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    format: ExportFormat = ExportFormat.ndjson,
+    gzip: bool = False
+):
+    """串流匯出企業自己的捐贈，或學校需求收到的捐贈"""
+    statement = donation_export_query(current_user.id, current_user.role)
+    return _export_response(session, statement, "donations", format, gzip)
+
+
+@router.get("/open-data/{table}")
+async def export_open_data(
+    table: OpenDataTable,
+    session: AsyncSession = Depends(get_session),
+    format: ExportFormat = ExportFormat.ndjson,
+    gzip: bool = False
+):
+    """串流匯出整張政府開放資料表（公開）"""
+    return _export_response(session, open_data_export_query(table.value), table.value, format, gzip)
@@ -0,0 +1,52 @@
+from dataclasses import asdict
+from fastapi import APIRouter, Depends
+from app.api.v1.dependencies import get_current_admin
+from app.core.cache import principal_cache
+from app.core.slow_query_log import slow_query_log, summarize
+from app.db import engine, pool_stats
+from app.services.activity_log_writer import activity_log_writer
+from app.services.realtime import realtime_hub
+from app.services.recent_activity import recent_activity_feed
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/auth-cache")
+async def get_auth_cache_stats():
+    """回傳已驗證使用者快取的命中統計（僅限本 worker）"""
+    return principal_cache.stats()
+
+
+@router.get("/db")
+async def get_db_pool_stats():
+    """回傳 API 連線池的借出、溢出與等待時間統計（僅限本 worker）"""
+    return pool_stats(engine)
+
+
+@router.get("/activity-log")
+async def get_activity_log_writer_stats():
+    """回傳活動日誌寫入模式與批次寫入統計（僅限本 worker）"""
+    return activity_log_writer.stats()
+
+
+@router.get("/realtime")
+async def get_realtime_stats():
+    """回傳即時推播的連線數與發布統計（僅限本 worker）"""
+    return realtime_hub.stats()
+
+
+@router.get("/recent-activity")
+async def get_recent_activity_stats():
+    """回傳最新活動快取的筆數與命中次數（僅限本 worker）"""
+    return recent_activity_feed.stats()
+
+
+@router.get("/slow-queries", dependencies=[Depends(get_current_admin)])
+async def get_slow_queries(limit: int = 10):
+    """依語句指紋彙總環形緩衝區內最近的慢查詢（僅限管理者、本 worker；只含參數型別，不含參數值）"""
+    captures = [asdict(capture) for capture in slow_query_log.recent]
+    return {
+        "captured": len(captures),
+        "dropped": slow_query_log.dropped,
+        "queries": summarize(captures)[:limit],
+    }
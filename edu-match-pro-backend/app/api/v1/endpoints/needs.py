@@ -1,24 +1,70 @@
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
 from app.models.user import User
-from app.schemas.need_schemas import NeedCreate, NeedUpdate, NeedPublic
+from app.models.need import NeedStatus, UrgencyLevel
+from app.core.pagination import decode_cursor
+from app.core.dataloader import DataLoader
+from app.core.serialization import ORJSONResponse, attach_loaded, parse_fields, sparse_rows
+from app.schemas.need_schemas import NEED_PUBLIC, NeedCreate, NeedUpdate, NeedPublic, NeedSparse
+from app.schemas.profile_schemas import PROFILE_PUBLIC
 from app.crud.need_crud import (
-    create_need, get_need_by_id, get_needs_by_school, 
+    NEED_COLUMNS, create_need, get_need_by_id, get_needs_by_school, 
     get_all_needs, update_need, delete_need
 )
-from app.api.v1.dependencies import get_current_user
+from app.api.v1.dependencies import get_current_user, get_profile_loader
 
 router = APIRouter(prefix="/needs", tags=["Needs"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+FIELDS_DESCRIPTION = "只回傳這些欄位（以逗號分隔，一律包含 id），例如 title,description_snippet"
+
+
+def _parse_cursor(cursor: Optional[str]):
+    """解析分頁游標，格式錯誤時回傳 400"""
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """解析 fields 參數，有未知欄位時回傳 400"""
+    try:
+        return parse_fields(fields, NEED_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+async def _page_response(
+    needs, next_cursor: Optional[str], fields: Optional[List[str]], profiles: DataLoader
+) -> ORJSONResponse:
+    """以投影直接序列化需求列表（指定 fields 時只有這些欄位），並把下一頁游標放進標頭
+
+    完整格式附上學校的個人檔案，整頁只查詢一次。
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    if fields is not None:
+        return ORJSONResponse(sparse_rows(needs), headers=headers)
+    content = NEED_PUBLIC.many(needs)
+    await attach_loaded(content, "school_id", "school", profiles, PROFILE_PUBLIC)
+    return ORJSONResponse(content, headers=headers)
+
 
 @router.post("/", response_model=NeedPublic, status_code=status.HTTP_201_CREATED)
 async def create_new_need(
     need_in: NeedCreate,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    profiles: DataLoader = Depends(get_profile_loader)
 ):
     """建立新需求"""
     # 檢查使用者角色是否為學校
@@ -40,21 +86,28 @@ async def create_new_need(
         category=new_need.category,
         location=new_need.location,
         student_count=new_need.student_count,
+        estimated_cost=new_need.estimated_cost,
         image_url=new_need.image_url,
         urgency=new_need.urgency,
         sdgs=new_need.sdgs,
         status=new_need.status,
         created_at=new_need.created_at,
-        updated_at=new_need.updated_at
+        updated_at=new_need.updated_at,
+        school=await profiles.load(new_need.school_id)
     )
 
 
-@router.get("/my", response_model=List[NeedPublic])
+@router.get("/my", response_model=Union[List[NeedPublic], List[NeedSparse]])
 async def get_my_needs(
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    profiles: DataLoader = Depends(get_profile_loader),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=100),
+    need_status: Optional[NeedStatus] = Query(default=None, alias="status"),
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION)
 ):
-    """取得我的所有需求"""
+    """取得我的需求（下一頁游標放在 X-Next-Cursor 標頭）"""
     # 檢查使用者角色是否為學校
     if current_user.role != "school":
         raise HTTPException(
@@ -62,63 +115,51 @@ async def get_my_needs(
             detail="Only schools can view their needs"
         )
     
-    # 獲取學校的所有需求
-    needs = await get_needs_by_school(session, current_user.id)
+    # 獲取學校的需求
+    selected = _parse_fields(fields)
+    needs, next_cursor = await get_needs_by_school(
+        session, current_user.id, _parse_cursor(cursor), limit, need_status, selected
+    )
     
     # 轉換為公開格式
-    return [
-        NeedPublic(
-            id=need.id,
-            school_id=need.school_id,
-            title=need.title,
-            description=need.description,
-            category=need.category,
-            location=need.location,
-            student_count=need.student_count,
-            image_url=need.image_url,
-            urgency=need.urgency,
-            sdgs=need.sdgs,
-            status=need.status,
-            created_at=need.created_at,
-            updated_at=need.updated_at
-        )
-        for need in needs
-    ]
+    return await _page_response(needs, next_cursor, selected, profiles)
 
 
-@router.get("/", response_model=List[NeedPublic])
+@router.get("/", response_model=Union[List[NeedPublic], List[NeedSparse]])
 async def get_all_public_needs(
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    profiles: DataLoader = Depends(get_profile_loader),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=100),
+    need_status: Optional[NeedStatus] = Query(default=None, alias="status"),
+    category: Optional[str] = None,
+    urgency: Optional[UrgencyLevel] = None,
+    location: Optional[str] = None,
+    sdg: Optional[List[int]] = Query(default=None),
+    fields: Optional[str] = Query(default=None, description=FIELDS_DESCRIPTION)
 ):
-    """取得所有公開需求 (不需要登入)"""
-    # 獲取所有需求
-    needs = await get_all_needs(session)
+    """取得公開需求 (不需要登入)，支援篩選與游標分頁
+
+    下一頁游標放在 X-Next-Cursor 標頭；location 為前綴比對，sdg 可重複指定（任一符合）。
+    卡片列表可用 fields=title,description_snippet，未要求的欄位不會從資料庫取出。
+    """
+    # 獲取需求
+    selected = _parse_fields(fields)
+    needs, next_cursor = await get_all_needs(
+        session, _parse_cursor(cursor), limit,
+        status=need_status, category=category, urgency=urgency,
+        location=location, sdgs=sdg, fields=selected
+    )
     
     # 轉換為公開格式
-    return [
-        NeedPublic(
-            id=need.id,
-            school_id=need.school_id,
-            title=need.title,
-            description=need.description,
-            category=need.category,
-            location=need.location,
-            student_count=need.student_count,
-            image_url=need.image_url,
-            urgency=need.urgency,
-            sdgs=need.sdgs,
-            status=need.status,
-            created_at=need.created_at,
-            updated_at=need.updated_at
-        )
-        for need in needs
-    ]
+    return await _page_response(needs, next_cursor, selected, profiles)
 
 
 @router.get("/{need_id}", response_model=NeedPublic)
 async def get_need_by_id_endpoint(
     need_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    profiles: DataLoader = Depends(get_profile_loader)
 ):
     """取得單一需求 (不需要登入)"""
     # 查詢需求
@@ -138,12 +179,14 @@ async def get_need_by_id_endpoint(
         category=need.category,
         location=need.location,
         student_count=need.student_count,
+        estimated_cost=need.estimated_cost,
         image_url=need.image_url,
         urgency=need.urgency,
         sdgs=need.sdgs,
         status=need.status,
         created_at=need.created_at,
-        updated_at=need.updated_at
+        updated_at=need.updated_at,
+        school=await profiles.load(need.school_id)
     )
 
 
@@ -152,7 +195,8 @@ async def update_need_endpoint(
     need_id: uuid.UUID,
     need_in: NeedUpdate,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    profiles: DataLoader = Depends(get_profile_loader)
 ):
     """更新需求"""
     # 查詢需求
@@ -182,12 +226,14 @@ async def update_need_endpoint(
         category=updated_need.category,
         location=updated_need.location,
         student_count=updated_need.student_count,
+        estimated_cost=updated_need.estimated_cost,
         image_url=updated_need.image_url,
         urgency=updated_need.urgency,
         sdgs=updated_need.sdgs,
         status=updated_need.status,
         created_at=updated_need.created_at,
-        updated_at=updated_need.updated_at
+        updated_at=updated_need.updated_at,
+        school=await profiles.load(updated_need.school_id)
     )
 
 
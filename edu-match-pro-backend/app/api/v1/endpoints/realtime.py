@@ -0,0 +1,102 @@
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db import get_session
+from app.models.user import User
+from app.api.v1.dependencies import authenticate_token, get_optional_user
+from app.services.realtime import PUBLIC_TOPIC, Subscription, realtime_hub, user_topic
+
+router = APIRouter(prefix="/realtime", tags=["Realtime"])
+
+
+def _topics_for(user: Optional[User], public: bool) -> List[str]:
+    """登入使用者訂閱自己的主題；public 決定是否同時訂閱公開活動"""
+    topics = [user_topic(user.id)] if user is not None else []
+    if public or user is None:
+        topics.append(PUBLIC_TOPIC)
+    return topics
+
+
+@router.get("/events")
+async def stream_events(
+    request: Request,
+    public: bool = True,
+    token: Optional[str] = Query(default=None, description="EventSource 無法設定標頭時改以查詢參數傳遞"),
+    session: AsyncSession = Depends(get_session),
+    user: Optional[User] = Depends(get_optional_user)
+):
+    """以 Server-Sent Events 推播新的活動與捐贈進度"""
+    if user is None and token is not None:
+        user = await authenticate_token(session, token)
+    # 驗證完成後立即歸還連線，長時間的串流不佔用連線池
+    await session.close()
+    subscription = realtime_hub.subscribe(_topics_for(user, public))
+
+    async def _events():
+        try:
+            yield b": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), settings.realtime_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # 定期送出註解行，讓代理伺服器不會因閒置而斷線
+                    if await request.is_disconnected():
+                        break
+                    yield b": heartbeat\n\n"
+                    continue
+                if message is None:
+                    break
+                yield b"data: " + message + b"\n\n"
+        finally:
+            realtime_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        _events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(
+    websocket: WebSocket,
+    public: bool = True,
+    token: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """以 WebSocket 推播新的活動與捐贈進度；瀏覽器無法設定標頭，token 以查詢參數傳遞"""
+    user = None
+    if token is not None:
+        try:
+            user = await authenticate_token(session, token)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    await session.close()
+    await websocket.accept()
+    subscription = realtime_hub.subscribe(_topics_for(user, public))
+    receiver = asyncio.ensure_future(_drain_client(websocket, subscription))
+    try:
+        while True:
+            message = await subscription.get()
+            if message is None:
+                break
+            await websocket.send_text(message.decode("utf-8"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        realtime_hub.unsubscribe(subscription)
+
+
+async def _drain_client(websocket: WebSocket, subscription: Subscription) -> None:
+    """讀取客戶端訊息以偵測斷線；斷線時關閉訂閱讓傳送迴圈結束"""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
@@ -0,0 +1,68 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db import get_session
+from app.api.v1.dependencies import get_current_user, get_profile_loader
+from app.core.dataloader import DataLoader
+from app.models.user import User
+from app.models.need import Need
+from app.schemas.recommendation_schemas import RecommendedNeedPublic
+from app.services.recommendation_engine import recommendation_engine
+
+router = APIRouter(prefix="/recommendations", tags=["Recommendations"])
+
+
+@router.get("/", response_model=List[RecommendedNeedPublic])
+async def get_recommended_needs(
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    profiles: DataLoader = Depends(get_profile_loader),
+    limit: int = Query(default=20, ge=1, le=100)
+):
+    """取得為企業推薦的需求"""
+    # 檢查使用者角色是否為企業
+    if current_user.role != "company":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only companies can get need recommendations"
+        )
+    
+    # 確保特徵矩陣已載入，並在記憶體中完成評分
+    await recommendation_engine.ensure_loaded(session)
+    ranked = recommendation_engine.recommend(current_user.id, limit)
+    if not ranked:
+        return []
+    
+    # 只查詢排名前段的需求
+    result = await session.execute(
+        select(Need).where(Need.id.in_([need_id for need_id, _ in ranked]))
+    )
+    needs = {need.id: need for need in result.scalars().all()}
+    # 學校的個人檔案合併成一次查詢
+    schools = await profiles.load_many([need.school_id for need in needs.values()])
+    school_by_need = dict(zip(needs, schools))
+    
+    return [
+        RecommendedNeedPublic(
+            id=need.id,
+            school_id=need.school_id,
+            title=need.title,
+            description=need.description,
+            category=need.category,
+            location=need.location,
+            student_count=need.student_count,
+            estimated_cost=need.estimated_cost,
+            image_url=need.image_url,
+            urgency=need.urgency,
+            sdgs=need.sdgs,
+            status=need.status,
+            created_at=need.created_at,
+            updated_at=need.updated_at,
+            school=school_by_need[need_id],
+            match_score=round(score, 4),
+            remoteness=recommendation_engine.remoteness_of(need.location)
+        )
+        for need_id, score in ranked
+        if (need := needs.get(need_id)) is not None
+    ]
@@ -0,0 +1,55 @@
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.db import get_session
+from app.models.need import Need
+from app.models.impact_story import ImpactStory
+from app.schemas.search_schemas import SearchHit
+from app.services.search_index import search_index, highlight
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("/", response_model=List[SearchHit])
+async def search_needs_and_stories(
+    q: str = Query(min_length=1, max_length=100),
+    type: Optional[Literal["need", "story"]] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    session: AsyncSession = Depends(get_session)
+):
+    """搜尋需求與影響力故事（公開），依 BM25 分數排序"""
+    await search_index.ensure_synced(session)
+    ranked = search_index.search(q, type, limit)
+    if not ranked:
+        return []
+    
+    # 只查詢排名前段的文件內容以產生片段
+    need_ids = [doc_id for (doc_type, doc_id), _ in ranked if doc_type == "need"]
+    story_ids = [doc_id for (doc_type, doc_id), _ in ranked if doc_type == "story"]
+    documents = {}
+    if need_ids:
+        result = await session.execute(
+            select(Need.id, Need.title, Need.description).where(Need.id.in_(need_ids))
+        )
+        documents.update({("need", row.id): (row.title, row.description) for row in result.all()})
+    if story_ids:
+        result = await session.execute(
+            select(ImpactStory.id, ImpactStory.title, ImpactStory.content).where(ImpactStory.id.in_(story_ids))
+        )
+        documents.update({("story", row.id): (row.title, row.content) for row in result.all()})
+    
+    # 其他 worker 已刪除、尚未比對到的文件直接自索引移除
+    search_index.discard(key for key, _ in ranked if key not in documents)
+    
+    return [
+        SearchHit(
+            type=key[0],
+            id=key[1],
+            title=highlight(documents[key][0], q, width=200),
+            snippet=highlight(documents[key][1], q),
+            score=round(score, 4)
+        )
+        for key, score in ranked
+        if key in documents
+    ]
@@ -3,9 +3,14 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_session
-from app.api.v1.dependencies import get_current_user
+from app.api.v1.dependencies import get_current_user, get_profile_loader
 from app.models.user import User
-from app.schemas.story_schemas import ImpactStoryPublic
+from app.core.dataloader import DataLoader
+from app.core.serialization import ORJSONResponse
+from app.schemas.story_schemas import IMPACT_STORY_PUBLIC, ImpactMetricTotal, ImpactStoryPublic
+from app.crud.profile_crud import attach_donation_profiles
+from app.crud.story_crud import get_impact_metric_total
+from app.models.donation import Donation
 from app.models.impact_story import ImpactStory
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -16,46 +21,46 @@ router = APIRouter(prefix="/stories", tags=["Stories"])
 @router.get("/", response_model=List[ImpactStoryPublic])
 async def get_all_stories(
     session: AsyncSession = Depends(get_session),
+    profiles: DataLoader = Depends(get_profile_loader),
     skip: int = 0,
     limit: int = 20
 ):
     """取得所有影響力故事（公開）"""
     result = await session.execute(
         select(ImpactStory)
-        .options(selectinload(ImpactStory.donation))
+        .options(selectinload(ImpactStory.donation).selectinload(Donation.need))
         .offset(skip)
         .limit(limit)
         .order_by(ImpactStory.created_at.desc())
     )
     stories = result.scalars().all()
     
-    return [
-        ImpactStoryPublic(
-            id=story.id,
-            donation_id=story.donation_id,
-            title=story.title,
-            content=story.content,
-            image_url=story.image_url,
-            video_url=story.video_url,
-            impact_metrics=story.impact_metrics,
-            created_at=story.created_at,
-            updated_at=story.updated_at,
-            donation=story.donation
-        )
-        for story in stories
-    ]
+    content = IMPACT_STORY_PUBLIC.many(stories)
+    await attach_donation_profiles([story["donation"] for story in content if story["donation"]], profiles)
+    return ORJSONResponse(content)
+
+
+@router.get("/company/{company_id}/metrics/{metric}", response_model=ImpactMetricTotal)
+async def get_company_metric_total(
+    company_id: uuid.UUID,
+    metric: str,
+    session: AsyncSession = Depends(get_session)
+):
+    """加總企業所有影響力故事中的單一指標（公開）"""
+    return await get_impact_metric_total(session, company_id, metric)
 
 
 @router.get("/{story_id}", response_model=ImpactStoryPublic)
 async def get_story_by_id(
     story_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    profiles: DataLoader = Depends(get_profile_loader)
 ):
     """取得單一影響力故事"""
     result = await session.execute(
         select(ImpactStory)
         .where(ImpactStory.id == story_id)
-        .options(selectinload(ImpactStory.donation))
+        .options(selectinload(ImpactStory.donation).selectinload(Donation.need))
     )
     story = result.scalar_one_or_none()
     
@@ -65,15 +70,7 @@ async def get_story_by_id(
             detail="Story not found"
         )
     
-    return ImpactStoryPublic(
-        id=story.id,
-        donation_id=story.donation_id,
-        title=story.title,
-        content=story.content,
-        image_url=story.image_url,
-        video_url=story.video_url,
-        impact_metrics=story.impact_metrics,
-        created_at=story.created_at,
-        updated_at=story.updated_at,
-        donation=story.donation
-    )
+    content = IMPACT_STORY_PUBLIC(story)
+    if content["donation"]:
+        await attach_donation_profiles([content["donation"]], profiles)
+    return ORJSONResponse(content)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -7,7 +7,72 @@ class Settings(BaseSettings):
     test_database_url: Optional[str] = None
     secret_key: str
     algorithm: str = "HS256"
+    # 資料庫連線池
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    ingestion_pool_size: int = 2
     access_token_expire_minutes: int = 30
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 32
+    principal_cache_max_size: int = 10000
+    principal_cache_ttl_seconds: int = 60
+    # 指標：多 worker 時設定共用目錄，各 worker 定期寫出快照供 /metrics 合併
+    metrics_enabled: bool = True
+    metrics_multiproc_dir: Optional[str] = None
+    metrics_flush_seconds: float = 5.0
+    # SQL 統計：同一請求內相同語句執行達此次數時記錄 N+1 警告
+    query_stats_enabled: bool = True
+    n_plus_one_threshold: int = 5
+    # 慢查詢：超過門檻的語句放入環形緩衝區，背景以專用連線取得 EXPLAIN（逾時上限 explain_timeout_ms）後寫入 JSONL（只記錄參數型別）
+    slow_query_log_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0
+    slow_query_log_path: Optional[str] = "logs/slow_queries.jsonl"
+    slow_query_buffer_size: int = 1000
+    slow_query_explain_interval_seconds: float = 300.0
+    slow_query_explain_timeout_ms: int = 5000
+    # 管理者帳號（email）：可存取 /health/slow-queries 等含內部資訊的端點
+    admin_emails: List[str] = []
+    dashboard_rollups_enabled: bool = True
+    # 即時推播：local 僅限單一 worker；postgres 以 LISTEN/NOTIFY 在 worker 之間廣播（待送事件上限、斷線重連的最長等待秒數）
+    realtime_backend: Literal["local", "postgres"] = "local"
+    realtime_channel: str = "edu_match_realtime"
+    realtime_outbox_size: int = 1000
+    realtime_reconnect_max_seconds: float = 30.0
+    realtime_queue_size: int = 100
+    realtime_heartbeat_seconds: float = 15.0
+    # 活動日誌：transaction 與業務資料同一交易寫入；async 在交易提交後交由背景寫入器批次寫入（關閉時寫出，當機時可能遺失）
+    activity_log_delivery: Literal["transaction", "async"] = "transaction"
+    activity_log_flush_ms: int = 200
+    activity_log_batch_size: int = 500
+    activity_log_queue_size: int = 10000
+    # 活動日誌分區：預先建立的月份數、背景重新檢查的間隔秒數、保留月數（更舊的分區匯出壓縮檔後移除）與查詢時先掃描的近期天數
+    activity_log_partition_months_ahead: int = 3
+    activity_log_partition_check_seconds: float = 21600.0
+    activity_log_retention_months: int = 12
+    activity_log_archive_dir: str = "archive/activity_log"
+    activity_log_recent_window_days: int = 31
+    # 最新活動快取：每個 worker 保留最新 N 筆；reconcile 模式會定期從資料庫重新載入，修正 worker 之間的差異
+    recent_activity_size: int = 200
+    recent_activity_consistency: Literal["local", "reconcile"] = "reconcile"
+    recent_activity_reconcile_seconds: float = 30.0
+    recommendation_refresh_seconds: int = 300
+    donation_bundle_max_needs: int = 1000
+    # 批次請求：單次最多的子請求數、整個 worker 同時執行的子請求上限（各佔一條連線，應小於連線池）與每個子請求的逾時秒數
+    batch_max_requests: int = 10
+    batch_max_concurrency: int = 4
+    batch_timeout_seconds: float = 10.0
+    # 匯出：伺服器端游標每次取回並編碼的列數
+    export_chunk_size: int = 1000
+    # 全文檢索：增量同步間隔、往回重讀的重疊秒數，以及比對 id 清單（移除已刪除文件）的間隔
+    search_sync_seconds: int = 30
+    search_sync_overlap_seconds: int = 300
+    search_reconcile_seconds: int = 600
     
     class Config:
         env_file = ".env"
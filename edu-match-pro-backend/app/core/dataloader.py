@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class DataLoader(Generic[K, V]):
+    """請求範圍的批次載入器：同一輪事件迴圈內 load() 的鍵合併成一次 batch_load，結果依鍵快取
+
+    batch_load 收到不重複的鍵並回傳 {鍵: 值}，查無資料的鍵得到 None。
+    與端點共用同一個 session 時，等待載入期間不可同時以該 session 執行其他查詢；
+    請求結束時須呼叫 close()，取消仍在執行的批次，避免在 session 關閉後繼續使用它。
+    """
+
+    def __init__(self, batch_load: Callable[[List[K]], Awaitable[Dict[K, V]]]) -> None:
+        self._batch_load = batch_load
+        self._cache: Dict[K, asyncio.Future] = {}
+        self._pending: List[K] = []
+        # 事件迴圈只保留 task 的弱參照，執行中的批次由載入器持有
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed = False
+        self.batches = 0
+
+    def load(self, key: K) -> "asyncio.Future[Optional[V]]":
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            self._pending.append(key)
+            if len(self._pending) == 1:
+                # 讓同一輪中其他 load() 先登記鍵，再一起查詢
+                loop.call_soon(self._start_dispatch)
+        return future
+
+    def _start_dispatch(self) -> None:
+        if self._closed:
+            # 關閉後才輪到的批次不再查詢
+            keys, self._pending = self._pending, []
+            for key in keys:
+                self._cache.pop(key).cancel()
+            return
+        task = asyncio.get_running_loop().create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("DataLoader batch failed", exc_info=task.exception())
+
+    async def close(self) -> None:
+        """取消仍在執行的批次並等待結束（請求結束時呼叫）"""
+        self._closed = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    async def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        self.batches += 1
+        try:
+            values = await self._batch_load(keys)
+        except asyncio.CancelledError:
+            for key in keys:
+                future = self._cache.pop(key)
+                future.cancel()
+            raise
+        except Exception as e:
+            # 失敗的鍵不快取，下次 load() 會重新查詢
+            for key in keys:
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._cache[key]
+            if not future.done():
+                future.set_result(values.get(key))
@@ -0,0 +1,84 @@
+import csv
+import io
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Mapping, Sequence
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+
+MEDIA_TYPES: Dict[str, str] = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _csv_cell(value: Any) -> Any:
+    """CSV 欄位值：None 為空字串、列舉取值、陣列與物件以 JSON 表示"""
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value).decode("utf-8")
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    # asyncpg 的 UUID 與 Numeric 欄位的 Decimal 交由 default 轉換
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+async def encode_ndjson(chunks: AsyncIterator[Sequence[Mapping[str, Any]]]) -> AsyncIterator[bytes]:
+    """每一批資料列編碼成一段 NDJSON（每列一個 JSON 物件）"""
+    async for rows in chunks:
+        yield b"".join(orjson.dumps(dict(row), default=_json_default) + b"\n" for row in rows)
+
+
+async def encode_csv(
+    chunks: AsyncIterator[Sequence[Mapping[str, Any]]], columns: List[str]
+) -> AsyncIterator[bytes]:
+    """每一批資料列編碼成一段 CSV；開頭加上 BOM 與標題列，Excel 才能正確顯示中文"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield "\ufeff".encode("utf-8") + buffer.getvalue().encode("utf-8")
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(row[column]) for column in columns] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def gzip_stream(body: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """邊讀邊壓縮成 gzip；每段都 flush，客戶端不必等壓縮器累積到一定大小"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in body:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+async def stream_export(
+    session: AsyncSession, statement: Executable, export_format: str, compress: bool, chunk_size: int
+) -> AsyncIterator[bytes]:
+    """以伺服器端游標每次取 chunk_size 列並逐段編碼，記憶體用量與匯出筆數無關
+
+    FastAPI 在回應送出前就會結束依賴項，串流期間 session 會重新取得連線，結束時在此歸還。
+    """
+    try:
+        result = await session.stream(statement.execution_options(yield_per=chunk_size))
+        chunks = result.mappings().partitions()
+        if export_format == "csv":
+            body = encode_csv(chunks, list(result.keys()))
+        else:
+            body = encode_ndjson(chunks)
+        if compress:
+            body = gzip_stream(body)
+        async for chunk in body:
+            if chunk:
+                yield chunk
+    finally:
+        await session.close()
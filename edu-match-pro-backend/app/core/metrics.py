@@ -0,0 +1,287 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[str, ...]
+
+# 延遲（秒）與大小（位元組）的直方圖分桶
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class _Family:
+    """同名指標的所有標籤組合"""
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Labels, Any] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": [[list(labels), value] for labels, value in self.values.items()],
+        }
+
+
+class Counter(_Family):
+    type = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(_Family):
+    type = "gauge"
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, labels: Labels = (), value: float = 0) -> None:
+        self.values[labels] = value
+
+
+class Histogram(_Family):
+    """各分桶計數（非累積，最後一格為 +Inf）後接 sum 與 count"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: Labels, value: float) -> None:
+        data = self.values.get(labels)
+        if data is None:
+            data = [0] * (len(self.buckets) + 3)
+            self.values[labels] = data
+        data[bisect_left(self.buckets, value)] += 1
+        data[-2] += value
+        data[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+
+class MetricsRegistry:
+    """行程內的指標登錄表；多 worker 時各自寫出快照，/metrics 讀取後合併"""
+
+    def __init__(self) -> None:
+        self._families: Dict[str, _Family] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _register(self, family: _Family) -> Any:
+        existing = self._families.get(family.name)
+        if existing is not None:
+            return existing
+        self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: family.snapshot() for name, family in self._families.items()}
+
+    def reset(self) -> None:
+        for family in self._families.values():
+            family.values.clear()
+
+    # --- 多 worker 彙總 ---
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(settings.metrics_multiproc_dir, f"metrics_{pid}.json")
+
+    def _write_snapshot(self, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        """將快照寫入共用目錄（先寫暫存檔再更名，讀取端不會看到半份檔案）"""
+        os.makedirs(settings.metrics_multiproc_dir, exist_ok=True)
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def flush(self) -> None:
+        """將本 worker 的快照寫入共用目錄"""
+        if settings.metrics_multiproc_dir:
+            self._write_snapshot(self.snapshot())
+
+    async def start(self) -> None:
+        """多 worker 時以背景工作定期寫出快照；快照在事件迴圈上取得，檔案寫入交給執行緒，不佔用請求路徑"""
+        if settings.metrics_multiproc_dir and self._flusher is None:
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.metrics_flush_seconds)
+            try:
+                await asyncio.to_thread(self._write_snapshot, self.snapshot())
+            except Exception:
+                logger.exception("Could not write the metrics snapshot")
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if settings.metrics_multiproc_dir:
+            await asyncio.to_thread(self._write_snapshot, self.snapshot())
+
+    def collect(self, local: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """回傳所有存活 worker 合併後的快照；local 為事先取得的本 worker 快照（在其他執行緒呼叫時使用）"""
+        local = self.snapshot() if local is None else local
+        if not settings.metrics_multiproc_dir:
+            return local
+        self._write_snapshot(local)
+        snapshots = []
+        for path in glob.glob(os.path.join(settings.metrics_multiproc_dir, "metrics_*.json")):
+            try:
+                pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+            except ValueError:
+                continue
+            if not _pid_alive(pid):
+                # 已結束的 worker 不再計入，Prometheus 會把計數下降視為重置
+                _remove_quietly(path)
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return merge_snapshots(snapshots)
+
+    def render(self, local: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        return render_prometheus(self.collect(local))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def merge_snapshots(snapshots: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """合併多個 worker 的快照：計數、量表與直方圖皆逐項相加"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for name, family in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                target = {**family, "samples": {}}
+                merged[name] = target
+            samples = target["samples"]
+            for labels, value in family["samples"]:
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    samples[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    samples[key] = current + value
+    for family in merged.values():
+        family["samples"] = [[list(labels), value] for labels, value in family["samples"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render_prometheus(families: Dict[str, Dict[str, Any]]) -> str:
+    """輸出 Prometheus text exposition format (0.0.4)"""
+    lines: List[str] = []
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        labelnames = family["labelnames"]
+        for labels, value in family["samples"]:
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            bounds = [*(_format_number(float(b)) for b in family["buckets"]), "+Inf"]
+            for bound, count in zip(bounds, value[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labels, ('le', bound))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_number(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# HTTP 指標
+http_requests_total = registry.counter(
+    "http_requests_total", "Total HTTP requests.", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds.", ("method", "route")
+)
+http_request_size_bytes = registry.histogram(
+    "http_request_size_bytes", "HTTP request body size in bytes.", ("method", "route"), SIZE_BUCKETS
+)
+http_response_size_bytes = registry.histogram(
+    "http_response_size_bytes", "HTTP response body size in bytes.", ("method", "route"), SIZE_BUCKETS
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being served.", ("method",)
+)
+
+# 每個請求的 SQL 指標
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements issued per HTTP request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+db_time_per_request_seconds = registry.histogram(
+    "db_time_per_request_seconds", "Total SQL execution time per HTTP request in seconds.", ("method", "route")
+)
+db_rows_total = registry.counter(
+    "db_rows_total", "Rows returned or affected by SQL statements.", ("method", "route")
+)
+db_repeated_statements_total = registry.counter(
+    "db_repeated_statements_total", "Statement shapes repeated enough within one request to look like N+1.", ("method", "route")
+)
@@ -0,0 +1,99 @@
+import time
+from app.core.metrics import (
+    http_requests_total, http_request_duration_seconds,
+    http_request_size_bytes, http_response_size_bytes, http_requests_in_progress,
+    db_queries_per_request, db_time_per_request_seconds, db_rows_total, db_repeated_statements_total
+)
+from app.core.query_stats import collect_queries
+
+# 未對應到任何路由的請求統一歸類，避免任意路徑造成標籤數量暴增
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """以純 ASGI middleware 記錄每個路由樣板的延遲、大小與進行中的請求數"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        response_size = 0
+        request_size = 0
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                content_length = value
+                break
+        if content_length is not None:
+            request_size = int(content_length) if content_length.isdigit() else 0
+            wrapped_receive = receive
+        else:
+            async def wrapped_receive():
+                nonlocal request_size
+                message = await receive()
+                if message["type"] == "http.request":
+                    request_size += len(message.get("body", b""))
+                return message
+
+        async def wrapped_send(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress_labels = (method,)
+        http_requests_in_progress.inc(in_progress_labels)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, wrapped_receive, wrapped_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec(in_progress_labels)
+            # 路由比對後 FastAPI 會把 route 寫回 scope，取其路徑樣板作為標籤
+            route = scope.get("route")
+            labels = (method, getattr(route, "path", None) or UNMATCHED_ROUTE)
+            http_requests_total.inc((*labels, str(status_code)))
+            http_request_duration_seconds.observe(labels, elapsed)
+            http_request_size_bytes.observe(labels, request_size)
+            http_response_size_bytes.observe(labels, response_size)
+
+
+class QueryStatsMiddleware:
+    """統計每個請求的 SQL 數量、耗時與列數，輸出 Server-Timing 標頭並記錄指標"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        with collect_queries(label=f"{method} {scope['path']}") as stats:
+            async def wrapped_send(message):
+                if message["type"] == "http.response.start":
+                    # 串流回應開始後的查詢只計入指標，不會出現在標頭中
+                    timing = f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries, {stats.rows} rows"'
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode("latin-1"))]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, wrapped_send)
+            finally:
+                route = scope.get("route")
+                labels = (method, getattr(route, "path", None) or UNMATCHED_ROUTE)
+                db_queries_per_request.observe(labels, stats.count)
+                db_time_per_request_seconds.observe(labels, stats.total_ms / 1000)
+                if stats.rows:
+                    db_rows_total.inc(labels, stats.rows)
+                if stats.repeated:
+                    db_repeated_statements_total.inc(labels, len(stats.repeated))
@@ -0,0 +1,108 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.slow_query_log import slow_query_log
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    """單一請求（或測試區塊）內的 SQL 統計"""
+    label: str = ""
+    count: int = 0
+    total_ms: float = 0.0
+    rows: int = 0
+    shapes: Counter = field(default_factory=Counter)
+    repeated: Set[str] = field(default_factory=set)
+
+    def record(self, statement: str, elapsed_ms: float, rows: int, executemany: bool) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.rows += rows
+        if executemany:
+            return
+        # 參數化後的 SQL 字串即為語句形狀；同一請求內重複多次通常代表 N+1
+        self.shapes[statement] += 1
+        if self.shapes[statement] == settings.n_plus_one_threshold:
+            self.repeated.add(statement)
+            logger.warning(
+                "Possible N+1 query in %s: statement executed %d times: %s",
+                self.label or "<no request>", self.shapes[statement], " ".join(statement.split())[:300]
+            )
+
+
+class QueryBudgetExceeded(AssertionError):
+    """測試區塊內的查詢數超過預算"""
+
+
+# 目前作用中的統計收集器（請求 middleware 與測試的預算檢查可同時存在）
+_collectors: ContextVar[Tuple[QueryStats, ...]] = ContextVar("query_stats_collectors", default=())
+
+
+@contextmanager
+def collect_queries(label: str = "") -> Iterator[QueryStats]:
+    """在區塊內收集 SQL 統計"""
+    stats = QueryStats(label=label)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "") -> Iterator[QueryStats]:
+    """區塊內查詢數超過 max_queries 時拋出 QueryBudgetExceeded（供測試使用）"""
+    with collect_queries(label) as stats:
+        yield stats
+    if stats.count > max_queries:
+        shapes = "\n".join(
+            f"  {count}x {' '.join(statement.split())[:200]}"
+            for statement, count in stats.shapes.most_common(5)
+        )
+        raise QueryBudgetExceeded(
+            f"{label or 'block'} issued {stats.count} queries (budget {max_queries}):\n{shapes}"
+        )
+
+
+def current_stats() -> Optional[QueryStats]:
+    """回傳最內層的收集器"""
+    collectors = _collectors.get()
+    return collectors[-1] if collectors else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors.get() or settings.slow_query_log_enabled:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_times")
+    if not start_times:
+        return
+    elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+    rows = max(cursor.rowcount, 0) if cursor is not None else 0
+    collectors = _collectors.get()
+    for stats in collectors:
+        stats.record(statement, elapsed_ms, rows, executemany)
+    if settings.slow_query_log_enabled and elapsed_ms >= settings.slow_query_threshold_ms:
+        label = collectors[0].label if collectors else ""
+        slow_query_log.record(conn.engine, statement, parameters, executemany, elapsed_ms, rows, label)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # 執行失敗時 after_cursor_execute 不會觸發，移除對應的起始時間
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_times"):
+        conn.info["query_start_times"].pop()
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -5,14 +7,26 @@ import bcrypt
 from app.core.config import settings
 
 
-def get_password_hash(password: str) -> str:
+class PasswordHashingBusy(Exception):
+    """等待雜湊的請求超過佇列上限"""
+
+
+# bcrypt 會釋放 GIL，放在專用執行緒池中執行以免阻塞事件迴圈
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt"
+)
+# 執行中與排隊中的雜湊工作數（只在事件迴圈中修改）
+_hash_queue_depth = 0
+
+
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
     """將明文密碼使用 bcrypt 進行雜湊"""
     # 直接使用 bcrypt 避免 passlib 的版本問題
     password_bytes = password.encode('utf-8')
     # bcrypt 限制密碼長度為 72 字節
     if len(password_bytes) > 72:
         password_bytes = password_bytes[:72]
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds or settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -28,6 +42,56 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """雜湊使用的 cost 與目前設定不同時回傳 True"""
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.bcrypt_rounds
+
+
+async def _run_hash_job(func, *args):
+    """在 bcrypt 執行緒池中執行，佇列已滿時拋出 PasswordHashingBusy"""
+    global _hash_queue_depth
+    if _hash_queue_depth >= settings.password_hash_max_queue:
+        raise PasswordHashingBusy()
+    loop = asyncio.get_running_loop()
+    _hash_queue_depth += 1
+    future = _hash_executor.submit(func, *args)
+
+    def _release(_) -> None:
+        try:
+            loop.call_soon_threadsafe(_decrement_queue_depth)
+        except RuntimeError:
+            # 事件迴圈已關閉，沒有其他程式會同時修改計數
+            _decrement_queue_depth()
+
+    # 請求被取消（例如客戶端斷線）時執行緒仍在計算，等工作真正結束才釋放名額
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+def _decrement_queue_depth() -> None:
+    global _hash_queue_depth
+    _hash_queue_depth -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """於執行緒池中雜湊密碼"""
+    return await _run_hash_job(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """於執行緒池中驗證密碼"""
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+
+def hash_queue_depth() -> int:
+    """目前執行中與排隊中的雜湊工作數"""
+    return _hash_queue_depth
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """根據傳入的資料和過期時間，建立一個 JWT access token"""
     to_encode = data.copy()
@@ -0,0 +1,116 @@
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type, Union
+import orjson
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+from sqlmodel import SQLModel
+
+
+class ORJSONResponse(_ORJSONResponse):
+    """以 orjson 編碼的回應（應用程式預設回應類別）"""
+
+    def render(self, content: Any) -> bytes:
+        # asyncpg 回傳的 UUID 不是標準 uuid.UUID，交由 default 轉成字串
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+class Projection:
+    """依回應 Schema 預先建立的取值投影：ORM 物件直接轉為 dict，交給 orjson 編碼
+
+    只用於資料庫中已驗證過的資料，略過逐筆建立 Schema 與 FastAPI 的二次驗證。
+    覆寫參數：字串為來源屬性名稱、Projection 為巢狀物件、其他可呼叫物件轉換同名屬性的值
+    （對應 Schema 上的自訂序列化器）、None 為固定輸出 null。
+    """
+
+    def __init__(self, schema: Type[SQLModel], **overrides: Union[str, Callable[[Any], Any], None]) -> None:
+        unknown = set(overrides) - set(schema.model_fields)
+        if unknown:
+            raise ValueError(f"{schema.__name__} has no fields {sorted(unknown)}")
+        self.schema = schema
+        self._constants: Dict[str, Any] = {}
+        self._nested: List[tuple] = []
+        names, sources = [], []
+        for name in schema.model_fields:
+            override = overrides.get(name, name)
+            if override is None:
+                self._constants[name] = None
+                continue
+            if callable(override):
+                self._nested.append((name, override))
+                override = name
+            names.append(name)
+            sources.append(override)
+        self._names = tuple(names)
+        # 已載入的欄位值存在實例 __dict__，直接取值可略過 ORM 屬性描述器
+        self._items = self._as_tuple(itemgetter(*sources), len(sources))
+        self._attrs = self._as_tuple(attrgetter(*sources), len(sources))
+
+    @staticmethod
+    def _as_tuple(getter, count: int):
+        # 只有一個欄位時 getter 回傳單一值而非 tuple
+        return getter if count > 1 else lambda obj: (getter(obj),)
+
+    def _get(self, obj: Any) -> tuple:
+        try:
+            return self._items(obj.__dict__)
+        except KeyError:
+            # 過期或延遲載入的屬性交由 ORM 取值
+            return self._attrs(obj)
+
+    def __call__(self, obj: Any) -> Optional[Dict[str, Any]]:
+        if obj is None:
+            return None
+        row = dict(zip(self._names, self._get(obj)))
+        for name, nested in self._nested:
+            row[name] = nested(row[name])
+        if self._constants:
+            row.update(self._constants)
+        return row
+
+    def many(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        return [self(obj) for obj in objs]
+
+
+async def attach_loaded(
+    items: List[Dict[str, Any]], key: str, target: str, loader: Any, project: Callable[[Any], Any]
+) -> None:
+    """以 DataLoader 載入每個 item[key] 對應的物件，投影後放進 item[target]（同一輪的呼叫合併成一次查詢）"""
+    values = await loader.load_many([item[key] for item in items])
+    for item, value in zip(items, values):
+        item[target] = project(value)
+
+
+def parse_fields(value: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """解析以逗號分隔的欄位清單（fields=、include=）；未指定時回傳 None，有未知欄位時拋出 ValueError"""
+    if value is None:
+        return None
+    allowed = set(allowed)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def sparse_rows(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """把稀疏欄位查詢的資料列轉成 dict；"need.title" 這類加上前綴的標籤輸出成巢狀物件，底線開頭的標籤略過"""
+    rows = list(rows)
+    if not rows:
+        return []
+    flat: List[str] = []
+    nested: Dict[str, List[tuple]] = {}
+    for key in rows[0]._fields:
+        if key.startswith("_"):
+            continue
+        prefix, _, name = key.partition(".")
+        if name:
+            nested.setdefault(prefix, []).append((name, key))
+        else:
+            flat.append(key)
+    result = []
+    for row in rows:
+        mapping = row._mapping
+        item = {key: mapping[key] for key in flat}
+        for prefix, keys in nested.items():
+            item[prefix] = {name: mapping[key] for name, key in keys}
+        result.append(item)
+    return result
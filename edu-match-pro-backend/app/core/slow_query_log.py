@@ -0,0 +1,238 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|:\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """將語句正規化：常值與參數以 ? 取代、IN 清單合併、空白壓縮、轉小寫"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?+)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip().lower()
+
+
+def fingerprint(statement: str) -> str:
+    """正規化語句的短雜湊，用於彙總同一形狀的慢查詢"""
+    return hashlib.md5(normalize_statement(statement).encode("utf-8")).hexdigest()[:12]
+
+
+_FUNCTION_CALL = re.compile(r"([a-z_][a-z0-9_$]*)\s*\(")
+# 後面可以接左括號的 SQL 關鍵字（子查詢、清單、視窗與型別轉換），不是函式呼叫
+_KEYWORDS_BEFORE_PARENS = frozenset({
+    "select", "from", "join", "lateral", "where", "and", "or", "not", "on", "using", "in", "exists", "any", "all",
+    "as", "values", "over", "filter", "within", "by", "when", "then", "else", "case", "union", "except",
+    "intersect", "cast", "extract", "array", "row", "with", "is",
+})
+# 重新執行也不會有副作用或等待鎖的函式；其他函式（nextval、pg_advisory_lock、pg_sleep...）只取估計計畫
+ANALYZE_SAFE_FUNCTIONS = frozenset({
+    "count", "sum", "avg", "min", "max", "coalesce", "nullif", "greatest", "least", "lower", "upper", "left",
+    "length", "abs", "round", "date_trunc", "now", "unnest", "generate_series", "array_agg", "string_agg",
+    "jsonb_agg", "jsonb_object_agg", "jsonb_typeof", "row_number", "rank", "dense_rank",
+})
+
+
+def _can_analyze(statement: str) -> bool:
+    """只有唯讀且只呼叫白名單函式的查詢才執行 EXPLAIN ANALYZE，其他語句只取估計計畫"""
+    head = _STRING_LITERAL.sub("''", statement).lstrip().lower()
+    if not (head.startswith("select") or head.startswith("with")):
+        return False
+    if re.search(r"\b(insert|update|delete)\b|\bfor (update|share|no key update|key share)\b", head):
+        return False
+    functions = set(_FUNCTION_CALL.findall(head)) - _KEYWORDS_BEFORE_PARENS
+    return functions <= ANALYZE_SAFE_FUNCTIONS
+
+
+def parameter_types(parameters: Any) -> List[str]:
+    """參數的型別名稱；紀錄與彙總只保留型別，參數值可能含有個資或密碼雜湊"""
+    return [type(value).__name__ for value in parameters or ()]
+
+
+@dataclass
+class SlowQuery:
+    fingerprint: str
+    statement: str
+    parameter_types: List[str]
+    duration_ms: float
+    rows: int
+    request: str
+    captured_at: str
+    analyzed: bool = False
+    plan: Any = None
+    explain_error: Optional[str] = None
+
+
+class SlowQueryLog:
+    """慢查詢紀錄：請求路徑上只放入環形緩衝區，EXPLAIN 與寫檔由背景工作處理"""
+
+    def __init__(self) -> None:
+        self._pending: Deque[tuple] = deque(maxlen=settings.slow_query_buffer_size)
+        self.recent: Deque[SlowQuery] = deque(maxlen=settings.slow_query_buffer_size)
+        self._explained_at: Dict[str, float] = {}
+        self._engines: Dict[int, AsyncEngine] = {}
+        self._worker: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def record(
+        self, engine: Engine, statement: str, parameters: Any, executemany: bool,
+        duration_ms: float, rows: int, request: str
+    ) -> None:
+        """由 after_cursor_execute 呼叫；只做入列，不做任何 I/O"""
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        # executemany 只保留第一組參數作為取得計畫的樣本
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        parameters = list(parameters or ())
+        capture = SlowQuery(
+            fingerprint=fingerprint(statement),
+            statement=statement,
+            parameter_types=parameter_types(parameters),
+            duration_ms=round(duration_ms, 3),
+            rows=rows,
+            request=request,
+            captured_at=datetime.utcnow().isoformat(),
+        )
+        # 參數值只留在待辦佇列供 EXPLAIN 使用，不寫入紀錄
+        self._pending.append((engine, capture, parameters))
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # 以空白的 context 執行，EXPLAIN 不會被計入觸發它的請求
+        self._worker = loop.create_task(self.drain(), context=contextvars.Context())
+
+    async def flush(self) -> None:
+        """等待背景工作結束並處理剩餘的紀錄（關閉服務與測試時使用）"""
+        if self._worker is not None and not self._worker.done():
+            await self._worker
+        await self.drain()
+
+    async def drain(self) -> None:
+        """處理所有待辦的慢查詢：必要時取得執行計畫，再寫入 JSONL"""
+        captures: List[SlowQuery] = []
+        while self._pending:
+            engine, capture, parameters = self._pending.popleft()
+            await self._explain(engine, capture, parameters)
+            self.recent.append(capture)
+            captures.append(capture)
+        if captures and settings.slow_query_log_path:
+            await asyncio.to_thread(self._write, captures)
+
+    async def _explain(self, engine: Engine, capture: SlowQuery, parameters: List[Any]) -> None:
+        # 同一形狀在間隔內只取一次計畫，避免慢查詢被重複執行
+        now = time.monotonic()
+        last = self._explained_at.get(capture.fingerprint)
+        if last is not None and now - last < settings.slow_query_explain_interval_seconds:
+            return
+        self._explained_at[capture.fingerprint] = now
+
+        analyze = _can_analyze(capture.statement)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        try:
+            async with self._explain_engine(engine).connect() as conn:
+                raw = await conn.get_raw_connection()
+                driver = raw.driver_connection
+                # 直接透過 asyncpg 執行，不觸發 SQLAlchemy 的事件與統計；一律回滾，ANALYZE 不留下副作用
+                transaction = driver.transaction()
+                await transaction.start()
+                try:
+                    # 已經很慢的查詢再執行一次時設定上限，逾時只記錄錯誤
+                    timeout_ms = int(settings.slow_query_explain_timeout_ms)
+                    await driver.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+                    plan = await driver.fetchval(f"EXPLAIN ({options}) {capture.statement}", *parameters)
+                finally:
+                    await transaction.rollback()
+            capture.plan = json.loads(plan) if isinstance(plan, str) else plan
+            capture.analyzed = analyze
+        except Exception as exc:
+            capture.explain_error = f"{type(exc).__name__}: {exc}"
+            logger.debug("EXPLAIN failed for slow query %s", capture.fingerprint, exc_info=True)
+
+    def _explain_engine(self, engine: Engine) -> AsyncEngine:
+        """EXPLAIN 使用的專用引擎：每次另開一條連線，不佔用 API 連線池（同一時間只有背景工作的一條）"""
+        explain_engine = self._engines.get(id(engine))
+        if explain_engine is None:
+            explain_engine = create_async_engine(
+                engine.url, poolclass=NullPool,
+                connect_args={"statement_cache_size": 0, "server_settings": {"application_name": "slow_query_explain"}},
+            )
+            self._engines[id(engine)] = explain_engine
+        return explain_engine
+
+    def _write(self, captures: List[SlowQuery]) -> None:
+        directory = os.path.dirname(settings.slow_query_log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(settings.slow_query_log_path, "a", encoding="utf-8") as f:
+            for capture in captures:
+                f.write(json.dumps(asdict(capture), ensure_ascii=False, default=str) + "\n")
+
+
+slow_query_log = SlowQueryLog()
+
+
+def load_captures(path: str) -> List[Dict[str, Any]]:
+    """讀取 JSONL 慢查詢紀錄，略過無法解析的行"""
+    captures = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                captures.append(json.loads(line))
+            except ValueError:
+                continue
+    return captures
+
+
+def summarize(captures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """依語句指紋彙總：次數、總耗時、p50/p95/最大值，並附上最慢一次的語句、參數型別與計畫"""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for capture in captures:
+        groups.setdefault(capture["fingerprint"], []).append(capture)
+    summary = []
+    for key, items in groups.items():
+        durations = sorted(item["duration_ms"] for item in items)
+        slowest = max(items, key=lambda item: item["duration_ms"])
+        # 最慢的那次可能在計畫節流期間，改用最近一份有計畫的紀錄
+        with_plan = [item for item in items if item.get("plan")]
+        summary.append({
+            "fingerprint": key,
+            "statement": normalize_statement(slowest["statement"]),
+            "count": len(items),
+            "total_ms": round(sum(durations), 3),
+            "p50_ms": durations[len(durations) // 2],
+            "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            "max_ms": durations[-1],
+            "requests": sorted({item.get("request") or "<no request>" for item in items}),
+            "parameter_types": slowest.get("parameter_types"),
+            "plan": slowest.get("plan") or (with_plan[-1]["plan"] if with_plan else None),
+            "last_seen": max(item["captured_at"] for item in items),
+        })
+    summary.sort(key=lambda entry: entry["total_ms"], reverse=True)
+    return summary
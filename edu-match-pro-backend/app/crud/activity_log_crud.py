@@ -1,8 +1,16 @@
+import gzip
+import os
+import re
 import uuid
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import insert, select, text
+from app.core.config import settings
 from app.models.activity_log import ActivityLog, ActivityType
+from app.schemas.activity_log_schemas import ActivityExtraData
+from app.services.activity_log_writer import activity_log_writer
+from app.services.realtime import PUBLIC_TOPIC, activity_event, publish_after_commit, user_topic
 
 
 async def create_activity_log(
@@ -10,21 +18,64 @@ async def create_activity_log(
     user_id: uuid.UUID,
     activity_type: ActivityType,
     description: str,
-    extra_data: Optional[str] = None
+    extra_data: Optional[Dict[str, Any]] = None
 ) -> ActivityLog:
-    """建立活動日誌記錄"""
-    activity_log = ActivityLog(
+    """建立活動日誌記錄，隨呼叫端的交易一併提交（或交由背景寫入器批次寫入）"""
+    activity_log = _build_activity_log(user_id, activity_type, description, extra_data)
+    
+    # 非同步模式在交易提交後才交給寫入器；緩衝區已滿時退回同一交易寫入，不遺失日誌
+    if settings.activity_log_delivery == "async" and activity_log_writer.submit_after_commit(session, activity_log):
+        return activity_log
+    session.add(activity_log)
+    publish_after_commit(
+        session, [user_topic(user_id), PUBLIC_TOPIC], "activity", activity_event(activity_log.model_dump())
+    )
+    return activity_log
+
+
+async def create_activity_logs(session: AsyncSession, entries: Iterable[Dict[str, Any]]) -> List[ActivityLog]:
+    """批次建立活動日誌（每筆含 user_id、activity_type、description、extra_data），以一次多列 INSERT 寫入呼叫端的交易"""
+    activity_logs = [
+        _build_activity_log(entry["user_id"], entry["activity_type"], entry["description"], entry.get("extra_data"))
+        for entry in entries
+    ]
+    rows = []
+    for activity_log in activity_logs:
+        if settings.activity_log_delivery == "async" and activity_log_writer.submit_after_commit(session, activity_log):
+            continue
+        row = activity_log.model_dump()
+        rows.append(row)
+        publish_after_commit(session, [user_topic(row["user_id"]), PUBLIC_TOPIC], "activity", activity_event(row))
+    if rows:
+        await session.execute(insert(ActivityLog.__table__), rows)
+    return activity_logs
+
+
+def _build_activity_log(
+    user_id: uuid.UUID,
+    activity_type: ActivityType,
+    description: str,
+    extra_data: Optional[Dict[str, Any]]
+) -> ActivityLog:
+    return ActivityLog(
         user_id=user_id,
         activity_type=activity_type,
         description=description,
-        extra_data=extra_data
+        # 依已知的鍵驗證後存成 JSON（UUID 轉為字串）
+        extra_data=ActivityExtraData.model_validate(extra_data).model_dump(mode="json") if extra_data else None
     )
-    
-    session.add(activity_log)
-    await session.commit()
-    await session.refresh(activity_log)
-    
-    return activity_log
+
+
+async def _latest_first(session: AsyncSession, query, limit: int) -> List[ActivityLog]:
+    """先只查近期分區，筆數不足時再往更舊的分區補齊（兩段查詢都能做分區裁剪）"""
+    since = datetime.utcnow() - timedelta(days=settings.activity_log_recent_window_days)
+    query = query.order_by(ActivityLog.created_at.desc())
+    result = await session.execute(query.where(ActivityLog.created_at >= since).limit(limit))
+    logs = list(result.scalars().all())
+    if len(logs) < limit:
+        result = await session.execute(query.where(ActivityLog.created_at < since).limit(limit - len(logs)))
+        logs.extend(result.scalars().all())
+    return logs
 
 
 async def get_activity_logs_by_user(
@@ -33,13 +84,7 @@ async def get_activity_logs_by_user(
     limit: int = 20
 ) -> List[ActivityLog]:
     """獲取特定使用者的最近活動記錄"""
-    result = await session.execute(
-        select(ActivityLog)
-        .where(ActivityLog.user_id == user_id)
-        .order_by(ActivityLog.created_at.desc())
-        .limit(limit)
-    )
-    return result.scalars().all()
+    return await _latest_first(session, select(ActivityLog).where(ActivityLog.user_id == user_id), limit)
 
 
 async def get_recent_activity_logs(
@@ -47,9 +92,118 @@ async def get_recent_activity_logs(
     limit: int = 50
 ) -> List[ActivityLog]:
     """獲取最近的活動記錄（公開）"""
-    result = await session.execute(
-        select(ActivityLog)
-        .order_by(ActivityLog.created_at.desc())
-        .limit(limit)
-    )
-    return result.scalars().all()
+    return await _latest_first(session, select(ActivityLog), limit)
+
+
+async def get_activity_logs_by_donation(
+    session: AsyncSession,
+    donation_id: uuid.UUID,
+    limit: int = 50
+) -> List[ActivityLog]:
+    """獲取與特定捐贈相關的活動記錄（extra_data @> 查詢使用 GIN 索引）"""
+    query = select(ActivityLog).where(ActivityLog.extra_data.contains({"donation_id": str(donation_id)}))
+    return await _latest_first(session, query, limit)
+
+
+# --- 月份分區維護 ---
+_PARTITION_NAME = re.compile(r"^activity_log_y(\d{4})m(\d{2})$")
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def activity_log_partition_name(month: date) -> str:
+    return f"activity_log_y{month.year:04d}m{month.month:02d}"
+
+
+async def list_activity_log_partitions(session: AsyncSession) -> List[Tuple[date, str]]:
+    """回傳所有月份分區 (月份, 表名)，依月份排序（不含預設分區）"""
+    result = await session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'activity_log'
+    """))
+    partitions = []
+    for (name,) in result.all():
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+async def create_activity_log_partition(session: AsyncSession, month: date) -> str:
+    """建立指定月份的分區；預設分區中屬於該月的資料會一併搬入"""
+    name = activity_log_partition_name(month)
+    lower, upper = month.isoformat(), _add_months(month, 1).isoformat()
+    # 預設分區若已有該月資料，直接 PARTITION OF 會失敗，改為先建表、搬移資料再掛上
+    await session.execute(text(f"CREATE TABLE {name} (LIKE activity_log INCLUDING DEFAULTS)"))
+    await session.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM activity_log_default
+            WHERE created_at >= '{lower}' AND created_at < '{upper}'
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """))
+    await session.execute(text(
+        f"ALTER TABLE activity_log ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    ))
+    return name
+
+
+async def ensure_activity_log_partitions(session: AsyncSession, months_ahead: Optional[int] = None) -> List[str]:
+    """確保本月與未來 months_ahead 個月的分區都已存在，回傳新建立的分區名稱"""
+    months_ahead = settings.activity_log_partition_months_ahead if months_ahead is None else months_ahead
+    # 多個 worker 同時執行時以交易層級的 advisory lock 排隊，取得鎖後才讀取現有分區，提交時釋放
+    await session.execute(text("SELECT pg_advisory_xact_lock(hashtext('activity_log_partitions'))"))
+    existing = {month for month, _ in await list_activity_log_partitions(session)}
+    today = date.today()
+    current = date(today.year, today.month, 1)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        if month not in existing:
+            created.append(await create_activity_log_partition(session, month))
+    await session.commit()
+    return created
+
+
+async def _export_partition(session: AsyncSession, name: str, archive_dir: str) -> str:
+    """以 COPY 將分區匯出成 gzip 壓縮的 CSV（先寫暫存檔，完成後才更名）"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    tmp_path = f"{path}.tmp"
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    with gzip.open(tmp_path, "wb") as f:
+        async def _write(chunk: bytes) -> None:
+            f.write(chunk)
+        await raw.driver_connection.copy_from_table(name, output=_write, format="csv", header=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+async def archive_activity_log_partitions(
+    session: AsyncSession,
+    retention_months: Optional[int] = None,
+    archive_dir: Optional[str] = None
+) -> List[str]:
+    """將超過保留期限的月份分區匯出成壓縮檔後卸離並刪除，回傳匯出的檔案路徑"""
+    retention_months = settings.activity_log_retention_months if retention_months is None else retention_months
+    archive_dir = archive_dir or settings.activity_log_archive_dir
+    today = date.today()
+    cutoff = _add_months(date(today.year, today.month, 1), -retention_months)
+    archived = []
+    for month, name in await list_activity_log_partitions(session):
+        if month >= cutoff:
+            break
+        archived.append(await _export_partition(session, name, archive_dir))
+        # 匯出成功後才卸離與刪除，每個分區各自提交
+        await session.execute(text(f"ALTER TABLE activity_log DETACH PARTITION {name}"))
+        await session.execute(text(f"DROP TABLE {name}"))
+        await session.commit()
+    return archived
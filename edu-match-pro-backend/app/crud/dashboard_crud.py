@@ -1,51 +1,180 @@
+import json
 import uuid
-import asyncio
-from typing import Dict, Any
+from collections import Counter
+from typing import Dict, Any, Iterable, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, text, String, cast
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.config import settings
 from app.models.need import Need, NeedStatus
 from app.models.donation import Donation, DonationStatus
+from app.models.dashboard_rollup import DashboardRollup
 
 
-async def get_school_dashboard_stats(session: AsyncSession, school_id: uuid.UUID) -> Dict[str, Any]:
-    """獲取學校儀表板統計數據"""
-    
-    # 並行查詢所有統計數據
-    total_needs_result, active_needs_result, completed_needs_result, students_benefited_result = await asyncio.gather(
-        # 查詢總需求數
-        session.execute(
-            select(func.count(Need.id)).where(Need.school_id == school_id)
-        ),
-        # 查詢活躍需求數
-        session.execute(
-            select(func.count(Need.id)).where(
-                Need.school_id == school_id,
-                Need.status == NeedStatus.active
-            )
-        ),
-        # 查詢已完成需求數
-        session.execute(
-            select(func.count(Need.id)).where(
-                Need.school_id == school_id,
-                Need.status == NeedStatus.completed
-            )
+# 以增量方式累加彙總表；sdg_contributions 以 jsonb 逐鍵相加，計數歸零的鍵會被移除
+_ADJUST_ROLLUP_SQL = text("""
+    INSERT INTO dashboard_rollup (
+        user_id, total_needs, active_needs, completed_needs, students_benefited,
+        completed_projects, students_helped, sdg_contributions, updated_at
+    )
+    VALUES (
+        :user_id, :total_needs, :active_needs, :completed_needs, :students_benefited,
+        :completed_projects, :students_helped, CAST(:sdg_contributions AS jsonb), now() AT TIME ZONE 'utc'
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_needs = dashboard_rollup.total_needs + EXCLUDED.total_needs,
+        active_needs = dashboard_rollup.active_needs + EXCLUDED.active_needs,
+        completed_needs = dashboard_rollup.completed_needs + EXCLUDED.completed_needs,
+        students_benefited = dashboard_rollup.students_benefited + EXCLUDED.students_benefited,
+        completed_projects = dashboard_rollup.completed_projects + EXCLUDED.completed_projects,
+        students_helped = dashboard_rollup.students_helped + EXCLUDED.students_helped,
+        sdg_contributions = (
+            SELECT COALESCE(jsonb_object_agg(key, total), '{}'::jsonb)
+            FROM (
+                SELECT key, SUM(value::int) AS total
+                FROM (
+                    SELECT * FROM jsonb_each_text(dashboard_rollup.sdg_contributions)
+                    UNION ALL
+                    SELECT * FROM jsonb_each_text(EXCLUDED.sdg_contributions)
+                ) AS merged
+                GROUP BY key
+                HAVING SUM(value::int) <> 0
+            ) AS totals
         ),
-        # 查詢受益學生數（已完成需求的學生數總和）
-        session.execute(
-            select(func.coalesce(func.sum(Need.student_count), 0)).where(
-                Need.school_id == school_id,
-                Need.status == NeedStatus.completed
-            )
+        updated_at = EXCLUDED.updated_at
+""")
+
+# 以集合運算重建所有使用者的彙總數據
+_REBUILD_ROLLUP_SQL = (
+    text("DELETE FROM dashboard_rollup"),
+    text("""
+        INSERT INTO dashboard_rollup (
+            user_id, total_needs, active_needs, completed_needs, students_benefited,
+            completed_projects, students_helped, sdg_contributions, updated_at
+        )
+        SELECT
+            school_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE status = 'active'),
+            COUNT(*) FILTER (WHERE status = 'completed'),
+            COALESCE(SUM(student_count) FILTER (WHERE status = 'completed'), 0),
+            0, 0, '{}'::jsonb, now() AT TIME ZONE 'utc'
+        FROM need
+        GROUP BY school_id
+    """),
+    text("""
+        INSERT INTO dashboard_rollup (
+            user_id, total_needs, active_needs, completed_needs, students_benefited,
+            completed_projects, students_helped, sdg_contributions, updated_at
         )
+        SELECT
+            totals.company_id, 0, 0, 0, 0,
+            totals.completed_projects, totals.students_helped,
+            COALESCE(sdgs.contributions, '{}'::jsonb), now() AT TIME ZONE 'utc'
+        FROM (
+            SELECT
+                d.company_id,
+                COUNT(*) FILTER (WHERE d.status = 'completed') AS completed_projects,
+                COALESCE(SUM(n.student_count) FILTER (WHERE d.status = 'completed'), 0) AS students_helped
+            FROM donation d
+            JOIN need n ON n.id = d.need_id
+            GROUP BY d.company_id
+        ) AS totals
+        LEFT JOIN (
+            SELECT company_id, jsonb_object_agg(sdg::text, contribution) AS contributions
+            FROM (
+                SELECT d.company_id, s.sdg, COUNT(*) AS contribution
+                FROM donation d
+                JOIN need n ON n.id = d.need_id
+                CROSS JOIN LATERAL unnest(n.sdgs) AS s(sdg)
+                GROUP BY d.company_id, s.sdg
+            ) AS per_sdg
+            GROUP BY company_id
+        ) AS sdgs ON sdgs.company_id = totals.company_id
+        ON CONFLICT (user_id) DO NOTHING
+    """),
+)
+
+
+def school_rollup_delta(
+    before: Optional[Tuple[Any, int]], after: Optional[Tuple[Any, int]]
+) -> Dict[str, int]:
+    """計算需求由 before 變為 after 時學校彙總的變化量，參數為 (status, student_count)"""
+    def contribution(snapshot: Optional[Tuple[Any, int]]) -> Counter:
+        if snapshot is None:
+            return Counter()
+        need_status, student_count = snapshot
+        completed = need_status == NeedStatus.completed
+        return Counter({
+            "total_needs": 1,
+            "active_needs": int(need_status == NeedStatus.active),
+            "completed_needs": int(completed),
+            "students_benefited": (student_count or 0) if completed else 0,
+        })
+
+    delta = contribution(after)
+    delta.subtract(contribution(before))
+    return {key: value for key, value in delta.items() if value}
+
+
+def sdg_delta(sdgs: Optional[Iterable[int]], sign: int = 1) -> Dict[str, int]:
+    """將需求的 SDG 清單轉為企業 SDG 貢獻的變化量"""
+    return {str(sdg): sign * count for sdg, count in Counter(sdgs or []).items()}
+
+
+async def adjust_dashboard_rollup(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    sdg_contributions: Optional[Dict[str, int]] = None,
+    **deltas: int
+) -> None:
+    """在呼叫端的交易中累加使用者的彙總數據（不 commit）"""
+    if not settings.dashboard_rollups_enabled:
+        return
+    if not sdg_contributions and not any(deltas.values()):
+        return
+    params = {
+        "total_needs": 0,
+        "active_needs": 0,
+        "completed_needs": 0,
+        "students_benefited": 0,
+        "completed_projects": 0,
+        "students_helped": 0,
+    }
+    params.update(deltas)
+    await session.execute(
+        _ADJUST_ROLLUP_SQL,
+        {**params, "user_id": user_id, "sdg_contributions": json.dumps(sdg_contributions or {})},
+    )
+
+
+async def rebuild_dashboard_rollups(session: AsyncSession) -> int:
+    """從需求與捐贈資料完整重建彙總表，回傳重建的使用者數"""
+    for statement in _REBUILD_ROLLUP_SQL:
+        await session.execute(statement)
+    count = (await session.execute(select(func.count()).select_from(DashboardRollup))).scalar_one()
+    await session.commit()
+    return count
+
+
+async def _get_rollup(session: AsyncSession, user_id: uuid.UUID) -> Optional[DashboardRollup]:
+    if not settings.dashboard_rollups_enabled:
+        return None
+    return await session.get(DashboardRollup, user_id, populate_existing=True)
+
+
+async def _query_school_stats(session: AsyncSession, school_id: uuid.UUID) -> Dict[str, Any]:
+    """以單一 FILTER 查詢即時計算學校統計"""
+    completed = Need.status == NeedStatus.completed
+    result = await session.execute(
+        select(
+            func.count(Need.id),
+            func.count(Need.id).filter(Need.status == NeedStatus.active),
+            func.count(Need.id).filter(completed),
+            func.coalesce(func.sum(Need.student_count).filter(completed), 0),
+        ).where(Need.school_id == school_id)
     )
-    
-    # 提取結果
-    total_needs = total_needs_result.scalar() or 0
-    active_needs = active_needs_result.scalar() or 0
-    completed_needs = completed_needs_result.scalar() or 0
-    students_benefited = students_benefited_result.scalar() or 0
-    
+    total_needs, active_needs, completed_needs, students_benefited = result.one()
     return {
         "totalNeeds": total_needs,
         "activeNeeds": active_needs,
@@ -54,52 +183,72 @@ async def get_school_dashboard_stats(session: AsyncSession, school_id: uuid.UUID
     }
 
 
-async def get_company_dashboard_stats(session: AsyncSession, company_id: uuid.UUID) -> Dict[str, Any]:
-    """獲取企業儀表板統計數據"""
-    
-    # 並行查詢所有統計數據
-    completed_projects_result, students_helped_result, sdg_contributions_result = await asyncio.gather(
-        # 查詢已完成專案數
-        session.execute(
-            select(func.count(Donation.id)).where(
-                Donation.company_id == company_id,
-                Donation.status == DonationStatus.completed
-            )
-        ),
-        # 查詢幫助的學生數（已完成捐贈對應的需求學生數總和）
-        session.execute(
-            select(func.coalesce(func.sum(Need.student_count), 0))
-            .select_from(Donation)
-            .join(Need, Donation.need_id == Need.id)
-            .where(
-                Donation.company_id == company_id,
-                Donation.status == DonationStatus.completed
-            )
-        ),
-        # 查詢 SDG 貢獻統計
-        session.execute(
-            select(Need.sdgs)
-            .select_from(Donation)
-            .join(Need, Donation.need_id == Need.id)
-            .where(Donation.company_id == company_id)
+async def _query_company_stats(session: AsyncSession, company_id: uuid.UUID) -> Dict[str, Any]:
+    """以單一 FILTER 查詢即時計算企業統計，SDG 貢獻以子查詢在資料庫端彙總"""
+    completed = Donation.status == DonationStatus.completed
+    donated_sdgs = (
+        select(func.unnest(Need.sdgs).label("sdg"))
+        .select_from(Donation)
+        .join(Need, Donation.need_id == Need.id)
+        .where(Donation.company_id == company_id)
+        .correlate(None)
+        .subquery()
+    )
+    per_sdg = (
+        select(cast(donated_sdgs.c.sdg, String).label("sdg"), func.count().label("contribution"))
+        .group_by(donated_sdgs.c.sdg)
+        .subquery()
+    )
+    sdg_contributions = (
+        select(func.coalesce(
+            func.jsonb_object_agg(per_sdg.c.sdg, per_sdg.c.contribution), text("'{}'::jsonb"), type_=JSONB
+        ))
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        select(
+            func.count(Donation.id).filter(completed),
+            func.coalesce(func.sum(Need.student_count).filter(completed), 0),
+            sdg_contributions,
         )
+        .select_from(Donation)
+        .join(Need, Donation.need_id == Need.id)
+        .where(Donation.company_id == company_id)
     )
-    
-    # 提取結果
-    completed_projects = completed_projects_result.scalar() or 0
-    students_helped = students_helped_result.scalar() or 0
-    
-    # 處理 SDG 貢獻統計
-    sdg_contributions = {}
-    sdg_results = sdg_contributions_result.scalars().all()
-    for sdg_list in sdg_results:
-        for sdg in sdg_list:
-            sdg_contributions[str(sdg)] = sdg_contributions.get(str(sdg), 0) + 1
-    
+    completed_projects, students_helped, contributions = result.one()
     return {
         "completedProjects": completed_projects,
         "studentsHelped": students_helped,
         "totalDonation": 0,  # 暫時回傳模擬數據
         "volunteerHours": 0,  # 暫時回傳模擬數據
-        "sdgContributions": sdg_contributions
+        "sdgContributions": contributions or {}
+    }
+
+
+async def get_school_dashboard_stats(session: AsyncSession, school_id: uuid.UUID) -> Dict[str, Any]:
+    """獲取學校儀表板統計數據"""
+    # 優先讀取彙總表；尚無彙總資料時改以單一查詢即時計算
+    rollup = await _get_rollup(session, school_id)
+    if rollup is None:
+        return await _query_school_stats(session, school_id)
+    return {
+        "totalNeeds": rollup.total_needs,
+        "activeNeeds": rollup.active_needs,
+        "completedNeeds": rollup.completed_needs,
+        "studentsBenefited": rollup.students_benefited
+    }
+
+
+async def get_company_dashboard_stats(session: AsyncSession, company_id: uuid.UUID) -> Dict[str, Any]:
+    """獲取企業儀表板統計數據"""
+    # 優先讀取彙總表；尚無彙總資料時改以單一查詢即時計算
+    rollup = await _get_rollup(session, company_id)
+    if rollup is None:
+        return await _query_company_stats(session, company_id)
+    return {
+        "completedProjects": rollup.completed_projects,
+        "studentsHelped": rollup.students_helped,
+        "totalDonation": 0,  # 暫時回傳模擬數據
+        "volunteerHours": 0,  # 暫時回傳模擬數據
+        "sdgContributions": dict(rollup.sdg_contributions or {})
     }
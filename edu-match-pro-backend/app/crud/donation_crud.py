@@ -1,34 +1,50 @@
 import uuid
+from collections import Counter
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Select, insert, select, update
 from sqlalchemy.orm import selectinload
 from app.models.donation import Donation, DonationStatus
 from app.models.need import Need, NeedStatus
+from app.models.user import UserRole
 from app.models.activity_log import ActivityType
-from app.schemas.donation_schemas import DonationCreate
-from app.crud.activity_log_crud import create_activity_log
+from app.schemas.donation_schemas import DonationBundleCreate, DonationBundleMode, DonationCreate
+from app.crud.activity_log_crud import create_activity_log, create_activity_logs
+from app.crud.dashboard_crud import adjust_dashboard_rollup, school_rollup_delta, sdg_delta
+from app.crud.need_crud import need_columns
+from app.services.realtime import publish_after_commit, user_topic
+from app.services.recommendation_engine import recommendation_engine
 
 
 async def create_donation(session: AsyncSession, donation_in: DonationCreate, company_id: uuid.UUID) -> Optional[Donation]:
-    """建立新的捐贈專案"""
-    # 查詢關聯的 Need，使用 with_for_update 來鎖定記錄
-    need_result = await session.execute(
-        select(Need).where(Need.id == donation_in.need_id).with_for_update()
-    )
-    need = need_result.scalar_one_or_none()
-    
-    # 檢查 Need 是否存在
-    if not need:
-        return None
-    
-    # 檢查 Need 狀態是否為 active
-    if need.status != NeedStatus.active:
+    """建立新的捐贈專案；需求不存在或已被認捐時回傳 None"""
+    if not await _claim_need(session, donation_in.need_id):
         return None
-    
-    # 更新 Need 狀態為 in_progress
-    need.status = NeedStatus.in_progress
+    need = await session.get(Need, donation_in.need_id, populate_existing=True)
+    return await _record_donation(session, need, donation_in, company_id)
+
+
+async def _claim_need(session: AsyncSession, need_id: uuid.UUID) -> bool:
+    """以單一條件式 UPDATE 將 active 的需求改為 in_progress，回傳是否認領成功"""
+    # 列被其他交易鎖定（競爭的認捐、學校正在編輯、組合認捐）時等待鎖釋放，
+    # PostgreSQL 取得鎖後以最新的列重新檢查 status（READ COMMITTED），只有狀態確實改變才認領失敗；
+    # 失敗路徑使用 Core 語句，避免 ORM 批次更新的額外開銷
+    need_table = Need.__table__
+    result = await session.execute(
+        update(need_table)
+        .where(need_table.c.id == need_id, need_table.c.status == NeedStatus.active)
+        .values(status=NeedStatus.in_progress, updated_at=datetime.utcnow())
+        .returning(need_table.c.id)
+    )
+    return result.first() is not None
+
+
+async def _record_donation(
+    session: AsyncSession, need: Need, donation_in: DonationCreate, company_id: uuid.UUID
+) -> Donation:
+    """為已認領（狀態已改為 in_progress）的需求建立捐贈、彙總與活動日誌並提交"""
+    before = (NeedStatus.active, need.student_count)
     
     # 建立新的 Donation 物件
     db_donation = Donation(
@@ -43,17 +59,19 @@ async def create_donation(session: AsyncSession, donation_in: DonationCreate, co
     # 將 Donation 物件加入 session
     session.add(db_donation)
     
-    # 提交交易
-    await session.commit()
-    await session.refresh(db_donation)
+    # 在同一交易中更新學校與企業的儀表板彙總
+    await adjust_dashboard_rollup(
+        session, need.school_id, **school_rollup_delta(before, (need.status, need.student_count))
+    )
+    await adjust_dashboard_rollup(session, company_id, sdg_contributions=sdg_delta(need.sdgs))
     
-    # 記錄活動日誌 - 為企業和學校都記錄
+    # 記錄活動日誌 - 為企業和學校都記錄（與捐贈同一次提交）
     await create_activity_log(
         session=session,
         user_id=company_id,
         activity_type=ActivityType.donation_created,
         description=f"企業認捐了需求：{need.title}",
-        extra_data=f'{{"donation_id": "{db_donation.id}", "need_id": "{need.id}"}}'
+        extra_data={"donation_id": db_donation.id, "need_id": need.id}
     )
     
     await create_activity_log(
@@ -61,14 +79,128 @@ async def create_donation(session: AsyncSession, donation_in: DonationCreate, co
         user_id=need.school_id,
         activity_type=ActivityType.donation_created,
         description=f"需求被企業認捐：{need.title}",
-        extra_data=f'{{"donation_id": "{db_donation.id}", "need_id": "{need.id}"}}'
+        extra_data={"donation_id": db_donation.id, "need_id": need.id}
     )
     
+    # 提交交易
+    await session.commit()
+    await session.refresh(db_donation)
+    
+    # 更新推薦引擎：累積企業偏好並移除已被認捐的需求
+    recommendation_engine.on_donation_created(company_id, need)
+    
     return db_donation
 
 
-async def get_donations_by_company(session: AsyncSession, company_id: uuid.UUID) -> List[Donation]:
-    """獲取特定企業的所有捐贈專案"""
+async def create_donation_bundle(
+    session: AsyncSession, bundle_in: DonationBundleCreate, company_id: uuid.UUID
+) -> Tuple[List[Donation], List[uuid.UUID]]:
+    """在單一交易中認捐多筆需求，回傳 (建立的捐贈, 無法認捐的需求 ID)；all_or_nothing 模式下只要有需求無法認捐就不寫入任何資料"""
+    need_ids = sorted(set(bundle_in.need_ids))
+    # 依 id 排序取得列鎖：重疊的組合認捐以相同順序上鎖，只會互相等待而不會死結；
+    # best_effort 模式略過正被其他交易認捐的需求，不等待鎖
+    query = (
+        select(Need)
+        .where(Need.id.in_(need_ids), Need.status == NeedStatus.active)
+        .order_by(Need.id)
+        .with_for_update(skip_locked=bundle_in.mode == DonationBundleMode.best_effort)
+    )
+    needs = list((await session.execute(query)).scalars().all())
+    claimed = {need.id for need in needs}
+    unavailable = [need_id for need_id in need_ids if need_id not in claimed]
+    if not needs or (unavailable and bundle_in.mode == DonationBundleMode.all_or_nothing):
+        # 立即釋放已取得的列鎖，不讓其他認捐等到請求結束
+        await session.rollback()
+        return [], unavailable
+    
+    await session.execute(
+        update(Need)
+        .where(Need.id.in_(claimed))
+        .values(status=NeedStatus.in_progress, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session="evaluate")
+    )
+    
+    # 捐贈與活動日誌各以一次多列 INSERT 寫入
+    donations = [
+        Donation(
+            company_id=company_id,
+            need_id=need.id,
+            donation_type=bundle_in.donation_type,
+            description=bundle_in.description,
+            status=DonationStatus.in_progress,
+            progress=0
+        )
+        for need in needs
+    ]
+    await session.execute(insert(Donation.__table__), [donation.model_dump() for donation in donations])
+    
+    # 每所學校與企業的彙總各更新一次（同樣依 id 排序）
+    school_deltas: Dict[uuid.UUID, Counter] = {}
+    sdg_contributions: Counter = Counter()
+    for need in needs:
+        school_deltas.setdefault(need.school_id, Counter()).update(
+            school_rollup_delta((NeedStatus.active, need.student_count), (NeedStatus.in_progress, need.student_count))
+        )
+        sdg_contributions.update(sdg_delta(need.sdgs))
+    for school_id in sorted(school_deltas):
+        await adjust_dashboard_rollup(session, school_id, **school_deltas[school_id])
+    await adjust_dashboard_rollup(session, company_id, sdg_contributions=dict(sdg_contributions))
+    
+    entries = []
+    for need, donation in zip(needs, donations):
+        extra_data = {"donation_id": donation.id, "need_id": need.id}
+        entries.append({
+            "user_id": company_id, "activity_type": ActivityType.donation_created,
+            "description": f"企業認捐了需求：{need.title}", "extra_data": extra_data
+        })
+        entries.append({
+            "user_id": need.school_id, "activity_type": ActivityType.donation_created,
+            "description": f"需求被企業認捐：{need.title}", "extra_data": extra_data
+        })
+    await create_activity_logs(session, entries)
+    
+    await session.commit()
+    
+    for need in needs:
+        recommendation_engine.on_donation_created(company_id, need)
+    
+    return donations, unavailable
+
+
+# 稀疏欄位（fields=）：回應欄位名稱對應的資料庫欄位
+DONATION_COLUMNS: Dict[str, Any] = {
+    "id": Donation.id,
+    "need_id": Donation.need_id,
+    "company_id": Donation.company_id,
+    "donation_type": Donation.donation_type,
+    "description": Donation.description,
+    "progress": Donation.progress,
+    "status": Donation.status,
+    "donation_date": Donation.created_at,
+    "completion_date": Donation.completion_date,
+}
+
+
+async def get_donations_by_company(
+    session: AsyncSession,
+    company_id: uuid.UUID,
+    fields: Optional[Sequence[str]] = None,
+    need_fields: Optional[Sequence[str]] = None
+) -> List[Any]:
+    """獲取特定企業的所有捐贈專案
+
+    fields 與 need_fields 皆為 None 時載入完整的 Donation 與 Need；否則只選取指定欄位（一律加上 id），
+    need_fields 不為 None 時 JOIN 需求並以 "need." 為標籤前綴，回傳資料列。
+    """
+    if fields is not None or need_fields is not None:
+        names = dict.fromkeys(["id", *(DONATION_COLUMNS if fields is None else fields)])
+        query = select(*(DONATION_COLUMNS[name].label(name) for name in names))
+        if need_fields is not None:
+            query = query.join(Need, Need.id == Donation.need_id).add_columns(*need_columns(need_fields, "need."))
+        result = await session.execute(
+            query.where(Donation.company_id == company_id).order_by(Donation.created_at.desc())
+        )
+        return result.all()
     result = await session.execute(
         select(Donation)
         .where(Donation.company_id == company_id)
@@ -80,6 +212,18 @@ async def get_donations_by_company(session: AsyncSession, company_id: uuid.UUID)
     return result.scalars().all()
 
 
+def donation_export_query(user_id: uuid.UUID, role: UserRole) -> Select:
+    """匯出捐贈的查詢：企業為自己的捐贈，學校為自己需求收到的捐贈（依捐贈日期排序）"""
+    query = select(
+        Donation.id, Donation.need_id, Need.title.label("need_title"), Need.category.label("need_category"),
+        Need.school_id, Donation.company_id, Donation.donation_type, Donation.description, Donation.progress,
+        Donation.status, Donation.created_at.label("donation_date"), Donation.completion_date
+    ).join(Need, Need.id == Donation.need_id).order_by(Donation.created_at, Donation.id)
+    if role == UserRole.COMPANY:
+        return query.where(Donation.company_id == user_id)
+    return query.where(Need.school_id == user_id)
+
+
 async def get_donation_by_id(session: AsyncSession, donation_id: uuid.UUID) -> Optional[Donation]:
     """根據 ID 獲取捐贈專案"""
     result = await session.execute(
@@ -105,12 +249,31 @@ async def update_donation_progress(session: AsyncSession, donation_id: uuid.UUID
     
     # 更新進度
     donation.progress = progress
+    need = await session.get(Need, donation.need_id)
     
     # 如果進度達到 100%，標記為完成
     if progress >= 100:
+        if donation.status != DonationStatus.completed:
+            await adjust_dashboard_rollup(
+                session, donation.company_id,
+                completed_projects=1,
+                students_helped=need.student_count if need else 0
+            )
         donation.status = DonationStatus.completed
         donation.completion_date = datetime.utcnow()
     
+    # 提交後推播給企業與學校
+    topics = [user_topic(donation.company_id)]
+    if need is not None:
+        topics.append(user_topic(need.school_id))
+    publish_after_commit(session, topics, "donation.progress", {
+        "donation_id": donation.id,
+        "need_id": donation.need_id,
+        "progress": donation.progress,
+        "status": donation.status,
+        "completion_date": donation.completion_date,
+    })
+    
     await session.commit()
     await session.refresh(donation)
     
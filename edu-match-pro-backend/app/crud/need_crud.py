@@ -1,11 +1,38 @@
 import uuid
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.need import Need
+from collections import Counter
+from sqlalchemy import Select, func, select, tuple_
+from app.core.pagination import encode_cursor
+from app.models.need import Need, NeedStatus, UrgencyLevel
+from app.models.donation import Donation, DonationStatus
 from app.models.activity_log import ActivityType
-from app.schemas.need_schemas import NeedCreate, NeedUpdate
+from app.schemas.need_schemas import NeedCreate, NeedPublic, NeedUpdate
 from app.crud.activity_log_crud import create_activity_log
+from app.crud.dashboard_crud import adjust_dashboard_rollup, school_rollup_delta, sdg_delta
+from app.services.recommendation_engine import recommendation_engine
+from app.services.search_index import search_index
+
+
+# 卡片列表用的描述摘要長度
+NEED_SNIPPET_LENGTH = 120
+
+# 稀疏欄位（fields=）：回應欄位名稱對應的資料庫欄位，未要求的欄位不會從資料庫取出
+NEED_COLUMNS: Dict[str, Any] = {
+    **{name: getattr(Need, name) for name in NeedPublic.model_fields if name in Need.__table__.columns},
+    "description_snippet": func.left(Need.description, NEED_SNIPPET_LENGTH),
+}
+
+
+def need_columns(fields: Sequence[str], prefix: str = "") -> List[Any]:
+    """指定欄位（一律加上 id）的資料庫欄位，標籤可加上前綴（例如 "need."）"""
+    return [NEED_COLUMNS[name].label(prefix + name) for name in dict.fromkeys(["id", *fields])]
+
+
+def need_select(fields: Optional[Sequence[str]] = None) -> Select:
+    """fields 為 None 時載入完整的 Need；否則只選取指定欄位"""
+    return select(Need) if fields is None else select(*need_columns(fields))
 
 
 async def create_need(session: AsyncSession, need_in: NeedCreate, school_id: uuid.UUID) -> Need:
@@ -18,25 +45,34 @@ async def create_need(session: AsyncSession, need_in: NeedCreate, school_id: uui
         category=need_in.category,
         location=need_in.location,
         student_count=need_in.student_count,
+        estimated_cost=need_in.estimated_cost,
         image_url=need_in.image_url,
         urgency=need_in.urgency,
         sdgs=need_in.sdgs
     )
     
-    # 將需求加入 session 並提交
+    # 將需求加入 session，並在同一交易中更新學校的儀表板彙總
     session.add(db_need)
-    await session.commit()
-    await session.refresh(db_need)
+    await adjust_dashboard_rollup(
+        session, school_id, **school_rollup_delta(None, (db_need.status, db_need.student_count))
+    )
     
-    # 記錄活動日誌
+    # 記錄活動日誌（與需求同一次提交）
     await create_activity_log(
         session=session,
         user_id=school_id,
         activity_type=ActivityType.need_created,
         description=f"建立了新需求：{db_need.title}",
-        extra_data=f'{{"need_id": "{db_need.id}"}}'
+        extra_data={"need_id": db_need.id}
     )
     
+    await session.commit()
+    await session.refresh(db_need)
+    
+    # 同步推薦引擎的特徵矩陣與全文檢索索引
+    recommendation_engine.on_need_saved(db_need)
+    search_index.on_need_saved(db_need)
+    
     return db_need
 
 
@@ -46,43 +82,209 @@ async def get_need_by_id(session: AsyncSession, need_id: uuid.UUID) -> Optional[
     return result.scalar_one_or_none()
 
 
-async def get_needs_by_school(session: AsyncSession, school_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[Need]:
-    """獲取特定學校的所有需求"""
+async def get_alternative_needs(
+    session: AsyncSession,
+    company_id: uuid.UUID,
+    claimed: Need,
+    limit: int = 5
+) -> List[Need]:
+    """為認捐失敗的企業挑選其他仍可認捐的需求：推薦引擎已載入時依推薦排序，不足時補上同類別的最新需求"""
+    needs: List[Need] = []
+    # 失敗路徑必須快速回應，不在此觸發推薦矩陣的完整重建
+    if recommendation_engine.is_loaded:
+        ranked = [
+            need_id for need_id, _ in recommendation_engine.recommend(company_id, limit + 1)
+            if need_id != claimed.id
+        ]
+        if ranked:
+            result = await session.execute(
+                select(Need).where(Need.id.in_(ranked), Need.status == NeedStatus.active)
+            )
+            by_id = {need.id: need for need in result.scalars().all()}
+            needs = [by_id[need_id] for need_id in ranked if need_id in by_id][:limit]
+    if len(needs) < limit:
+        result = await session.execute(
+            select(Need)
+            .where(
+                Need.status == NeedStatus.active,
+                Need.category == claimed.category,
+                Need.id.notin_([claimed.id, *(need.id for need in needs)])
+            )
+            .order_by(Need.created_at.desc())
+            .limit(limit - len(needs))
+        )
+        needs.extend(result.scalars().all())
+    return needs
+
+
+def _filter_needs(
+    query,
+    status: Optional[NeedStatus] = None,
+    category: Optional[str] = None,
+    urgency: Optional[UrgencyLevel] = None,
+    location: Optional[str] = None,
+    sdgs: Optional[List[int]] = None
+):
+    """套用需求列表的篩選條件"""
+    if status is not None:
+        query = query.where(Need.status == status)
+    if category is not None:
+        query = query.where(Need.category == category)
+    if urgency is not None:
+        query = query.where(Need.urgency == urgency)
+    if location:
+        # 前綴比對，例如 "花蓮縣" 可找到 "花蓮縣秀林鄉"
+        query = query.where(Need.location.startswith(location, autoescape=True))
+    if sdgs:
+        # 需求的 SDG 與條件有任一重疊即符合
+        query = query.where(Need.sdgs.overlap(sdgs))
+    return query
+
+
+async def _paginate_needs(
+    session: AsyncSession,
+    query,
+    cursor: Optional[Tuple[datetime, uuid.UUID]],
+    limit: int,
+    fields: Optional[Sequence[str]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """以 (created_at, id) 進行 keyset 分頁，回傳 (需求列表, 下一頁游標)；指定 fields 時列表為資料列"""
+    if cursor is not None:
+        query = query.where(tuple_(Need.created_at, Need.id) < tuple_(*cursor))
+    if fields is not None:
+        # 游標需要最後一筆的 created_at
+        query = query.add_columns(Need.created_at.label("_cursor_created_at"))
     result = await session.execute(
-        select(Need)
-        .where(Need.school_id == school_id)
-        .offset(skip)
-        .limit(limit)
-        .order_by(Need.created_at.desc())
+        query
+        .order_by(Need.created_at.desc(), Need.id.desc())
+        .limit(limit + 1)
     )
-    return result.scalars().all()
+    needs = list(result.scalars().all() if fields is None else result.all())
+    next_cursor = None
+    if len(needs) > limit:
+        needs = needs[:limit]
+        last = needs[-1]
+        created_at = last.created_at if fields is None else last._cursor_created_at
+        next_cursor = encode_cursor(created_at, last.id)
+    return needs, next_cursor
 
 
-async def get_all_needs(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[Need]:
-    """獲取所有需求"""
-    result = await session.execute(
-        select(Need)
-        .offset(skip)
-        .limit(limit)
-        .order_by(Need.created_at.desc())
+async def get_needs_by_school(
+    session: AsyncSession,
+    school_id: uuid.UUID,
+    cursor: Optional[Tuple[datetime, uuid.UUID]] = None,
+    limit: int = 100,
+    status: Optional[NeedStatus] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """獲取特定學校的需求（keyset 分頁）；指定 fields 時只選取這些欄位"""
+    query = _filter_needs(need_select(fields).where(Need.school_id == school_id), status=status)
+    return await _paginate_needs(session, query, cursor, limit, fields)
+
+
+async def get_all_needs(
+    session: AsyncSession,
+    cursor: Optional[Tuple[datetime, uuid.UUID]] = None,
+    limit: int = 100,
+    status: Optional[NeedStatus] = None,
+    category: Optional[str] = None,
+    urgency: Optional[UrgencyLevel] = None,
+    location: Optional[str] = None,
+    sdgs: Optional[List[int]] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """獲取需求列表（可篩選，keyset 分頁）；指定 fields 時只選取這些欄位"""
+    query = _filter_needs(need_select(fields), status, category, urgency, location, sdgs)
+    return await _paginate_needs(session, query, cursor, limit, fields)
+
+
+def need_export_query(
+    status: Optional[NeedStatus] = None,
+    category: Optional[str] = None,
+    urgency: Optional[UrgencyLevel] = None,
+    location: Optional[str] = None,
+    sdgs: Optional[List[int]] = None
+) -> Select:
+    """匯出需求的查詢（欄位同 NeedPublic，依建立時間排序）"""
+    query = select(*Need.__table__.columns).order_by(Need.created_at, Need.id)
+    return _filter_needs(query, status, category, urgency, location, sdgs)
+
+
+async def get_allocation_candidates(session: AsyncSession, categories: Optional[List[str]] = None) -> List[Any]:
+    """獲取可供預算配置的 active 需求（需有預估金額）"""
+    query = select(
+        Need.id, Need.title, Need.category, Need.location,
+        Need.student_count, Need.estimated_cost
+    ).where(
+        Need.status == NeedStatus.active,
+        Need.estimated_cost > 0
     )
-    return result.scalars().all()
+    if categories:
+        query = query.where(Need.category.in_(categories))
+    result = await session.execute(query)
+    return result.all()
 
 
 async def update_need(session: AsyncSession, db_need: Need, need_in: NeedUpdate) -> Need:
     """更新需求"""
+    before = (db_need.status, db_need.student_count)
+    old_sdgs = list(db_need.sdgs or [])
+    
     # 遍歷 need_in 中的欄位，如果值不是 None，則更新 db_need 物件
     update_data = need_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_need, field, value)
+    db_need.updated_at = datetime.utcnow()
+    
+    # 在同一交易中更新儀表板彙總
+    await adjust_dashboard_rollup(
+        session, db_need.school_id,
+        **school_rollup_delta(before, (db_need.status, db_need.student_count))
+    )
+    await _adjust_company_rollups(session, db_need, old_sdgs, before[1])
     
     # 提交變更到資料庫
     await session.commit()
     await session.refresh(db_need)
+    
+    # 同步推薦引擎的特徵矩陣與全文檢索索引
+    recommendation_engine.on_need_saved(db_need)
+    search_index.on_need_saved(db_need)
     return db_need
 
 
+async def _adjust_company_rollups(
+    session: AsyncSession, db_need: Need, old_sdgs: List[int], old_student_count: int
+) -> None:
+    """需求的 SDG 或學生數變更時，同步已認捐企業的儀表板彙總"""
+    new_sdgs = list(db_need.sdgs or [])
+    sdgs_changed = Counter(old_sdgs) != Counter(new_sdgs)
+    students_changed = (db_need.student_count or 0) - (old_student_count or 0)
+    if not sdgs_changed and not students_changed:
+        return
+    
+    result = await session.execute(
+        select(Donation.company_id, Donation.status).where(Donation.need_id == db_need.id)
+    )
+    contributions = Counter(sdg_delta(new_sdgs))
+    contributions.subtract(sdg_delta(old_sdgs))
+    changed_sdgs = {sdg: count for sdg, count in contributions.items() if count}
+    for company_id, donation_status in result.all():
+        completed = donation_status == DonationStatus.completed
+        await adjust_dashboard_rollup(
+            session, company_id,
+            sdg_contributions=changed_sdgs,
+            students_helped=students_changed if completed else 0
+        )
+
+
 async def delete_need(session: AsyncSession, db_need: Need) -> None:
     """刪除需求"""
+    await adjust_dashboard_rollup(
+        session, db_need.school_id,
+        **school_rollup_delta((db_need.status, db_need.student_count), None)
+    )
     await session.delete(db_need)
     await session.commit()
+    recommendation_engine.on_need_deleted(db_need.id)
+    search_index.on_need_deleted(db_need.id)
@@ -0,0 +1,14 @@
+from typing import Dict, Tuple
+from sqlalchemy import TextClause, text
+
+# 可匯出的政府開放資料表與排序欄位（與唯一鍵相同）
+OPEN_DATA_TABLES: Dict[str, Tuple[str, ...]] = {
+    "wide_faraway3": ("學年度", "本校代碼", "分校分班名稱"),
+    "wide_edu_B_1_4": ("學年度", "縣市別"),
+}
+
+
+def open_data_export_query(table: str) -> TextClause:
+    """匯出整張開放資料表的查詢（依唯一鍵排序，只接受 OPEN_DATA_TABLES 中的資料表）"""
+    order_by = ", ".join(f'"{column}"' for column in OPEN_DATA_TABLES[table])
+    return text(f'SELECT * FROM "{table}" ORDER BY {order_by}')
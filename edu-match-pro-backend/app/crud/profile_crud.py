@@ -0,0 +1,31 @@
+import asyncio
+import uuid
+from typing import Any, Dict, List
+from sqlalchemy import any_, bindparam, select, Uuid
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.dataloader import DataLoader
+from app.core.serialization import attach_loaded
+from app.models.profile import Profile
+from app.schemas.profile_schemas import PROFILE_PUBLIC
+
+
+async def get_profiles_by_user_ids(session: AsyncSession, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Profile]:
+    """以單一 WHERE user_id = ANY(:ids) 查詢取得多位使用者的個人檔案（語句不隨鍵數改變）"""
+    if not user_ids:
+        return {}
+    result = await session.execute(
+        select(Profile).where(Profile.user_id == any_(bindparam("ids", user_ids, type_=ARRAY(Uuid))))
+    )
+    return {profile.user_id: profile for profile in result.scalars().all()}
+
+
+async def attach_donation_profiles(donations: List[Dict[str, Any]], profiles: DataLoader) -> None:
+    """為已投影的捐贈附上企業與需求學校的個人檔案（兩者的 user_id 合併成一次查詢）"""
+    await asyncio.gather(
+        attach_loaded(donations, "company_id", "company", profiles, PROFILE_PUBLIC),
+        attach_loaded(
+            [donation["need"] for donation in donations if donation.get("need")],
+            "school_id", "school", profiles, PROFILE_PUBLIC
+        )
+    )
@@ -0,0 +1,22 @@
+import uuid
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, Numeric, cast
+from app.models.donation import Donation
+from app.models.impact_story import ImpactStory
+
+
+async def get_impact_metric_total(session: AsyncSession, company_id: uuid.UUID, metric: str) -> dict:
+    """加總企業所有故事中的單一影響力指標（只計入數值；impact_metrics ? metric 使用 GIN 索引）"""
+    value = ImpactStory.impact_metrics[metric]
+    result = await session.execute(
+        select(func.coalesce(func.sum(cast(value.astext, Numeric)), 0), func.count())
+        .select_from(ImpactStory)
+        .join(Donation, Donation.id == ImpactStory.donation_id)
+        .where(
+            Donation.company_id == company_id,
+            ImpactStory.impact_metrics.has_key(metric),
+            func.jsonb_typeof(value) == "number"
+        )
+    )
+    total, stories = result.one()
+    return {"company_id": company_id, "metric": metric, "total": float(total), "stories": stories}
@@ -1,9 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
+import uuid
 from app.models.user import User, UserRole
 from app.schemas.user_schemas import UserCreate
-from app.core.security import get_password_hash
+from app.core.cache import principal_cache
+from app.core.security import hash_password_async
 
 
 async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
@@ -12,10 +14,20 @@ async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]
     return result.scalar_one_or_none()
 
 
+async def get_user_by_id(session: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
+    """根據主鍵查詢使用者"""
+    return await session.get(User, user_id)
+
+
+def invalidate_cached_user(user: User) -> None:
+    """使用者資料異動後移除快取，下次請求會重新從資料庫載入"""
+    principal_cache.invalidate(user.email)
+
+
 async def create_user(session: AsyncSession, user_in: UserCreate) -> User:
     """建立新使用者"""
     # 將明文密碼進行雜湊處理
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await hash_password_async(user_in.password)
     
     # 建立新的使用者物件
     db_user = User(
@@ -28,5 +40,16 @@ async def create_user(session: AsyncSession, user_in: UserCreate) -> User:
     session.add(db_user)
     await session.commit()
     await session.refresh(db_user)
+    # 同一 email 若曾被刪除後重新註冊，舊的快取不可再使用
+    invalidate_cached_user(db_user)
     
     return db_user
+
+
+async def update_user_password_hash(session: AsyncSession, user: User, hashed_password: str) -> User:
+    """更新使用者的密碼雜湊"""
+    user.password = hashed_password
+    session.add(user)
+    await session.commit()
+    invalidate_cached_user(user)
+    return user
@@ -1,10 +1,134 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import time
+from typing import AsyncGenerator, Dict, Literal, Optional
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.util import queue as sqla_queue
 from sqlmodel import SQLModel
 from app.core.config import settings
-from typing import AsyncGenerator
+# 匯入即註冊 SQL 統計與慢查詢的 Engine 事件，CLI 與腳本建立的引擎同樣適用
+import app.core.query_stats  # noqa: F401
+
+EnginePurpose = Literal["api", "ingestion", "test"]
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """記錄取得連線等待時間的連線池（等待時間不含建立新連線的時間，逾時只計入連線池已滿的情況）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.timeouts = 0
+        self.connect_count = 0
+        self.connect_total_ms = 0.0
+        self.connect_errors = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record, connect_ms = self._checkout_record()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            self._record_wait((time.perf_counter() - start) * 1000)
+            raise
+        self._record_wait((time.perf_counter() - start) * 1000 - connect_ms)
+        return record
+
+    def _checkout_record(self):
+        """同 QueuePool._do_get，但以迴圈取代遞迴（每次借出只記錄一次），並回傳建立新連線的耗時"""
+        use_overflow = self._max_overflow > -1
+        while True:
+            wait = use_overflow and self._overflow >= self._max_overflow
+            try:
+                return self._pool.get(wait, self._timeout), 0.0
+            except sqla_queue.Empty:
+                pass
+            if use_overflow and self._overflow >= self._max_overflow:
+                if not wait:
+                    continue
+                raise exc.TimeoutError(
+                    "QueuePool limit of size %d overflow %d reached, connection timed out, timeout %0.2f"
+                    % (self.size(), self.overflow(), self._timeout),
+                    code="3o7r",
+                )
+            if not self._inc_overflow():
+                continue
+            start = time.perf_counter()
+            try:
+                record = self._create_connection()
+            except BaseException:
+                # 連線或驗證失敗不是連線池逾時，分開計數
+                self._dec_overflow()
+                self.connect_errors += 1
+                raise
+            connect_ms = (time.perf_counter() - start) * 1000
+            self.connect_count += 1
+            self.connect_total_ms += connect_ms
+            return record, connect_ms
+
+    def _record_wait(self, waited_ms: float) -> None:
+        self.wait_count += 1
+        self.wait_total_ms += waited_ms
+        self.wait_max_ms = max(self.wait_max_ms, waited_ms)
+
+
+def create_engine(purpose: EnginePurpose = "api", url: Optional[str] = None) -> AsyncEngine:
+    """依用途建立非同步引擎：API、資料匯入與測試各自使用獨立的連線池"""
+    connect_args = {"statement_cache_size": settings.db_statement_cache_size}
+    if purpose == "test":
+        # 測試在不同事件迴圈間共用引擎，不保留連線
+        return create_async_engine(
+            url or settings.test_database_url,
+            echo=settings.db_echo,
+            poolclass=NullPool,
+            connect_args=connect_args,
+        )
+
+    if purpose == "ingestion":
+        pool_size, max_overflow = settings.ingestion_pool_size, 0
+    else:
+        pool_size, max_overflow = settings.db_pool_size, settings.db_max_overflow
+    return create_async_engine(
+        url or settings.database_url,
+        echo=settings.db_echo,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, object]:
+    """回傳連線池目前的借出、溢出與等待時間統計"""
+    pool = engine.pool
+    stats: Dict[str, object] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update({
+            "wait_count": pool.wait_count,
+            "wait_avg_ms": round(pool.wait_total_ms / pool.wait_count, 3) if pool.wait_count else 0.0,
+            "wait_max_ms": round(pool.wait_max_ms, 3),
+            "timeouts": pool.timeouts,
+            "connect_avg_ms": round(pool.connect_total_ms / pool.connect_count, 3) if pool.connect_count else 0.0,
+            "connect_errors": pool.connect_errors,
+        })
+    return stats
+
 
 # 建立非同步引擎
-engine = create_async_engine(settings.database_url, echo=True)
+engine = create_engine("api")
 
 # 建立非同步 Session Local
 async_session_local = async_sessionmaker(
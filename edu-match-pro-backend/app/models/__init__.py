@@ -5,6 +5,7 @@ from app.models.need import Need, UrgencyLevel, NeedStatus
 from app.models.donation import Donation, DonationStatus
 from app.models.impact_story import ImpactStory
 from app.models.activity_log import ActivityLog, ActivityType
+from app.models.dashboard_rollup import DashboardRollup
 
 __all__ = [
     "BaseModel",
@@ -19,4 +20,5 @@ __all__ = [
     "ImpactStory",
     "ActivityLog",
     "ActivityType",
+    "DashboardRollup",
 ]
@@ -1,6 +1,9 @@
 import uuid
-from sqlmodel import SQLModel, Field
-from typing import Optional
+from datetime import datetime
+from sqlalchemy import Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import SQLModel, Field, Column
+from typing import Any, Dict, Optional
 from enum import Enum
 from app.models.base import BaseModel
 
@@ -18,8 +21,23 @@ class ActivityType(str, Enum):
 
 class ActivityLog(BaseModel, table=True):
     __tablename__ = "activity_log"
+    __table_args__ = (
+        # 個人活動紀錄與最新活動列表：ORDER BY created_at DESC
+        Index("ix_activity_log_user_id_created_at", "user_id", text("created_at DESC")),
+        Index("ix_activity_log_created_at", text("created_at DESC")),
+        # 依 extra_data 內容查詢（例如 extra_data @> '{"donation_id": ...}'）
+        Index(
+            "ix_activity_log_extra_data", "extra_data",
+            postgresql_using="gin", postgresql_ops={"extra_data": "jsonb_path_ops"}
+        ),
+        # 依月份分區（activity_log_yYYYYmMM），分區由 activity_log_crud 維護
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
+    # 分區表的主鍵必須包含分區鍵
+    created_at: datetime = Field(default_factory=datetime.utcnow, primary_key=True)
     user_id: uuid.UUID
     activity_type: ActivityType
     description: str
-    extra_data: Optional[str] = Field(default=None)  # JSON 字串儲存額外資訊
+    # 已知的鍵見 app.schemas.activity_log_schemas.ActivityExtraData
+    extra_data: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSONB))
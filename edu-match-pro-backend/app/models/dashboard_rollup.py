@@ -0,0 +1,25 @@
+import uuid
+from datetime import datetime
+from typing import Dict
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class DashboardRollup(SQLModel, table=True):
+    """每位使用者的儀表板彙總數據，由需求與捐贈的寫入路徑維護"""
+    __tablename__ = "dashboard_rollup"
+    
+    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    # 學校
+    total_needs: int = Field(default=0)
+    active_needs: int = Field(default=0)
+    completed_needs: int = Field(default=0)
+    students_benefited: int = Field(default=0)
+    # 企業
+    completed_projects: int = Field(default=0)
+    students_helped: int = Field(default=0)
+    sdg_contributions: Dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(JSONB, nullable=False, server_default="{}")
+    )
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field, Relationship, ForeignKey
 from typing import Optional, TYPE_CHECKING
 from enum import Enum
@@ -21,6 +22,13 @@ class DonationStatus(str, Enum):
 
 class Donation(BaseModel, table=True):
     __tablename__ = "donation"
+    __table_args__ = (
+        # 企業儀表板與「我的捐贈」列表
+        Index("ix_donation_company_id_status", "company_id", "status", postgresql_include=["need_id"]),
+        Index("ix_donation_company_id_created_at", "company_id", text("created_at DESC")),
+        # Need → Donation 關聯
+        Index("ix_donation_need_id_status", "need_id", "status", postgresql_include=["company_id"]),
+    )
     
     company_id: uuid.UUID = Field(foreign_key="user.id")
     need_id: uuid.UUID = Field(foreign_key="need.id")
@@ -1,6 +1,8 @@
 import uuid
-from sqlmodel import SQLModel, Field, Relationship, ForeignKey
-from typing import Optional, TYPE_CHECKING
+from sqlmodel import SQLModel, Field, Relationship, ForeignKey, Column
+from sqlalchemy import Index
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Any, Dict, Optional, TYPE_CHECKING
 from app.models.base import BaseModel
 
 if TYPE_CHECKING:
@@ -9,13 +11,22 @@ if TYPE_CHECKING:
 
 class ImpactStory(BaseModel, table=True):
     __tablename__ = "impact_story"
+    __table_args__ = (
+        # 列表排序與全文檢索索引的增量同步
+        Index("ix_impact_story_created_at", "created_at"),
+        Index("ix_impact_story_updated_at", "updated_at"),
+        Index("ix_impact_story_donation_id", "donation_id"),
+        # 指標鍵是否存在（impact_metrics ? 'students_reached'）與內容比對
+        Index("ix_impact_story_impact_metrics", "impact_metrics", postgresql_using="gin"),
+    )
     
     donation_id: uuid.UUID = Field(foreign_key="donation.id")
     title: str
     content: str
     image_url: Optional[str] = Field(default=None)
     video_url: Optional[str] = Field(default=None)
-    impact_metrics: Optional[str] = Field(default=None)  # JSON 字串儲存影響力指標
+    # 已知的指標見 app.schemas.story_schemas.ImpactMetrics
+    impact_metrics: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSONB))
     
     # 反向關聯到 Donation
     donation: Optional["Donation"] = Relationship(back_populates="impact_story")
@@ -2,7 +2,8 @@ import uuid
 from sqlmodel import SQLModel, Field, Relationship, ForeignKey, Column
 from typing import Optional, List, TYPE_CHECKING
 from enum import Enum
-from sqlalchemy import ARRAY, Integer
+from sqlalchemy import Index, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from app.models.base import BaseModel
 
 if TYPE_CHECKING:
@@ -24,6 +25,21 @@ class NeedStatus(str, Enum):
 
 class Need(BaseModel, table=True):
     __tablename__ = "need"
+    __table_args__ = (
+        # 列表排序與 keyset 分頁：ORDER BY created_at DESC, id DESC
+        Index("ix_need_created_at_id", "created_at", "id"),
+        Index("ix_need_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_need_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_need_urgency_created_at_id", "urgency", "created_at", "id"),
+        Index("ix_need_school_id_created_at_id", "school_id", "created_at", "id"),
+        # 學校儀表板依 status 計數（index-only scan）
+        Index("ix_need_school_id_status", "school_id", "status", postgresql_include=["id", "student_count"]),
+        # location 前綴比對與 SDG 成員查詢
+        Index("ix_need_location_pattern", "location", postgresql_ops={"location": "text_pattern_ops"}),
+        Index("ix_need_sdgs", "sdgs", postgresql_using="gin"),
+        # 全文檢索索引依 updated_at 增量同步
+        Index("ix_need_updated_at", "updated_at"),
+    )
     
     school_id: uuid.UUID = Field(foreign_key="user.id")
     title: str
@@ -31,6 +47,7 @@ class Need(BaseModel, table=True):
     category: str
     location: str
     student_count: int
+    estimated_cost: Optional[int] = Field(default=None)  # 預估金額（新台幣）
     image_url: Optional[str] = Field(default=None)
     urgency: UrgencyLevel
     sdgs: List[int] = Field(sa_column=Column(ARRAY(Integer)))
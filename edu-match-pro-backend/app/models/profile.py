@@ -1,3 +1,5 @@
+import uuid
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship, ForeignKey
 from typing import Optional, TYPE_CHECKING
 from app.models.base import BaseModel
@@ -8,8 +10,11 @@ if TYPE_CHECKING:
 
 class Profile(BaseModel, table=True):
     __tablename__ = "profile"
+    __table_args__ = (
+        Index("ix_profile_user_id", "user_id"),
+    )
     
-    user_id: str = Field(foreign_key="user.id")
+    user_id: uuid.UUID = Field(foreign_key="user.id")
     organization_name: str
     contact_person: str
     position: str
@@ -1,15 +1,34 @@
 import uuid
 from datetime import datetime
 from typing import Optional
+from pydantic import ConfigDict, model_serializer
 from sqlmodel import SQLModel
+from app.core.serialization import Projection
 from app.models.activity_log import ActivityType
 
 
+class ActivityExtraData(SQLModel):
+    """活動日誌的額外資訊（已知的鍵；其他鍵原樣保留）"""
+    model_config = ConfigDict(extra="allow")
+
+    need_id: Optional[uuid.UUID] = None
+    donation_id: Optional[uuid.UUID] = None
+
+    @model_serializer(mode="wrap")
+    def _omit_missing_keys(self, handler):
+        # 只輸出實際存在的鍵，與資料庫中的 JSON 一致
+        return {key: value for key, value in handler(self).items() if value is not None}
+
+
 class ActivityLogPublic(SQLModel):
     """公開的活動日誌 Schema"""
     id: uuid.UUID
     user_id: uuid.UUID
     activity_type: ActivityType
     description: str
-    extra_data: Optional[str] = None
+    extra_data: Optional[ActivityExtraData] = None
     created_at: datetime
+
+
+# 列表端點的快速序列化投影
+ACTIVITY_LOG_PUBLIC = Projection(ActivityLogPublic)
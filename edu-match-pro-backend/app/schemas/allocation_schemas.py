@@ -0,0 +1,41 @@
+import uuid
+from typing import Dict, List, Optional
+from enum import Enum
+from sqlmodel import SQLModel
+
+
+class AllocationMode(str, Enum):
+    auto = "auto"
+    exact = "exact"
+    approximate = "approximate"
+
+
+class AllocationRequest(SQLModel):
+    """預算配置最佳化的請求 Schema"""
+    budget: int
+    category_mix: Optional[Dict[str, float]] = None  # 類別 -> 預算比例（總和不超過 1）
+    mode: AllocationMode = AllocationMode.auto
+
+
+class AllocatedNeed(SQLModel):
+    """被選入配置組合的需求"""
+    need_id: uuid.UUID
+    title: str
+    category: str
+    location: str
+    student_count: int
+    estimated_cost: int
+    remoteness: Optional[str] = None
+    weighted_students: int
+
+
+class AllocationResult(SQLModel):
+    """預算配置最佳化的結果"""
+    needs: List[AllocatedNeed]
+    total_cost: int
+    total_students: int
+    weighted_students: int
+    remaining_budget: int
+    candidate_count: int
+    exact: bool
+    solve_ms: float
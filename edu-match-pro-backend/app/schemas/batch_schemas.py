@@ -0,0 +1,29 @@
+from typing import Any, Dict, List, Optional, Union
+from sqlmodel import SQLModel
+
+
+class BatchSubRequest(SQLModel):
+    """批次中的單一 GET 子請求"""
+    id: str  # 由客戶端指定，用來對應回應
+    path: str  # 例如 /api/v1/dashboard/company，可帶查詢字串
+    params: Dict[str, Union[str, int, List[str]]] = {}
+
+
+class BatchRequest(SQLModel):
+    """批次請求"""
+    requests: List[BatchSubRequest]
+
+
+class BatchSubResponse(SQLModel):
+    """單一子請求的結果；JSON 回應的 body 原樣嵌入"""
+    id: str
+    status: int
+    headers: Dict[str, str]
+    body: Optional[Any] = None
+    duration_ms: float
+
+
+class BatchResponse(SQLModel):
+    """批次請求的結果（順序與請求相同）"""
+    responses: List[BatchSubResponse]
+    duration_ms: float
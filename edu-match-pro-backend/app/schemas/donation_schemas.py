@@ -3,8 +3,9 @@ from datetime import datetime
 from typing import Optional, List
 from enum import Enum
 from sqlmodel import SQLModel
+from app.core.serialization import Projection
 from app.models.donation import DonationStatus
-from app.schemas.need_schemas import NeedPublic
+from app.schemas.need_schemas import NEED_PUBLIC, NeedPublic, NeedSparse
 from app.schemas.profile_schemas import ProfilePublic
 
 
@@ -22,6 +23,22 @@ class DonationBase(SQLModel):
     progress: int = 0
 
 
+class AlternativeNeedPublic(SQLModel):
+    """認捐失敗時建議的其他需求"""
+    id: uuid.UUID
+    title: str
+    category: str
+    location: str
+    student_count: int
+    urgency: str
+
+
+class DonationConflictDetail(SQLModel):
+    """需求已被認捐時的 409 回應內容"""
+    message: str
+    alternatives: List[AlternativeNeedPublic]
+
+
 class DonationCreate(SQLModel):
     """用於企業發起認捐的 Schema"""
     need_id: uuid.UUID
@@ -29,6 +46,39 @@ class DonationCreate(SQLModel):
     description: Optional[str] = None
 
 
+class DonationBundleMode(str, Enum):
+    all_or_nothing = "all_or_nothing"
+    best_effort = "best_effort"
+
+
+class DonationBundleCreate(SQLModel):
+    """一次認捐多筆需求的 Schema"""
+    need_ids: List[uuid.UUID]
+    donation_type: str
+    description: Optional[str] = None
+    # all_or_nothing：任一需求無法認捐即全部取消；best_effort：認捐其中仍可認捐的需求
+    mode: DonationBundleMode = DonationBundleMode.all_or_nothing
+
+
+class DonationBundleItem(SQLModel):
+    """組合認捐中建立的單筆捐贈"""
+    id: uuid.UUID
+    need_id: uuid.UUID
+
+
+class DonationBundlePublic(SQLModel):
+    """組合認捐的結果"""
+    mode: DonationBundleMode
+    donations: List[DonationBundleItem]
+    unavailable: List[uuid.UUID]  # 不存在、已被認捐或正在被其他交易認捐的需求
+
+
+class DonationBundleConflictDetail(SQLModel):
+    """組合認捐沒有建立任何捐贈時的 409 回應內容"""
+    message: str
+    unavailable: List[uuid.UUID]
+
+
 class DonationPublic(DonationBase):
     """用於回傳捐贈專案詳細資訊的 Schema"""
     id: uuid.UUID
@@ -39,3 +89,21 @@ class DonationPublic(DonationBase):
     completion_date: Optional[datetime] = None
     need: NeedPublic
     company: Optional[ProfilePublic] = None
+
+
+class DonationSparse(SQLModel):
+    """指定 fields= 或 include= 時的捐贈列表項目：只包含 id 與要求的欄位"""
+    id: uuid.UUID
+    need_id: Optional[uuid.UUID] = None
+    company_id: Optional[uuid.UUID] = None
+    donation_type: Optional[str] = None
+    description: Optional[str] = None
+    progress: Optional[int] = None
+    status: Optional[DonationStatus] = None
+    donation_date: Optional[datetime] = None
+    completion_date: Optional[datetime] = None
+    need: Optional[NeedSparse] = None  # include=need 或 include=need.<欄位>
+
+
+# 快速序列化投影（company 由端點以個人檔案載入器批次填入）
+DONATION_PUBLIC = Projection(DonationPublic, donation_date="created_at", need=NEED_PUBLIC, company=None)
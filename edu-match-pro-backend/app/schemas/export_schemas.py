@@ -0,0 +1,12 @@
+from enum import Enum
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class OpenDataTable(str, Enum):
+    """可匯出的政府開放資料表"""
+    wide_faraway3 = "wide_faraway3"
+    wide_edu_B_1_4 = "wide_edu_B_1_4"
@@ -2,7 +2,9 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 from sqlmodel import SQLModel
+from app.core.serialization import Projection
 from app.models.need import UrgencyLevel, NeedStatus
+from app.schemas.profile_schemas import ProfilePublic
 
 
 class NeedBase(SQLModel):
@@ -12,6 +14,7 @@ class NeedBase(SQLModel):
     category: str
     location: str
     student_count: int
+    estimated_cost: Optional[int] = None
     image_url: Optional[str] = None
     urgency: UrgencyLevel
     sdgs: List[int] = []
@@ -29,6 +32,7 @@ class NeedUpdate(SQLModel):
     category: Optional[str] = None
     location: Optional[str] = None
     student_count: Optional[int] = None
+    estimated_cost: Optional[int] = None
     image_url: Optional[str] = None
     urgency: Optional[UrgencyLevel] = None
     sdgs: Optional[List[int]] = None
@@ -41,3 +45,27 @@ class NeedPublic(NeedBase):
     status: NeedStatus
     created_at: datetime
     updated_at: Optional[datetime] = None
+    school: Optional[ProfilePublic] = None  # 學校尚未建立個人檔案時為 None
+
+
+class NeedSparse(SQLModel):
+    """指定 fields= 時的需求列表項目：只包含 id 與要求的欄位"""
+    id: uuid.UUID
+    school_id: Optional[uuid.UUID] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    description_snippet: Optional[str] = None  # description 的前 120 個字
+    category: Optional[str] = None
+    location: Optional[str] = None
+    student_count: Optional[int] = None
+    estimated_cost: Optional[int] = None
+    image_url: Optional[str] = None
+    urgency: Optional[UrgencyLevel] = None
+    sdgs: Optional[List[int]] = None
+    status: Optional[NeedStatus] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+# 列表端點的快速序列化投影
+NEED_PUBLIC = Projection(NeedPublic, school=None)
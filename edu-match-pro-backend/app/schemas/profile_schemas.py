@@ -1,6 +1,7 @@
 import uuid
 from typing import Optional
 from sqlmodel import SQLModel
+from app.core.serialization import Projection
 
 
 class ProfilePublic(SQLModel):
@@ -14,3 +15,7 @@ class ProfilePublic(SQLModel):
     tax_id: Optional[str] = None
     bio: Optional[str] = None
     avatar_url: Optional[str] = None
+
+
+# 快速序列化投影
+PROFILE_PUBLIC = Projection(ProfilePublic)
@@ -0,0 +1,8 @@
+from typing import Optional
+from app.schemas.need_schemas import NeedPublic
+
+
+class RecommendedNeedPublic(NeedPublic):
+    """推薦給企業的需求，附帶媒合分數與地區屬性"""
+    match_score: float
+    remoteness: Optional[str] = None
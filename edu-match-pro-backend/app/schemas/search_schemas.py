@@ -0,0 +1,11 @@
+import uuid
+from sqlmodel import SQLModel
+
+
+class SearchHit(SQLModel):
+    """全文檢索結果，title 與 snippet 中命中的文字以 <mark> 標示"""
+    type: str  # need / story
+    id: uuid.UUID
+    title: str
+    snippet: str
+    score: float
@@ -1,8 +1,39 @@
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
+from pydantic import ConfigDict, model_serializer
 from sqlmodel import SQLModel
-from app.schemas.donation_schemas import DonationPublic
+from app.core.serialization import Projection
+from app.schemas.donation_schemas import DONATION_PUBLIC, DonationPublic
+
+
+def omit_missing_keys(metrics: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """移除值為 null 的指標鍵（Schema 序列化與列表投影共用）"""
+    if metrics is None:
+        return None
+    return {key: value for key, value in metrics.items() if value is not None}
+
+
+class ImpactMetrics(SQLModel):
+    """影響力指標（已知的指標；其他鍵原樣保留）"""
+    model_config = ConfigDict(extra="allow")
+
+    students_reached: Optional[int] = None
+    items_delivered: Optional[int] = None
+    volunteer_hours: Optional[float] = None
+
+    @model_serializer(mode="wrap")
+    def _omit_missing_keys(self, handler):
+        # 只輸出實際存在的鍵，與資料庫中的 JSON 一致
+        return omit_missing_keys(handler(self))
+
+
+class ImpactMetricTotal(SQLModel):
+    """企業所有故事中單一指標的加總"""
+    company_id: uuid.UUID
+    metric: str
+    total: float
+    stories: int
 
 
 class ImpactStoryBase(SQLModel):
@@ -11,7 +42,7 @@ class ImpactStoryBase(SQLModel):
     content: str
     image_url: Optional[str] = None
     video_url: Optional[str] = None
-    impact_metrics: Optional[str] = None
+    impact_metrics: Optional[ImpactMetrics] = None
 
 
 class ImpactStoryCreate(ImpactStoryBase):
@@ -26,3 +57,7 @@ class ImpactStoryPublic(ImpactStoryBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     donation: Optional[DonationPublic] = None
+
+
+# 列表端點的快速序列化投影
+IMPACT_STORY_PUBLIC = Projection(ImpactStoryPublic, donation=DONATION_PUBLIC, impact_metrics=omit_missing_keys)
@@ -11,3 +11,5 @@ class Token(SQLModel):
 class TokenData(SQLModel):
     """JWT Token 解碼後的資料結構"""
     sub: Optional[str] = None
+    uid: Optional[str] = None
+    role: Optional[str] = None
@@ -0,0 +1,148 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.activity_log import ActivityLog
+from app.services.realtime import PUBLIC_TOPIC, activity_event, realtime_hub, user_topic
+
+logger = logging.getLogger(__name__)
+
+# session.info 中等待交易提交的日誌
+PENDING_LOGS_KEY = "pending_activity_logs"
+
+
+class ActivityLogWriter:
+    """行程內的活動日誌寫入器：累積一段時間或一定筆數後以多列 INSERT 批次寫入"""
+
+    def __init__(self, engine: Optional[AsyncEngine] = None) -> None:
+        self._engine = engine
+        self._buffer: List[Dict[str, Any]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            from app.db import engine
+            self._engine = engine
+        return self._engine
+
+    def submit_after_commit(self, session, activity_log: ActivityLog) -> bool:
+        """登記在呼叫端的交易提交後才放入待寫緩衝區（回滾時捨棄）；緩衝區已滿時回傳 False，由呼叫端改在自己的交易中寫入"""
+        if len(self._buffer) >= settings.activity_log_queue_size:
+            self.rejected += 1
+            return False
+        sync_session = getattr(session, "sync_session", session)
+        # 呼叫端可能尚未執行任何操作；先開始交易，提交或回滾時才會觸發事件
+        if not sync_session.in_transaction():
+            sync_session.begin()
+        sync_session.info.setdefault(PENDING_LOGS_KEY, []).append((self, activity_log))
+        return True
+
+    def submit(self, activity_log: ActivityLog) -> None:
+        """放入待寫緩衝區；交易已提交，無法再退回交易寫入，因此不檢查上限（登記時已檢查）"""
+        self._buffer.append(activity_log.model_dump())
+        self.enqueued += 1
+        self._ensure_task()
+        if len(self._buffer) >= settings.activity_log_batch_size:
+            self._wakeup.set()
+
+    def _ensure_task(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        # 以空白的 context 執行，批次寫入不會被計入觸發它的請求
+        self._task = loop.create_task(self._run(), context=contextvars.Context())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.activity_log_flush_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """寫出緩衝區內所有待寫的日誌"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[:settings.activity_log_batch_size]
+                del self._buffer[:len(batch)]
+                await self._write(batch)
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        # 暫時性錯誤重試一次，仍失敗則記錄並放棄該批次（非同步模式為至多一次的保證）
+        for attempt in range(2):
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.execute(ActivityLog.__table__.insert(), batch)
+                self.written += len(batch)
+                self.batches += 1
+                for row in batch:
+                    realtime_hub.publish([user_topic(row["user_id"]), PUBLIC_TOPIC], "activity", activity_event(row))
+                return
+            except Exception:
+                if attempt == 0:
+                    await asyncio.sleep(settings.activity_log_flush_ms / 1000)
+                    continue
+                self.failed += len(batch)
+                logger.exception("Dropped %d activity log rows after a failed batch insert", len(batch))
+
+    async def stop(self) -> None:
+        """停止背景工作並寫出剩餘的日誌（服務關閉時呼叫）"""
+        if self._task is not None:
+            # 持有鎖再取消，正在寫入的批次會先完成
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "delivery": settings.activity_log_delivery,
+            "pending": len(self._buffer),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+activity_log_writer = ActivityLogWriter()
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_pending_logs(session) -> None:
+    # 交易提交後才交給寫入器，失敗的交易不會留下活動日誌或推播
+    for writer, activity_log in session.info.pop(PENDING_LOGS_KEY, ()):
+        try:
+            writer.submit(activity_log)
+        except Exception:
+            logger.exception("Failed to enqueue activity log")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_logs(session, previous_transaction) -> None:
+    # 交易尚未執行任何 SQL 時不會觸發 after_rollback，改用 soft rollback 並只處理最外層交易
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_LOGS_KEY, None)
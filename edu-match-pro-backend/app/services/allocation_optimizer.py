@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+# 地區屬性對受益學生數的加權倍數
+REMOTENESS_MULTIPLIERS: Dict[Optional[str], int] = {
+    "特偏": 4,
+    "極偏": 3,
+    "偏遠": 2,
+    None: 1,
+}
+
+# 精確解 DP 表格（候選數 × 總價值）允許的最大格數
+EXACT_TABLE_LIMIT = 20_000_000
+# 近似解中以 DP 重新求解的核心候選數與價值刻度
+CORE_SIZE = 256
+CORE_VALUE_RESOLUTION = 4096
+
+
+@dataclass
+class KnapsackSolution:
+    selected: np.ndarray
+    exact: bool
+
+
+def remoteness_multiplier(attribute: Optional[str]) -> int:
+    """回傳地區屬性對應的加權倍數"""
+    return REMOTENESS_MULTIPLIERS.get(attribute, 1)
+
+
+def _value_dp(costs: np.ndarray, values: np.ndarray, budget: int) -> np.ndarray:
+    """以價值為索引的 0/1 背包 DP：dp[v] 為達到價值 v 的最小花費，回傳選取的索引"""
+    n = len(costs)
+    total_value = int(values.sum())
+    if n == 0 or total_value == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    inf = np.iinfo(np.int64).max // 2
+    dp = np.full(total_value + 1, inf, dtype=np.int64)
+    dp[0] = 0
+    keep = np.zeros((n, total_value + 1), dtype=bool)
+    for i in range(n):
+        value = int(values[i])
+        if value == 0:
+            continue
+        candidate = dp[:-value] + int(costs[i])
+        improved = candidate < dp[value:]
+        keep[i, value:] = improved
+        dp[value:] = np.where(improved, candidate, dp[value:])
+
+    best_value = int(np.flatnonzero(dp <= budget).max())
+    selected = []
+    v = best_value
+    for i in range(n - 1, -1, -1):
+        if v > 0 and keep[i, v]:
+            selected.append(i)
+            v -= int(values[i])
+    return np.array(selected[::-1], dtype=np.int64)
+
+
+def _greedy_fill(order: np.ndarray, costs: np.ndarray, budget: int) -> np.ndarray:
+    """依序放入仍在預算內的項目：先整段取用前綴，再逐一嘗試其餘項目"""
+    cumulative = np.cumsum(costs[order])
+    prefix = int(np.searchsorted(cumulative, budget, side="right"))
+    chosen = list(order[:prefix])
+    remaining = budget - (int(cumulative[prefix - 1]) if prefix > 0 else 0)
+    for index in order[prefix:]:
+        if remaining <= 0:
+            break
+        cost = int(costs[index])
+        if cost <= remaining:
+            chosen.append(index)
+            remaining -= cost
+    return np.array(chosen, dtype=np.int64)
+
+
+def can_solve_exactly(values: np.ndarray) -> bool:
+    """判斷精確 DP 表格是否在允許的大小內"""
+    return len(values) * (int(values.sum()) + 1) <= EXACT_TABLE_LIMIT
+
+
+def solve_exact(costs: np.ndarray, values: np.ndarray, budget: int) -> KnapsackSolution:
+    """精確求解 0/1 背包問題（適用於小型候選集合）"""
+    affordable = np.flatnonzero(costs <= budget)
+    chosen = _value_dp(costs[affordable], values[affordable], budget)
+    return KnapsackSolution(selected=affordable[chosen], exact=True)
+
+
+def solve_approximate(costs: np.ndarray, values: np.ndarray, budget: int) -> KnapsackSolution:
+    """貪婪法加上核心區段 DP 修正的近似解（適用於大型候選集合）"""
+    affordable = np.flatnonzero(costs <= budget)
+    if len(affordable) == 0:
+        return KnapsackSolution(selected=affordable, exact=False)
+
+    # 依價值密度由高到低排序
+    density = values[affordable] / np.maximum(costs[affordable], 1)
+    order = affordable[np.argsort(-density, kind="stable")]
+    break_at = int(np.searchsorted(np.cumsum(costs[order]), budget, side="right"))
+
+    # 貪婪解：依密度放入，超出預算的項目跳過
+    best = _greedy_fill(order, costs, budget)
+    best_value = int(values[best].sum())
+
+    # 核心區段 DP：臨界點前的項目固定選取，臨界點附近重新最佳化
+    core_start = max(break_at - CORE_SIZE // 2, 0)
+    core = order[core_start:core_start + CORE_SIZE]
+    fixed = order[:core_start]
+    core_budget = budget - int(costs[fixed].sum())
+    if len(core) > 0 and core_budget > 0:
+        core_values = values[core]
+        scale = max(int(core_values.sum()) // CORE_VALUE_RESOLUTION, 1)
+        scaled = core_values // scale
+        chosen = core[_value_dp(costs[core], scaled, core_budget)]
+        refined = np.concatenate([fixed, chosen])
+        # 修正後仍有剩餘預算時，以貪婪法補上核心區段之後的項目
+        remaining = budget - int(costs[refined].sum())
+        extra = _greedy_fill(order[core_start + len(core):], costs, remaining)
+        refined = np.concatenate([refined, extra])
+        refined_value = int(values[refined].sum())
+        if refined_value > best_value:
+            best, best_value = refined, refined_value
+
+    # 單一最高價值項目可能優於整個貪婪解
+    top = affordable[int(np.argmax(values[affordable]))]
+    if int(values[top]) > best_value:
+        best = np.array([top], dtype=np.int64)
+
+    return KnapsackSolution(selected=np.sort(best), exact=False)
+
+
+def solve_knapsack(costs: np.ndarray, values: np.ndarray, budget: int, mode: str = "auto") -> KnapsackSolution:
+    """依模式選擇精確或近似解法；精確模式的表格過大時拋出 ValueError"""
+    if mode == "exact" and not can_solve_exactly(values):
+        raise ValueError("Too many candidates for exact mode")
+    if mode == "exact" or (mode == "auto" and can_solve_exactly(values)):
+        return solve_exact(costs, values, budget)
+    return solve_approximate(costs, values, budget)
+
+
+def optimize_allocation(
+    categories: List[str],
+    costs: np.ndarray,
+    values: np.ndarray,
+    budget: int,
+    category_mix: Optional[Dict[str, float]] = None,
+    mode: str = "auto",
+) -> Tuple[np.ndarray, bool]:
+    """在預算與類別配比下選出總價值最高的需求組合
+
+    有指定類別配比時，每個類別各自以 budget × 比例 為上限獨立求解。
+    回傳 (選取的索引, 是否全部為精確解)。
+    """
+    if not category_mix:
+        solution = solve_knapsack(costs, values, budget, mode)
+        return solution.selected, solution.exact
+
+    category_array = np.asarray(categories, dtype=object)
+    selected: List[np.ndarray] = []
+    exact = True
+    for category, share in category_mix.items():
+        members = np.flatnonzero(category_array == category)
+        if len(members) == 0:
+            continue
+        solution = solve_knapsack(costs[members], values[members], int(budget * share), mode)
+        selected.append(members[solution.selected])
+        exact = exact and solution.exact
+    if not selected:
+        return np.zeros(0, dtype=np.int64), exact
+    return np.sort(np.concatenate(selected)), exact
@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_TOPIC = "public"
+
+
+def user_topic(user_id: uuid.UUID) -> str:
+    return f"user:{user_id}"
+
+
+def activity_event(row: Dict[str, Any]) -> Dict[str, Any]:
+    """活動日誌推播內容（欄位與 ActivityLogPublic 相同）"""
+    return {key: row[key] for key in ("id", "user_id", "activity_type", "description", "extra_data", "created_at")}
+
+
+class Subscription:
+    """單一連線的訂閱：有上限的佇列，滿了就丟棄最舊的訊息並在下一則訊息前通知落後數量"""
+
+    def __init__(self, topics: Iterable[str], max_queue: int) -> None:
+        self.topics = frozenset(topics)
+        self._queue: Deque[bytes] = deque()
+        self._max_queue = max_queue
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, message: bytes) -> None:
+        if len(self._queue) >= self._max_queue:
+            # 慢速的客戶端不會拖慢發布端，只會遺失較舊的訊息
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(message)
+        self._ready.set()
+
+    async def get(self) -> Optional[bytes]:
+        """取出下一則訊息；訂閱關閉時回傳 None"""
+        while not self._queue:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return orjson.dumps({"type": "lagged", "dropped": dropped})
+        return self._queue.popleft()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+
+class LocalBroadcast:
+    """單一行程的廣播後端：直接交給本 worker 的訂閱者"""
+
+    def __init__(self, deliver: Callable[[str, bytes], None]) -> None:
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        pass
+
+    def publish(self, topic: str, message: bytes) -> None:
+        self._deliver(topic, message)
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class PostgresBroadcast:
+    """以 PostgreSQL LISTEN/NOTIFY 在多個 worker 之間廣播（每個 worker 一條專用連線，中斷時以退避重新連線）"""
+
+    # NOTIFY 的 payload 上限為 8000 位元組
+    MAX_PAYLOAD = 7900
+    RECONNECT_INITIAL_SECONDS = 0.5
+
+    def __init__(
+        self, deliver: Callable[[str, bytes], None], dsn: str, channel: str,
+        outbox_size: int = 1000, reconnect_max_seconds: float = 30.0
+    ) -> None:
+        self._deliver = deliver
+        self._dsn = dsn
+        self._channel = channel
+        self._reconnect_max_seconds = reconnect_max_seconds
+        self._connection = None
+        self._connected = asyncio.Event()
+        # 連線中斷期間待送的事件有上限，滿了就丟棄最舊的
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=outbox_size)
+        self._sender: Optional[asyncio.Task] = None
+        self._reconnector: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.reconnects = 0
+
+    async def start(self) -> None:
+        await self._connect()
+        self._sender = asyncio.get_running_loop().create_task(self._send_loop())
+
+    async def _connect(self) -> None:
+        import asyncpg
+        connection = await asyncpg.connect(self._dsn)
+        await connection.add_listener(self._channel, self._on_notify)
+        connection.add_termination_listener(self._on_terminate)
+        self._connection = connection
+        self._connected.set()
+
+    def _on_terminate(self, connection) -> None:
+        # stop() 會先清掉 _connection 再關閉，主動關閉不會觸發重新連線
+        if connection is not self._connection:
+            return
+        logger.warning("Realtime LISTEN connection lost; reconnecting")
+        self._connection = None
+        self._connected.clear()
+        self._reconnector = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = self.RECONNECT_INITIAL_SECONDS
+        while True:
+            try:
+                await self._connect()
+            except Exception as e:
+                logger.warning("Could not reconnect the realtime LISTEN connection (%s); retrying in %.1fs", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._reconnect_max_seconds)
+                continue
+            self.reconnects += 1
+            logger.info("Realtime LISTEN connection re-established")
+            return
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        topic, _, message = payload.partition("\n")
+        self._deliver(topic, message.encode("utf-8"))
+
+    def publish(self, topic: str, message: bytes) -> None:
+        # NOTIFY 於 worker 自己的連線上依序送出，本 worker 也會收到同一則通知
+        payload = f"{topic}\n{message.decode('utf-8')}"
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD:
+            logger.warning("Realtime event for %s exceeds the NOTIFY limit; delivering locally only", topic)
+            self._deliver(topic, message)
+            return
+        if self._outbox.full():
+            self._outbox.get_nowait()
+            self.dropped += 1
+        self._outbox.put_nowait(payload)
+
+    async def _send_loop(self) -> None:
+        while True:
+            payload = await self._outbox.get()
+            await self._connected.wait()
+            try:
+                await self._connection.execute("SELECT pg_notify($1, $2)", self._channel, payload)
+            except Exception:
+                logger.exception("Failed to broadcast realtime event")
+
+    async def stop(self) -> None:
+        for task in (self._sender, self._reconnector):
+            if task is not None:
+                task.cancel()
+        connection, self._connection = self._connection, None
+        self._connected.clear()
+        if connection is not None:
+            await connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "broadcast_connected": self._connected.is_set(),
+            "broadcast_pending": self._outbox.qsize(),
+            "broadcast_dropped": self.dropped,
+            "broadcast_reconnects": self.reconnects,
+        }
+
+
+class RealtimeHub:
+    """行程內的發布/訂閱：每則事件只序列化一次，再以非阻塞方式分送給所有訂閱該主題的連線"""
+
+    def __init__(self) -> None:
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._listeners: Dict[str, List[Callable[[bytes], None]]] = {}
+        self.backend = LocalBroadcast(self._deliver)
+        self.published = 0
+        self.delivered = 0
+
+    async def start(self) -> None:
+        if settings.realtime_backend == "postgres":
+            dsn = settings.database_url.replace("+asyncpg", "")
+            self.backend = PostgresBroadcast(
+                self._deliver, dsn, settings.realtime_channel,
+                settings.realtime_outbox_size, settings.realtime_reconnect_max_seconds
+            )
+        await self.backend.start()
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+        for subscribers in self._topics.values():
+            for subscription in subscribers:
+                subscription.close()
+        self._topics.clear()
+
+    def clear(self) -> None:
+        """關閉所有訂閱並歸零統計（公開的重設介面）；行程內的 listener 與廣播後端保留"""
+        for subscribers in self._topics.values():
+            for subscription in subscribers:
+                subscription.close()
+        self._topics.clear()
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(topics, settings.realtime_queue_size)
+        for topic in subscription.topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def add_listener(self, topic: str, callback: Callable[[bytes], None]) -> None:
+        """登記行程內的同步回呼（例如快取），與連線訂閱收到相同的訊息"""
+        self._listeners.setdefault(topic, []).append(callback)
+
+    def remove_listener(self, topic: str, callback: Callable[[bytes], None]) -> None:
+        listeners = self._listeners.get(topic, [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    def publish(self, topics: Iterable[str], event_type: str, data: Any) -> None:
+        # asyncpg 回傳的 UUID 不是標準 uuid.UUID，交由 default 轉成字串
+        message = orjson.dumps({"type": event_type, "data": data}, default=str)
+        for topic in topics:
+            self.published += 1
+            self.backend.publish(topic, message)
+
+    def _deliver(self, topic: str, message: bytes) -> None:
+        for callback in self._listeners.get(topic, ()):
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("Realtime listener failed for %s", topic)
+        for subscription in self._topics.get(topic, ()):
+            subscription.offer(message)
+            self.delivered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        connections = {id(s) for subscribers in self._topics.values() for s in subscribers}
+        return {
+            "backend": settings.realtime_backend,
+            "topics": len(self._topics),
+            "connections": len(connections),
+            "published": self.published,
+            "delivered": self.delivered,
+            **self.backend.stats(),
+        }
+
+
+realtime_hub = RealtimeHub()
+
+
+# --- 提交後才發布 ---
+def publish_after_commit(session, topics: List[str], event_type: str, data: Any) -> None:
+    """登記在交易提交後才發布的事件；交易回滾時一併捨棄"""
+    sync_session = getattr(session, "sync_session", session)
+    sync_session.info.setdefault("realtime_events", []).append((topics, event_type, data))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_events(session) -> None:
+    # 推播失敗不影響已提交的交易
+    for topics, event_type, data in session.info.pop("realtime_events", ()):
+        try:
+            realtime_hub.publish(topics, event_type, data)
+        except Exception:
+            logger.exception("Failed to publish %s event", event_type)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session) -> None:
+    session.info.pop("realtime_events", None)
@@ -0,0 +1,152 @@
+import asyncio
+import bisect
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.services.realtime import PUBLIC_TOPIC, activity_event, realtime_hub
+
+logger = logging.getLogger(__name__)
+
+
+class RecentActivityFeed:
+    """最新公開活動的環形緩衝區：每筆活動預先序列化成 JSON，回應時只需串接位元組"""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        # 依 (created_at, id) 由舊到新排序，超過容量時捨棄最舊的一筆
+        self._keys: List[Tuple[datetime, str]] = []
+        self._items: List[bytes] = []
+        # 最新到最舊的完整 JSON 陣列，以及每筆結束位置（較小的 limit 直接切片，不需重新串接）
+        self._rendered: Optional[bytes] = None
+        self._ends: List[int] = []
+        self._prime_lock: Optional[asyncio.Lock] = None
+        self._reconciler: Optional[asyncio.Task] = None
+        # 重新載入期間到達的活動，載入完成後與資料庫的結果合併
+        self._arrived: Optional[List[Dict[str, Any]]] = None
+        self.primed = False
+        self.hits = 0
+        self.reconciles = 0
+
+    def add(self, item: Dict[str, Any]) -> None:
+        """加入一筆活動（已存在的 id 會略過，亂序到達時依時間插入正確位置）"""
+        if self._arrived is not None:
+            self._arrived.append(item)
+        created_at = item["created_at"]
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        key = (created_at, str(item["id"]))
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return
+        if len(self._keys) >= self.capacity:
+            if index == 0:
+                return
+            del self._keys[0], self._items[0]
+            index -= 1
+        self._keys.insert(index, key)
+        self._items.insert(index, orjson.dumps(item, default=str))
+        self._rendered = None
+
+    def clear(self) -> None:
+        """清空緩衝區與統計，下次請求時重新從資料庫載入（公開的重設介面，不影響背景的 reconcile 工作）"""
+        self._keys = []
+        self._items = []
+        self._rendered = None
+        self._prime_lock = None
+        self._arrived = None
+        self.primed = False
+        self.hits = 0
+        self.reconciles = 0
+
+    def on_event(self, message: bytes) -> None:
+        event = orjson.loads(message)
+        if event.get("type") == "activity":
+            self.add(event["data"])
+
+    def render(self, limit: int) -> bytes:
+        """回傳最新 limit 筆活動的 JSON 陣列（依 created_at DESC）"""
+        self.hits += 1
+        if self._rendered is None:
+            ends, end = [], 1
+            for item in reversed(self._items):
+                end += len(item)
+                ends.append(end)
+                end += 1
+            self._rendered = b"[" + b",".join(reversed(self._items)) + b"]"
+            self._ends = ends
+        count = min(limit, len(self._ends))
+        if count <= 0:
+            return b"[]"
+        if count == len(self._ends):
+            return self._rendered
+        return self._rendered[:self._ends[count - 1]] + b"]"
+
+    async def prime(self, session: AsyncSession) -> None:
+        """從資料庫載入最新的活動（並發的請求只會觸發一次查詢）"""
+        if self._prime_lock is None:
+            self._prime_lock = asyncio.Lock()
+        async with self._prime_lock:
+            if self.primed:
+                return
+            await self._load(session)
+
+    async def _load(self, session: AsyncSession) -> None:
+        from app.crud.activity_log_crud import get_recent_activity_logs
+        self._arrived = []
+        try:
+            logs = await get_recent_activity_logs(session, self.capacity)
+        finally:
+            arrived, self._arrived = self._arrived, None
+        self._keys, self._items = [], []
+        self._rendered = None
+        for log in logs:
+            self.add(activity_event(log.model_dump()))
+        # 查詢期間推播進來的活動可能不在查詢結果中（尚未提交或查詢已開始），重新加入
+        for item in arrived:
+            self.add(item)
+        self.primed = True
+
+    async def start(self) -> None:
+        """reconcile 模式以背景工作定期從資料庫重新載入"""
+        if settings.recent_activity_consistency == "local" and settings.realtime_backend == "local":
+            logger.warning(
+                "RECENT_ACTIVITY_CONSISTENCY=local with REALTIME_BACKEND=local: each worker only sees its own "
+                "writes; use reconcile or the postgres realtime backend when running multiple workers"
+            )
+        if settings.recent_activity_consistency == "reconcile":
+            self._reconciler = asyncio.get_running_loop().create_task(self._reconcile_loop())
+
+    async def _reconcile_loop(self) -> None:
+        from app.db import async_session_local
+        while True:
+            # 其他 worker 的寫入若沒有經由廣播送達，重新載入後即可補上
+            await asyncio.sleep(settings.recent_activity_reconcile_seconds)
+            try:
+                async with async_session_local() as session:
+                    await self._load(session)
+                self.reconciles += 1
+            except Exception:
+                logger.exception("Could not reconcile the recent activity feed")
+
+    async def stop(self) -> None:
+        if self._reconciler is not None:
+            self._reconciler.cancel()
+            self._reconciler = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "consistency": settings.recent_activity_consistency,
+            "primed": self.primed,
+            "size": len(self._items),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "reconciles": self.reconciles,
+        }
+
+
+recent_activity_feed = RecentActivityFeed(settings.recent_activity_size)
+# 模組載入時即訂閱公開活動（postgres 推播時也包含其他 worker 的寫入），不依賴 lifespan
+realtime_hub.add_listener(PUBLIC_TOPIC, recent_activity_feed.on_event)
@@ -0,0 +1,316 @@
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.core.config import settings
+from app.models.need import Need, NeedStatus, UrgencyLevel
+from app.models.donation import Donation
+from app.services.remoteness import (
+    RemotenessIndex, MAX_REMOTENESS_WEIGHT, load_remoteness_index, parse_location
+)
+
+
+SDG_COUNT = 17
+
+URGENCY_SCORES: Dict[str, float] = {
+    UrgencyLevel.high.value: 1.0,
+    UrgencyLevel.medium.value: 0.5,
+    UrgencyLevel.low.value: 0.0,
+}
+
+# 各項特徵的權重，總和為 1
+SCORE_WEIGHTS: Dict[str, float] = {
+    "sdg": 0.30,
+    "category": 0.20,
+    "location": 0.10,
+    "urgency": 0.15,
+    "students": 0.10,
+    "remoteness": 0.15,
+}
+
+
+@dataclass
+class CompanyPreference:
+    """企業過往捐贈累積出的偏好"""
+    sdg_counts: np.ndarray = field(default_factory=lambda: np.zeros(SDG_COUNT, dtype=np.float32))
+    category_counts: Dict[int, float] = field(default_factory=dict)
+    county_counts: Dict[int, float] = field(default_factory=dict)
+    donated_needs: int = 0
+
+
+class _Vocabulary:
+    """將字串對應到連續整數索引"""
+
+    def __init__(self) -> None:
+        self._index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = len(self._index)
+            self._index[value] = index
+        return index
+
+
+class RecommendationEngine:
+    """以記憶體中的特徵矩陣為需求評分的推薦引擎
+
+    每一列對應一筆需求，評分全部以 NumPy 向量運算完成；
+    create_need / update_need / create_donation 寫入後會以增量方式更新矩陣。
+    """
+
+    def __init__(self, initial_capacity: int = 1024) -> None:
+        self._initial_capacity = initial_capacity
+        self._lock = asyncio.Lock()
+        self._loaded_at: Optional[float] = None
+        self._rebuilding = False
+        self._pending: List[Tuple[str, tuple]] = []
+        self._reset(initial_capacity)
+
+    def clear(self) -> None:
+        """重設為尚未載入的狀態，下次使用時從資料庫重新載入
+
+        公開的重設介面：資料在 API 之外大量變更（匯入、還原備份）後呼叫，測試也以此在案例之間重設。
+        """
+        self._lock = asyncio.Lock()
+        self._loaded_at = None
+        self._rebuilding = False
+        self._pending = []
+        self._reset(self._initial_capacity)
+
+    def _reset(self, capacity: int) -> None:
+        self._size = 0
+        self._ids: List[uuid.UUID] = []
+        self._row_of: Dict[uuid.UUID, int] = {}
+        self._sdg = np.zeros((capacity, SDG_COUNT), dtype=np.float32)
+        self._category = np.zeros(capacity, dtype=np.int32)
+        self._county = np.zeros(capacity, dtype=np.int32)
+        self._urgency = np.zeros(capacity, dtype=np.float32)
+        self._students = np.zeros(capacity, dtype=np.float32)
+        self._remoteness = np.zeros(capacity, dtype=np.float32)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._categories = _Vocabulary()
+        self._counties = _Vocabulary()
+        self._companies: Dict[uuid.UUID, CompanyPreference] = {}
+        self._remoteness_index = RemotenessIndex()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > settings.recommendation_refresh_seconds
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """確保特徵矩陣已載入；逾期時重建（其他請求繼續使用舊矩陣）"""
+        if not self._is_stale():
+            return
+        if self.is_loaded and self._lock.locked():
+            return
+        async with self._lock:
+            if not self._is_stale():
+                return
+            await self._rebuild(session)
+
+    async def _rebuild(self, session: AsyncSession) -> None:
+        """從資料庫完整重建特徵矩陣"""
+        self._rebuilding = True
+        self._pending = []
+        try:
+            remoteness_index = await load_remoteness_index(session)
+
+            needs_result = await session.execute(
+                select(
+                    Need.id, Need.sdgs, Need.category, Need.location,
+                    Need.urgency, Need.student_count
+                ).where(Need.status == NeedStatus.active)
+            )
+            need_rows = needs_result.all()
+
+            donations_result = await session.execute(
+                select(Donation.company_id, Need.sdgs, Need.category, Need.location)
+                .select_from(Donation)
+                .join(Need, Donation.need_id == Need.id)
+            )
+            donation_rows = donations_result.all()
+        except BaseException:
+            self._rebuilding = False
+            raise
+
+        # 以下不再 await，整批替換不會與其他協程交錯
+        self._reset(max(self._initial_capacity, len(need_rows) * 2))
+        self._remoteness_index = remoteness_index
+        for row in need_rows:
+            self._upsert(row.id, row.sdgs, row.category, row.location, row.urgency, row.student_count, True)
+        for company_id, sdgs, category, location in donation_rows:
+            self._record_donation(company_id, sdgs, category, location)
+
+        pending, self._pending = self._pending, []
+        self._rebuilding = False
+        for action, args in pending:
+            getattr(self, action)(*args)
+        self._loaded_at = time.monotonic()
+
+    def _ensure_capacity(self) -> None:
+        capacity = self._sdg.shape[0]
+        if self._size < capacity:
+            return
+        new_capacity = capacity * 2
+        grown_sdg = np.zeros((new_capacity, SDG_COUNT), dtype=np.float32)
+        grown_sdg[:capacity] = self._sdg
+        self._sdg = grown_sdg
+        for name in ("_category", "_county", "_urgency", "_students", "_remoteness", "_active"):
+            grown = np.zeros(new_capacity, dtype=getattr(self, name).dtype)
+            grown[:capacity] = getattr(self, name)
+            setattr(self, name, grown)
+
+    def _upsert(
+        self,
+        need_id: uuid.UUID,
+        sdgs: Optional[List[int]],
+        category: str,
+        location: str,
+        urgency,
+        student_count: int,
+        active: bool,
+    ) -> None:
+        row = self._row_of.get(need_id)
+        if row is None:
+            if not active:
+                return
+            self._ensure_capacity()
+            row = self._size
+            self._size += 1
+            self._ids.append(need_id)
+            self._row_of[need_id] = row
+
+        sdg_vector = np.zeros(SDG_COUNT, dtype=np.float32)
+        valid_sdgs = [sdg for sdg in (sdgs or []) if 1 <= sdg <= SDG_COUNT]
+        for sdg in valid_sdgs:
+            sdg_vector[sdg - 1] = 1.0
+        if valid_sdgs:
+            sdg_vector /= np.sqrt(len(valid_sdgs))
+
+        county, _ = parse_location(location)
+        category_index = self._categories.get(category or "")
+        county_index = self._counties.get(county)
+        urgency_value = urgency.value if isinstance(urgency, UrgencyLevel) else str(urgency)
+
+        self._sdg[row] = sdg_vector
+        self._category[row] = category_index
+        self._county[row] = county_index
+        self._urgency[row] = URGENCY_SCORES.get(urgency_value, 0.0)
+        self._students[row] = np.log1p(max(student_count or 0, 0))
+        self._remoteness[row] = self._remoteness_index.weight(location) / MAX_REMOTENESS_WEIGHT
+        self._active[row] = active
+
+    def _deactivate(self, need_id: uuid.UUID) -> None:
+        row = self._row_of.get(need_id)
+        if row is not None:
+            self._active[row] = False
+
+    def _record_donation(self, company_id: uuid.UUID, sdgs: Optional[List[int]], category: str, location: str) -> None:
+        preference = self._companies.setdefault(company_id, CompanyPreference())
+        for sdg in sdgs or []:
+            if 1 <= sdg <= SDG_COUNT:
+                preference.sdg_counts[sdg - 1] += 1.0
+        category_index = self._categories.get(category or "")
+        preference.category_counts[category_index] = preference.category_counts.get(category_index, 0.0) + 1.0
+        county, _ = parse_location(location)
+        county_index = self._counties.get(county)
+        preference.county_counts[county_index] = preference.county_counts.get(county_index, 0.0) + 1.0
+        preference.donated_needs += 1
+
+    def _apply(self, action: str, *args) -> None:
+        """套用增量更新；重建期間先暫存，待新矩陣就緒後重播"""
+        if not self.is_loaded and not self._rebuilding:
+            return
+        if self._rebuilding:
+            self._pending.append((action, args))
+            return
+        getattr(self, action)(*args)
+
+    # --- 寫入路徑的增量更新 ---
+    def on_need_saved(self, need: Need) -> None:
+        """需求新增或更新後同步特徵列"""
+        self._apply(
+            "_upsert", need.id, list(need.sdgs or []), need.category, need.location,
+            need.urgency, need.student_count, need.status == NeedStatus.active
+        )
+
+    def on_need_deleted(self, need_id: uuid.UUID) -> None:
+        """需求刪除後停用特徵列"""
+        self._apply("_deactivate", need_id)
+
+    def on_donation_created(self, company_id: uuid.UUID, need: Need) -> None:
+        """捐贈建立後更新企業偏好並停用已被認捐的需求"""
+        self._apply("_record_donation", company_id, list(need.sdgs or []), need.category, need.location)
+        self._apply("_deactivate", need.id)
+
+    # --- 評分 ---
+    def _preference_vectors(self, company_id: uuid.UUID) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        sdg_pref = np.zeros(SDG_COUNT, dtype=np.float32)
+        category_pref = np.zeros(max(len(self._categories), 1), dtype=np.float32)
+        county_pref = np.zeros(max(len(self._counties), 1), dtype=np.float32)
+
+        preference = self._companies.get(company_id)
+        if preference is None or preference.donated_needs == 0:
+            return sdg_pref, category_pref, county_pref
+
+        norm = np.linalg.norm(preference.sdg_counts)
+        if norm > 0:
+            sdg_pref = preference.sdg_counts / norm
+        for index, count in preference.category_counts.items():
+            category_pref[index] = count
+        for index, count in preference.county_counts.items():
+            county_pref[index] = count
+        category_pref /= max(category_pref.max(), 1.0)
+        county_pref /= max(county_pref.max(), 1.0)
+        return sdg_pref, category_pref, county_pref
+
+    def score(self, company_id: uuid.UUID) -> np.ndarray:
+        """計算企業對所有需求列的分數，非 active 的需求為 -inf"""
+        size = self._size
+        if size == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        sdg_pref, category_pref, county_pref = self._preference_vectors(company_id)
+        students = self._students[:size]
+        max_students = students.max()
+
+        scores = (
+            SCORE_WEIGHTS["sdg"] * (self._sdg[:size] @ sdg_pref)
+            + SCORE_WEIGHTS["category"] * category_pref[self._category[:size]]
+            + SCORE_WEIGHTS["location"] * county_pref[self._county[:size]]
+            + SCORE_WEIGHTS["urgency"] * self._urgency[:size]
+            + SCORE_WEIGHTS["students"] * (students / max_students if max_students > 0 else students)
+            + SCORE_WEIGHTS["remoteness"] * self._remoteness[:size]
+        )
+        return np.where(self._active[:size], scores, -np.inf)
+
+    def recommend(self, company_id: uuid.UUID, limit: int = 20) -> List[Tuple[uuid.UUID, float]]:
+        """回傳分數最高的前 limit 筆 (need_id, score)"""
+        scores = self.score(company_id)
+        active_count = int(self._active[:self._size].sum())
+        k = min(limit, active_count)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._ids[row], float(scores[row])) for row in top]
+
+    def remoteness_of(self, location: Optional[str]) -> Optional[str]:
+        """查詢地點的地區屬性"""
+        return self._remoteness_index.classify(location)
+
+
+recommendation_engine = RecommendationEngine()
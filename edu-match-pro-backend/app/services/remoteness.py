@@ -0,0 +1,99 @@
+import re
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from app.core.config import settings
+
+
+# 地區屬性權重（特偏 > 極偏 > 偏遠，其餘視為一般地區）
+REMOTENESS_WEIGHTS: Dict[str, float] = {
+    "特偏": 3.0,
+    "極偏": 2.0,
+    "偏遠": 1.0,
+}
+MAX_REMOTENESS_WEIGHT = max(REMOTENESS_WEIGHTS.values())
+
+_LOCATION_PATTERN = re.compile(r"^(.{2}[縣市])(.{1,4}?[鄉鎮市區])?")
+
+
+def normalize_place(name: Optional[str]) -> str:
+    """統一地名寫法：去除代碼前綴、空白，並將「台」轉為「臺」"""
+    if not name:
+        return ""
+    name = re.sub(r"^\[?\d+\]?", "", name.strip())
+    return name.replace(" ", "").replace("台", "臺")
+
+
+def parse_location(location: Optional[str]) -> Tuple[str, str]:
+    """將需求地點拆成 (縣市, 鄉鎮市區)，無法辨識的部分回傳空字串"""
+    normalized = normalize_place(location)
+    match = _LOCATION_PATTERN.match(normalized)
+    if not match:
+        return "", ""
+    return match.group(1), match.group(2) or ""
+
+
+class RemotenessIndex:
+    """由 wide_faraway3 建立的地區屬性查詢表"""
+
+    def __init__(self) -> None:
+        self._township: Dict[Tuple[str, str], str] = {}
+        self._county: Dict[str, float] = {}
+
+    async def load(self, session: AsyncSession) -> None:
+        """從 wide_faraway3 載入各鄉鎮市區的地區屬性"""
+        result = await session.execute(
+            text('SELECT "縣市名稱", "鄉鎮市區", "地區屬性" FROM wide_faraway3')
+        )
+        township: Dict[Tuple[str, str], str] = {}
+        county_weights: Dict[str, list] = {}
+        for county_name, township_name, attribute in result.all():
+            weight = REMOTENESS_WEIGHTS.get(attribute or "")
+            if weight is None:
+                continue
+            county = normalize_place(county_name)
+            key = (county, normalize_place(township_name))
+            # 同一鄉鎮有多所學校時取最偏遠的等級
+            current = township.get(key)
+            if current is None or REMOTENESS_WEIGHTS[current] < weight:
+                township[key] = attribute
+            county_weights.setdefault(county, []).append(weight)
+
+        self._township = township
+        self._county = {
+            county: sum(weights) / len(weights)
+            for county, weights in county_weights.items()
+        }
+
+    def classify(self, location: Optional[str]) -> Optional[str]:
+        """回傳地點對應的地區屬性（特偏/極偏/偏遠），查無資料時回傳 None"""
+        county, township = parse_location(location)
+        if not county or not township:
+            return None
+        return self._township.get((county, township))
+
+    def weight(self, location: Optional[str]) -> float:
+        """回傳地點的偏遠權重；只有縣市時以該縣市偏遠學校的平均權重估計"""
+        attribute = self.classify(location)
+        if attribute is not None:
+            return REMOTENESS_WEIGHTS[attribute]
+        county, township = parse_location(location)
+        if county and not township:
+            return self._county.get(county, 0.0)
+        return 0.0
+
+
+_shared_index: Optional[RemotenessIndex] = None
+_shared_loaded_at: float = 0.0
+
+
+async def load_remoteness_index(session: AsyncSession) -> RemotenessIndex:
+    """取得共用的地區屬性查詢表，逾期時重新從資料庫載入"""
+    global _shared_index, _shared_loaded_at
+    now = time.monotonic()
+    if _shared_index is None or now - _shared_loaded_at > settings.recommendation_refresh_seconds:
+        index = RemotenessIndex()
+        await index.load(session)
+        _shared_index, _shared_loaded_at = index, now
+    return _shared_index
@@ -0,0 +1,353 @@
+import asyncio
+import html
+import math
+import re
+import time
+import unicodedata
+import uuid
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
+from app.core.config import settings
+from app.models.need import Need
+from app.models.impact_story import ImpactStory
+
+
+DOC_TYPES = ("need", "story")
+DOC_TYPE_CODES = {doc_type: code for code, doc_type in enumerate(DOC_TYPES)}
+
+# BM25 參數
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 標題中的詞元以兩倍詞頻計算
+TITLE_BOOST = 2
+# 失效文件比例超過此值時壓縮倒排索引
+COMPACT_RATIO = 0.3
+
+_CJK_PATTERN = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+_WORD_PATTERN = re.compile(r"[㐀-䶿一-鿿豈-﫿]+|[0-9a-z]+")
+
+DocKey = Tuple[str, uuid.UUID]
+
+# 各文件類型的來源資料表與內文欄位
+SOURCES = {"need": (Need, Need.description), "story": (ImpactStory, ImpactStory.content)}
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """全形轉半形、轉小寫，並將「台」統一為「臺」"""
+    if not text:
+        return ""
+    return unicodedata.normalize("NFKC", text).lower().replace("台", "臺")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """將文字切成詞元：中文取相鄰字元二元組（單字則保留單字），英數字取整個單字"""
+    tokens: List[str] = []
+    for run in _WORD_PATTERN.findall(normalize_text(text)):
+        if _CJK_PATTERN.fullmatch(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """逐字正規化，並記錄每個正規化後字元在原文中的位置（NFKC 或轉小寫可能改變長度）"""
+    chars: List[str] = []
+    offsets: List[int] = []
+    for i, char in enumerate(text):
+        normalized = normalize_text(char)
+        chars.append(normalized)
+        offsets.extend([i] * len(normalized))
+    return "".join(chars), offsets
+
+
+def highlight(text: Optional[str], query: str, width: int = 60, tag: str = "mark") -> str:
+    """擷取包含查詢詞的片段，並以 <mark> 標示命中的文字（其餘內容經 HTML 跳脫）"""
+    if not text:
+        return ""
+    normalized, offsets = _normalize_with_offsets(text)
+
+    hit = [False] * len(text)
+    for token in set(tokenize(query)):
+        start = normalized.find(token)
+        while start != -1:
+            for i in range(start, start + len(token)):
+                hit[offsets[i]] = True
+            start = normalized.find(token, start + 1)
+
+    first = hit.index(True) if True in hit else 0
+    begin = max(first - width // 3, 0)
+    end = min(begin + width, len(text))
+
+    parts: List[str] = ["…"] if begin > 0 else []
+    i = begin
+    while i < end:
+        j = i
+        while j < end and hit[j] == hit[i]:
+            j += 1
+        segment = html.escape(text[i:j])
+        parts.append(f"<{tag}>{segment}</{tag}>" if hit[i] else segment)
+        i = j
+    if end < len(text):
+        parts.append("…")
+    return "".join(parts)
+
+
+class SearchIndex:
+    """以中文二元組倒排索引與 BM25 排序的記憶體內全文檢索
+
+    需求與影響力故事共用一份索引；create_need / update_need / delete_need
+    寫入後以增量方式更新，並定期依 updated_at 補上其他 worker 的異動（往回重讀一段重疊時間，
+    涵蓋較晚提交但時間戳較早的資料），另外定期比對資料庫的 id 清單，移除已刪除的文件。
+    """
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self._rebuilding = False
+        self._pending: List[Tuple[str, tuple]] = []
+        self._synced_at: float = 0.0
+        self._reconciled_at: float = 0.0
+        self._watermark: Optional[datetime] = None
+        self._reset()
+
+    def clear(self) -> None:
+        """重設為尚未載入的狀態，下次使用時從資料庫重新建立索引
+
+        公開的重設介面：資料在 API 之外大量變更（匯入、還原備份）後呼叫，測試也以此在案例之間重設。
+        """
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self._rebuilding = False
+        self._pending = []
+        self._synced_at = 0.0
+        self._reconciled_at = 0.0
+        self._watermark = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._keys: List[DocKey] = []
+        self._doc_of: Dict[DocKey, int] = {}
+        self._lengths = array("I")
+        self._types = array("B")
+        self._live = bytearray()
+        self._live_count = 0
+        self._live_length = 0
+
+    @property
+    def document_count(self) -> int:
+        return self._live_count
+
+    # --- 索引維護 ---
+    def add(self, doc_type: str, doc_id: uuid.UUID, title: Optional[str], body: Optional[str]) -> None:
+        """新增或取代一份文件"""
+        key = (doc_type, doc_id)
+        self.remove(doc_type, doc_id)
+
+        counts = Counter(tokenize(body))
+        for token in tokenize(title):
+            counts[token] += TITLE_BOOST
+        length = sum(counts.values())
+
+        internal_id = len(self._keys)
+        self._keys.append(key)
+        self._doc_of[key] = internal_id
+        self._lengths.append(length)
+        self._types.append(DOC_TYPE_CODES[doc_type])
+        self._live.append(1)
+        self._live_count += 1
+        self._live_length += length
+
+        for token, tf in counts.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = (array("I"), array("H"))
+                self._postings[token] = postings
+            postings[0].append(internal_id)
+            postings[1].append(min(tf, 65535))
+
+    def remove(self, doc_type: str, doc_id: uuid.UUID) -> None:
+        """將文件標記為失效，倒排索引於壓縮時才清除"""
+        internal_id = self._doc_of.pop((doc_type, doc_id), None)
+        if internal_id is None:
+            return
+        self._live[internal_id] = 0
+        self._live_count -= 1
+        self._live_length -= self._lengths[internal_id]
+        dead = len(self._keys) - self._live_count
+        if dead > 1000 and dead > COMPACT_RATIO * len(self._keys):
+            self.compact()
+
+    def compact(self) -> None:
+        """移除失效文件並重新編號"""
+        live = np.frombuffer(bytes(self._live), dtype=np.uint8).astype(bool)
+        remap = np.cumsum(live, dtype=np.int64) - 1
+        postings: Dict[str, Tuple[array, array]] = {}
+        for token, (ids, tfs) in self._postings.items():
+            id_array = np.frombuffer(ids, dtype=np.uint32)
+            keep = live[id_array]
+            if not keep.any():
+                continue
+            postings[token] = (
+                array("I", remap[id_array[keep]].astype(np.uint32).tobytes()),
+                array("H", np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()),
+            )
+        keys = [key for key, alive in zip(self._keys, self._live) if alive]
+        self._postings = postings
+        self._keys = keys
+        self._doc_of = {key: i for i, key in enumerate(keys)}
+        self._lengths = array("I", (length for length, alive in zip(self._lengths, self._live) if alive))
+        self._types = array("B", (code for code, alive in zip(self._types, self._live) if alive))
+        self._live = bytearray(b"\x01" * len(keys))
+
+    # --- 查詢 ---
+    def search(self, query: str, doc_type: Optional[str] = None, limit: int = 20) -> List[Tuple[DocKey, float]]:
+        """以 BM25 排序回傳 (文件鍵, 分數)"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or self._live_count == 0:
+            return []
+
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+        average_length = self._live_length / self._live_count
+        scores = np.zeros(len(self._keys), dtype=np.float32)
+        matched = False
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            ids = np.frombuffer(postings[0], dtype=np.uint32)
+            tfs = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+            # 文件頻率含尚未壓縮的失效文件，誤差受 COMPACT_RATIO 限制
+            document_frequency = min(len(ids), self._live_count)
+            idf = math.log(1 + (self._live_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[ids] / np.float32(average_length))
+            scores[ids] += np.float32(idf) * tfs * np.float32(BM25_K1 + 1) / (tfs + norm)
+            matched = True
+        if not matched:
+            return []
+
+        # 以密集陣列篩選候選文件，避免對大型倒排列表排序去重
+        scores *= np.frombuffer(self._live, dtype=np.uint8)
+        if doc_type is not None:
+            types = np.frombuffer(self._types, dtype=np.uint8)
+            scores[types != DOC_TYPE_CODES[doc_type]] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) == 0:
+            return []
+
+        candidate_scores = scores[candidates]
+        k = min(limit, len(candidates))
+        top = np.argpartition(-candidate_scores, k - 1)[:k]
+        top = top[np.argsort(-candidate_scores[top], kind="stable")]
+        return [(self._keys[candidates[i]], float(candidate_scores[i])) for i in top]
+
+    # --- 與資料庫同步 ---
+    async def ensure_synced(self, session: AsyncSession) -> None:
+        """首次使用時完整載入，之後定期依 updated_at 補上其他 worker 的異動"""
+        if self._loaded and time.monotonic() - self._synced_at < settings.search_sync_seconds:
+            return
+        if self._loaded and self._lock.locked():
+            return
+        async with self._lock:
+            if self._loaded and time.monotonic() - self._synced_at < settings.search_sync_seconds:
+                return
+            await self._sync(session)
+
+    async def _sync(self, session: AsyncSession) -> None:
+        watermark = self._watermark
+        # 時間戳由應用程式設定，其他 worker 可能較晚才提交較早的時間戳，因此往回重讀一段重疊時間
+        since = watermark - timedelta(seconds=settings.search_sync_overlap_seconds) if watermark else None
+        reconcile = (
+            self._loaded and time.monotonic() - self._reconciled_at >= settings.search_reconcile_seconds
+        )
+
+        # 同步期間的增量更新先暫存，最後重播，避免比對 id 時誤刪剛寫入的文件
+        self._rebuilding = True
+        sources: Dict[str, list] = {}
+        live_ids: Dict[str, set] = {}
+        try:
+            for doc_type, (model, body_column) in SOURCES.items():
+                columns = (model.id, model.title, body_column, model.created_at, model.updated_at)
+                query = select(*columns)
+                if since is not None:
+                    query = query.where(or_(model.created_at > since, model.updated_at > since))
+                sources[doc_type] = list((await session.execute(query)).all())
+                if not reconcile:
+                    continue
+                # 比對 id 清單：補上重疊時間也沒涵蓋到的文件，之後移除資料庫中已刪除的文件
+                live_ids[doc_type] = set((await session.execute(select(model.id))).scalars().all())
+                indexed = {doc_id for key_type, doc_id in self._doc_of if key_type == doc_type}
+                missing = live_ids[doc_type] - indexed - {row.id for row in sources[doc_type]}
+                if missing:
+                    result = await session.execute(select(*columns).where(model.id.in_(missing)))
+                    sources[doc_type].extend(result.all())
+        except BaseException:
+            self._rebuilding = False
+            if self._loaded:
+                self._replay_pending()
+            raise
+
+        # 以下不再 await，套用過程不會與其他協程交錯
+        newest = watermark
+        for doc_type, rows in sources.items():
+            for doc_id, title, body, created_at, updated_at in rows:
+                self.add(doc_type, doc_id, title, body)
+                changed_at = max(created_at, updated_at or created_at)
+                if newest is None or changed_at > newest:
+                    newest = changed_at
+        if reconcile:
+            for doc_type, doc_id in list(self._doc_of):
+                if doc_id not in live_ids[doc_type]:
+                    self.remove(doc_type, doc_id)
+
+        self._rebuilding = False
+        self._replay_pending()
+        self._watermark = newest
+        self._synced_at = time.monotonic()
+        if reconcile or not self._loaded:
+            self._reconciled_at = self._synced_at
+        self._loaded = True
+
+    def _replay_pending(self) -> None:
+        pending, self._pending = self._pending, []
+        for action, args in pending:
+            getattr(self, action)(*args)
+
+    def _apply(self, action: str, *args) -> None:
+        """套用增量更新；同步期間先暫存，同步完成後重播"""
+        if self._rebuilding:
+            self._pending.append((action, args))
+        elif self._loaded:
+            getattr(self, action)(*args)
+
+    def on_need_saved(self, need: Need) -> None:
+        """需求新增或更新後重新索引"""
+        self._apply("add", "need", need.id, need.title, need.description)
+
+    def on_need_deleted(self, need_id: uuid.UUID) -> None:
+        """需求刪除後自索引移除"""
+        self._apply("remove", "need", need_id)
+
+    def discard(self, keys: Iterable[DocKey]) -> None:
+        """移除查詢時發現資料庫中已不存在的文件（其他 worker 刪除，尚未比對到）"""
+        for doc_type, doc_id in keys:
+            self._apply("remove", doc_type, doc_id)
+
+    def add_many(self, documents: Iterable[Tuple[str, uuid.UUID, str, str]]) -> None:
+        """批次加入文件（供效能測試或離線建立索引使用）"""
+        for doc_type, doc_id, title, body in documents:
+            self.add(doc_type, doc_id, title, body)
+        self._loaded = True
+        self._synced_at = time.monotonic()
+
+
+search_index = SearchIndex()
@@ -5,6 +5,7 @@ Edu Match Pro Backend CLI Tool
 """
 
 import asyncio
+import json
 import os
 import sys
 import subprocess
@@ -129,18 +130,26 @@ def run(host: str, port: int, reload: bool):
         sys.exit(1)
 
 @cli.command()
-@click.option('--file', default='data/edu_B_1_4.csv', help='CSV 檔案路徑')
-def ingest_data(file: str):
+@click.option('--file', default=None, help='CSV 檔案路徑（未指定時匯入 data/ 下的 edu_B_1_4.csv 與 faraway3.csv）')
+@click.option('--table', type=click.Choice(['edu', 'faraway']), default='edu', help='--file 的資料格式')
+@click.option('--batch-size', default=5000, help='每次 COPY 的列數')
+@click.option('--dry-run', is_flag=True, help='只解析與驗證，不寫入資料庫')
+def ingest_data(file: Optional[str], table: str, batch_size: int, dry_run: bool):
     """匯入教育資料"""
-    click.echo(f"📊 匯入資料從 {file}...")
+    click.echo(f"📊 匯入資料從 {file or 'data/'}...")
     
-    if not os.path.exists(file):
-        click.echo(f"❌ 檔案不存在: {file}")
-        sys.exit(1)
+    cmd = ['python', 'scripts/ingest_school_tables.py', '--batch-size', str(batch_size)]
+    if file is not None:
+        if not os.path.exists(file):
+            click.echo(f"❌ 檔案不存在: {file}")
+            sys.exit(1)
+        cmd += ['--only', table, f'--{table}', os.path.abspath(file)]
+    if dry_run:
+        cmd.append('--dry-run')
     
     try:
         result = subprocess.run(
-            ['python', 'scripts/ingest_school_tables.py'],
+            cmd,
             check=True,
             capture_output=True,
             text=True,
@@ -155,6 +164,83 @@ def ingest_data(file: str):
             click.echo(e.stderr)
         sys.exit(1)
 
+@cli.command()
+def rebuild_dashboards():
+    """從需求與捐贈資料重建儀表板彙總表"""
+    click.echo("🔄 重建儀表板彙總...")
+
+    async def _rebuild() -> int:
+        from app.db import async_session_local, engine
+        from app.crud.dashboard_crud import rebuild_dashboard_rollups
+        try:
+            async with async_session_local() as session:
+                return await rebuild_dashboard_rollups(session)
+        finally:
+            await engine.dispose()
+
+    try:
+        count = asyncio.run(_rebuild())
+        click.echo(f"✅ 已重建 {count} 位使用者的儀表板彙總")
+    except Exception as e:
+        click.echo(f"❌ 重建失敗: {e}")
+        sys.exit(1)
+
+@cli.command()
+@click.option('--file', 'path', default=None, help='慢查詢 JSONL 路徑（預設為 SLOW_QUERY_LOG_PATH）')
+@click.option('--limit', default=10, help='顯示的語句數')
+@click.option('--show-plan', is_flag=True, help='顯示每個語句的執行計畫')
+def slow_queries(path: str, limit: int, show_plan: bool):
+    """依語句指紋彙總慢查詢紀錄"""
+    from app.core.config import settings
+    from app.core.slow_query_log import load_captures, summarize
+
+    path = path or settings.slow_query_log_path
+    if not path or not os.path.exists(path):
+        click.echo(f"❌ 找不到慢查詢紀錄: {path}")
+        sys.exit(1)
+
+    summary = summarize(load_captures(path))
+    click.echo(f"🐢 共 {sum(entry['count'] for entry in summary)} 筆慢查詢，{len(summary)} 種語句")
+    for entry in summary[:limit]:
+        click.echo("")
+        click.echo(
+            f"[{entry['fingerprint']}] {entry['count']} 次  總計 {entry['total_ms']:.0f}ms  "
+            f"p50 {entry['p50_ms']:.0f}ms  p95 {entry['p95_ms']:.0f}ms  最大 {entry['max_ms']:.0f}ms"
+        )
+        click.echo(f"  語句: {entry['statement'][:300]}")
+        click.echo(f"  請求: {', '.join(entry['requests'])}")
+        click.echo(f"  參數型別: {entry['parameter_types']}")
+        if show_plan and entry['plan']:
+            click.echo(json.dumps(entry['plan'], ensure_ascii=False, indent=2))
+
+@cli.command()
+@click.option('--months-ahead', default=None, type=int, help='預先建立的未來月份數（預設為 ACTIVITY_LOG_PARTITION_MONTHS_AHEAD）')
+@click.option('--archive', is_flag=True, help='匯出並移除超過保留期限的分區')
+@click.option('--retention-months', default=None, type=int, help='保留月數（預設為 ACTIVITY_LOG_RETENTION_MONTHS）')
+def activity_partitions(months_ahead: Optional[int], archive: bool, retention_months: Optional[int]):
+    """建立活動日誌的未來月份分區，並可封存過期分區"""
+    click.echo("🗂️  維護活動日誌分區...")
+
+    async def _maintain():
+        from app.db import async_session_local, engine
+        from app.crud.activity_log_crud import archive_activity_log_partitions, ensure_activity_log_partitions
+        try:
+            async with async_session_local() as session:
+                created = await ensure_activity_log_partitions(session, months_ahead)
+                archived = await archive_activity_log_partitions(session, retention_months) if archive else []
+                return created, archived
+        finally:
+            await engine.dispose()
+
+    try:
+        created, archived = asyncio.run(_maintain())
+        click.echo(f"✅ 新建分區: {', '.join(created) or '無'}")
+        for path in archived:
+            click.echo(f"📦 已封存: {path}")
+    except Exception as e:
+        click.echo(f"❌ 分區維護失敗: {e}")
+        sys.exit(1)
+
 @cli.command()
 def clean():
     """清理快取和臨時檔案"""
@@ -237,6 +323,34 @@ def create_migration(name: str):
             click.echo(e.stderr)
         sys.exit(1)
 
+@cli.command()
+@click.option('--target-ms', default=250, help='單次雜湊的目標耗時（毫秒）')
+@click.option('--samples', default=3, help='每個 cost 的量測次數')
+@click.option('--min-rounds', default=10, help='允許的最低 cost')
+def calibrate_bcrypt(target_ms: int, samples: int, min_rounds: int):
+    """依目前硬體挑選符合目標耗時的 bcrypt cost"""
+    import statistics
+    import time
+    import bcrypt
+
+    click.echo(f"⏱️  校正 bcrypt cost（目標 {target_ms} ms）...")
+    password = b"calibration-password"
+    chosen = min_rounds
+    for rounds in range(min_rounds, 17):
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+            timings.append((time.perf_counter() - start) * 1000)
+        median_ms = statistics.median(timings)
+        click.echo(f"  cost {rounds:>2}: {median_ms:8.1f} ms")
+        if median_ms > target_ms:
+            break
+        chosen = rounds
+
+    click.echo(f"✅ 建議設定 BCRYPT_ROUNDS={chosen}")
+    click.echo("   變更後使用者下次登入時會自動以新的 cost 重新雜湊")
+
 @cli.command()
 def docs():
     """顯示 API 文件網址"""
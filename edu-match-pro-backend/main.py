@@ -1,8 +1,69 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1.endpoints import auth, needs, donations, dashboard, stories, activity
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.middleware import MetricsMiddleware, QueryStatsMiddleware
+from app.core.serialization import ORJSONResponse
+from app.core.slow_query_log import slow_query_log
+from app.services.activity_log_writer import activity_log_writer
+from app.services.realtime import realtime_hub
+from app.services.recent_activity import recent_activity_feed
+from app.crud.activity_log_crud import ensure_activity_log_partitions
+from app.db import async_session_local
+from app.api.v1.endpoints.needs import NEXT_CURSOR_HEADER
+from app.api.v1.endpoints import auth, needs, donations, dashboard, stories, activity, recommendations, allocations, search, realtime, exports, batch, health
 
-app = FastAPI(title="Edu-Match-Pro API", version="1.0.0")
+
+logger = logging.getLogger(__name__)
+
+
+async def _ensure_partitions_loop() -> None:
+    # 長時間運行的 worker 跨月後仍需建立新的月份分區；重複執行與多個 worker 同時執行都是安全的
+    while True:
+        await asyncio.sleep(settings.activity_log_partition_check_seconds)
+        try:
+            async with async_session_local() as session:
+                await ensure_activity_log_partitions(session)
+        except Exception:
+            logger.exception("Could not create activity_log partitions")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 預先建立活動日誌的月份分區；失敗時資料仍會落入預設分區，不阻擋啟動
+    try:
+        async with async_session_local() as session:
+            await ensure_activity_log_partitions(session)
+    except Exception:
+        logger.exception("Could not create activity_log partitions at startup")
+    partition_task = asyncio.create_task(_ensure_partitions_loop())
+    await registry.start()
+    await realtime_hub.start()
+    # 預先載入最新活動快取；失敗時改由第一個請求載入
+    try:
+        async with async_session_local() as session:
+            await recent_activity_feed.prime(session)
+    except Exception:
+        logger.exception("Could not prime the recent activity feed at startup")
+    await recent_activity_feed.start()
+    yield
+    partition_task.cancel()
+    # 關閉前寫出尚未寫入的活動日誌（並推播）與慢查詢紀錄
+    await activity_log_writer.stop()
+    await recent_activity_feed.stop()
+    await realtime_hub.stop()
+    await slow_query_log.flush()
+    await registry.stop()
+
+
+# 未指定回應類別的端點一律以 orjson 編碼
+app = FastAPI(
+    title="Edu-Match-Pro API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse
+)
 
 # 設定 CORS
 app.add_middleware(
@@ -11,8 +72,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 跨來源時瀏覽器只讓前端讀取白名單內的回應標頭；分頁游標放在 X-Next-Cursor
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# 統計每個請求的 SQL 數量與耗時（Server-Timing 標頭與 /metrics）
+if settings.query_stats_enabled:
+    app.add_middleware(QueryStatsMiddleware)
+
+# 記錄各路由的延遲與請求數，於 /metrics 以 Prometheus 格式輸出
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # 包含 API 路由
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(needs.router, prefix="/api/v1")
@@ -20,7 +91,24 @@ app.include_router(donations.router, prefix="/api/v1")
 app.include_router(dashboard.router, prefix="/api/v1")
 app.include_router(stories.router, prefix="/api/v1")
 app.include_router(activity.router, prefix="/api/v1")
+app.include_router(recommendations.router, prefix="/api/v1")
+app.include_router(allocations.router, prefix="/api/v1")
+app.include_router(search.router, prefix="/api/v1")
+app.include_router(realtime.router, prefix="/api/v1")
+app.include_router(exports.router, prefix="/api/v1")
+app.include_router(batch.router, prefix="/api/v1")
+
+# 維運用端點不加版本前綴
+app.include_router(health.router)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Edu-Match-Pro API"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 格式的指標（多 worker 時合併所有 worker）"""
+    # 本 worker 的快照在事件迴圈上取得，讀寫共用目錄的檔案在執行緒中進行
+    body = await asyncio.to_thread(registry.render, registry.snapshot())
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
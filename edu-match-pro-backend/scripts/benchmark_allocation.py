@@ -0,0 +1,63 @@
+"""預算配置最佳化效能測試：候選需求數由 1k 成長到 100k 時的求解時間"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.allocation_optimizer import (  # noqa: E402
+    can_solve_exactly, solve_approximate, solve_exact
+)
+
+
+SIZES = [100, 1_000, 5_000, 10_000, 50_000, 100_000]
+
+
+def synthetic_candidates(n: int, rng: np.random.Generator):
+    """產生模擬的需求金額與加權受益學生數"""
+    costs = rng.integers(5_000, 500_000, n)
+    students = rng.integers(5, 300, n)
+    multipliers = rng.choice([1, 2, 3, 4], n, p=[0.4, 0.3, 0.2, 0.1])
+    return costs, students * multipliers
+
+
+def timed(fn, repeat: int):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - started) * 1000)
+    return result, float(np.median(durations))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ratio", type=float, default=0.05, help="預算佔全部需求總金額的比例")
+    parser.add_argument("--repeat", type=int, default=5, help="每個規模重複次數（取中位數）")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'candidates':>10} {'approx ms':>10} {'exact ms':>10} {'gap':>8} {'selected':>9}")
+    for n in SIZES:
+        costs, values = synthetic_candidates(n, rng)
+        budget = int(costs.sum() * args.budget_ratio)
+        approx, approx_ms = timed(lambda: solve_approximate(costs, values, budget), args.repeat)
+        approx_value = int(values[approx.selected].sum())
+
+        # 精確解只在 DP 表格可容納時計算，用來衡量近似解的差距
+        exact_ms = gap = "-"
+        if can_solve_exactly(values):
+            exact, ms = timed(lambda: solve_exact(costs, values, budget), 1)
+            exact_value = int(values[exact.selected].sum())
+            exact_ms = f"{ms:.1f}"
+            gap = f"{(exact_value - approx_value) / max(exact_value, 1):.4%}"
+        print(f"{n:>10} {approx_ms:>10.1f} {exact_ms:>10} {gap:>8} {len(approx.selected):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""認捐競爭效能測試：大量企業同時認捐同一需求時，比較舊的列鎖排隊與條件式 UPDATE"""
+import argparse
+import asyncio
+import statistics
+import sys
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.crud.donation_crud import _claim_need, _record_donation  # noqa: E402
+from app.db import create_engine  # noqa: E402
+from app.models.activity_log import ActivityLog  # noqa: E402
+from app.models.dashboard_rollup import DashboardRollup  # noqa: E402
+from app.models.donation import Donation  # noqa: E402
+from app.models.need import Need, NeedStatus, UrgencyLevel  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.schemas.donation_schemas import DonationCreate  # noqa: E402
+
+
+async def claim_with_row_lock(
+    session: AsyncSession, donation_in: DonationCreate, company_id: uuid.UUID, hold: float
+) -> Optional[Donation]:
+    """舊的認捐流程：SELECT ... FOR UPDATE 鎖定需求後才檢查狀態，其他企業在鎖上排隊"""
+    result = await session.execute(select(Need).where(Need.id == donation_in.need_id).with_for_update())
+    need = result.scalar_one_or_none()
+    if not need or need.status != NeedStatus.active:
+        return None
+    need.status = NeedStatus.in_progress
+    await asyncio.sleep(hold)
+    return await _record_donation(session, need, donation_in, company_id)
+
+
+async def claim_with_conditional_update(
+    session: AsyncSession, donation_in: DonationCreate, company_id: uuid.UUID, hold: float
+) -> Optional[Donation]:
+    """目前的認捐流程（同 create_donation）：條件式 UPDATE ... WHERE status = 'active'，輸家在贏家提交後重新檢查狀態返回"""
+    if not await _claim_need(session, donation_in.need_id):
+        return None
+    need = await session.get(Need, donation_in.need_id, populate_existing=True)
+    await asyncio.sleep(hold)
+    return await _record_donation(session, need, donation_in, company_id)
+
+
+PROTOCOLS = {"row-lock": claim_with_row_lock, "conditional-update": claim_with_conditional_update}
+
+
+async def seed(maker: async_sessionmaker, companies: int, rounds: int) -> Tuple[List[uuid.UUID], List[uuid.UUID]]:
+    """建立一所學校、每輪一筆需求與 companies 家企業（不經過雜湊密碼，僅供量測）"""
+    school = User(email=f"bench_claims_{uuid.uuid4().hex[:8]}@example.com", password="-", role=UserRole.SCHOOL)
+    company_users = [
+        User(email=f"bench_claims_{uuid.uuid4().hex}@example.com", password="-", role=UserRole.COMPANY)
+        for _ in range(companies)
+    ]
+    needs = [
+        Need(
+            school_id=school.id, title=f"熱門需求 {index}", description="認捐競爭效能測試", category="教學設備",
+            location="南投縣信義鄉", student_count=30, urgency=UrgencyLevel.high, sdgs=[4]
+        )
+        for index in range(rounds * len(PROTOCOLS))
+    ]
+    async with maker() as session:
+        session.add(school)
+        await session.flush()
+        session.add_all(company_users + needs)
+        await session.commit()
+    return [user.id for user in [school, *company_users]], [need.id for need in needs]
+
+
+async def cleanup(maker: async_sessionmaker, user_ids: List[uuid.UUID], need_ids: List[uuid.UUID]) -> None:
+    async with maker() as session:
+        await session.execute(delete(Donation).where(Donation.need_id.in_(need_ids)))
+        await session.execute(delete(Need).where(Need.id.in_(need_ids)))
+        await session.execute(delete(ActivityLog).where(ActivityLog.user_id.in_(user_ids)))
+        await session.execute(delete(DashboardRollup).where(DashboardRollup.user_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+async def hammer(
+    maker: async_sessionmaker, protocol: str, need_id: uuid.UUID, company_ids: List[uuid.UUID], hold: float
+) -> Dict[str, Any]:
+    """所有企業同時認捐同一需求，分別記錄每筆認捐的總延遲與取得連線後佔用連線的時間"""
+    claim = PROTOCOLS[protocol]
+    donation_in = DonationCreate(need_id=need_id, donation_type="物資")
+
+    async def _one(company_id: uuid.UUID) -> Tuple[str, float, float]:
+        started = time.perf_counter()
+        held = started
+        try:
+            async with maker() as session:
+                await session.connection()
+                held = time.perf_counter()
+                donation = await claim(session, donation_in, company_id, hold)
+            outcome = "won" if donation else "conflict"
+        except Exception as e:
+            outcome = type(e).__name__
+        finished = time.perf_counter()
+        return outcome, (finished - started) * 1000, (finished - held) * 1000
+
+    def _percentiles(values: List[float]) -> Tuple[float, float]:
+        values = sorted(values)
+        if not values:
+            return 0.0, 0.0
+        return statistics.median(values), values[max(int(len(values) * 0.95) - 1, 0)]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_one(company_id) for company_id in company_ids))
+    wall_ms = (time.perf_counter() - started) * 1000
+    conflicts = [(total, held) for outcome, total, held in results if outcome == "conflict"]
+    errors: Dict[str, int] = {}
+    for outcome, _, _ in results:
+        if outcome not in ("won", "conflict"):
+            errors[outcome] = errors.get(outcome, 0) + 1
+    return {
+        "won": sum(outcome == "won" for outcome, _, _ in results),
+        "conflicts": len(conflicts),
+        "errors": errors,
+        "total_ms": _percentiles([total for total, _ in conflicts]),
+        "held_ms": _percentiles([held for _, held in conflicts]),
+        "wall_ms": wall_ms,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    # 與 API worker 相同的有限連線池：排隊的認捐會佔住連線，讓其他請求等待甚至逾時
+    settings.db_pool_size, settings.db_max_overflow = args.pool_size, 0
+    engine = create_engine("api", url=args.url)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    user_ids, need_ids = await seed(maker, args.claims, args.rounds)
+    school_id, company_ids = user_ids[0], user_ids[1:]
+    try:
+        print(
+            f"{args.claims} parallel claims per need, pool size {args.pool_size}, "
+            f"winner holds its transaction {args.hold_ms:g}ms, {args.rounds} rounds"
+        )
+        # held：輸家取得連線後到釋放連線的時間（在列鎖上等待的時間也算在內）
+        print(
+            f"{'protocol':<20}{'won':>5}{'409':>6}{'errors':>8}"
+            f"{'total p50':>12}{'total p95':>12}{'held p50':>12}{'held p95':>12}{'wall':>11}"
+        )
+        needs = iter(need_ids)
+        for _ in range(args.rounds):
+            for protocol in PROTOCOLS:
+                r = await hammer(maker, protocol, next(needs), company_ids, args.hold_ms / 1000)
+                errors = sum(r["errors"].values())
+                print(
+                    f"{protocol:<20}{r['won']:>5}{r['conflicts']:>6}{errors:>8}"
+                    f"{r['total_ms'][0]:>10.1f}ms{r['total_ms'][1]:>10.1f}ms"
+                    f"{r['held_ms'][0]:>10.1f}ms{r['held_ms'][1]:>10.1f}ms{r['wall_ms']:>9.1f}ms"
+                )
+                if r["errors"]:
+                    print(f"  errors: {r['errors']}")
+                # 每個需求只能有一筆捐贈
+                assert r["won"] <= 1, f"{protocol} created {r['won']} donations for one need"
+    finally:
+        if not args.keep:
+            await cleanup(maker, [school_id, *company_ids], need_ids)
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--claims", type=int, default=500, help="同時認捐同一需求的企業數")
+    parser.add_argument("--rounds", type=int, default=3, help="每種流程重複的輪數（每輪一筆新需求）")
+    parser.add_argument("--hold-ms", type=float, default=20.0, help="得標者在交易中額外停留的時間（模擬網路延遲與其他寫入）")
+    parser.add_argument("--pool-size", type=int, default=settings.db_pool_size, help="連線池大小")
+    parser.add_argument("--url", default=settings.test_database_url or settings.database_url, help="資料庫連線字串（預設為測試資料庫）")
+    parser.add_argument("--keep", action="store_true", help="保留測試資料供手動檢查")
+    args = parser.parse_args()
+    # 量測期間不擷取慢查詢，避免背景 EXPLAIN 干擾結果
+    settings.slow_query_log_enabled = False
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""匯出記憶體測試：比較一次載入所有 ORM 物件再編碼與伺服器端游標串流匯出，在不同筆數下的 Python 記憶體峰值"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Awaitable, Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson  # noqa: E402
+from sqlalchemy import delete, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.export import stream_export  # noqa: E402
+from app.crud.need_crud import need_export_query  # noqa: E402
+from app.db import create_engine  # noqa: E402
+from app.models.need import Need, UrgencyLevel  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.schemas.need_schemas import NEED_PUBLIC  # noqa: E402
+
+SIZES = [1_000, 10_000, 50_000]
+
+
+async def seed(maker: async_sessionmaker, location: str, count: int) -> uuid.UUID:
+    """建立一所學校與 count 筆位於 location 的需求（多列 INSERT，不經過 ORM）"""
+    school = User(email=f"bench_exports_{uuid.uuid4().hex}@example.com", password="-", role=UserRole.SCHOOL)
+    async with maker() as session:
+        session.add(school)
+        await session.flush()
+        for start in range(0, count, 5_000):
+            await session.execute(insert(Need), [
+                {
+                    "id": uuid.uuid4(), "school_id": school.id, "title": f"匯出需求 {index}",
+                    "description": "匯出記憶體測試" * 10, "category": "教學設備", "location": location,
+                    "student_count": 20, "estimated_cost": 10_000, "urgency": UrgencyLevel.medium, "sdgs": [4, 10]
+                }
+                for index in range(start, min(start + 5_000, count))
+            ])
+        await session.commit()
+    return school.id
+
+
+async def materialized(maker: async_sessionmaker, location: str) -> int:
+    """一次載入所有 ORM 物件再編碼成 NDJSON（不使用串流時的做法）"""
+    async with maker() as session:
+        needs = (await session.execute(select(Need).where(Need.location == location))).scalars().all()
+        body = b"".join(orjson.dumps(row, default=str) + b"\n" for row in NEED_PUBLIC.many(needs))
+    return len(body)
+
+
+async def streamed(maker: async_sessionmaker, location: str, chunk_size: int, compress: bool = False) -> int:
+    """目前的匯出流程：伺服器端游標每次取 chunk_size 列並逐段編碼（位元組直接丟棄，模擬送給客戶端）"""
+    size = 0
+    async for chunk in stream_export(maker(), need_export_query(location=location), "ndjson", compress, chunk_size):
+        size += len(chunk)
+    return size
+
+
+async def measure(func: Callable[[], Awaitable[int]]) -> Tuple[int, float, float]:
+    """回傳輸出位元組數、耗時（毫秒）與 tracemalloc 記錄到的記憶體峰值（MB）"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = await func()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak / 1024 / 1024
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine = create_engine("api", url=args.url)
+    maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    school_ids: List[uuid.UUID] = []
+    try:
+        print(f"chunk size {args.chunk_size}")
+        print(f"{'rows':>7}{'output':>10}{'materialized':>16}{'peak':>10}{'streamed':>12}{'peak':>10}{'streamed+gzip':>16}{'peak':>10}")
+        for size in SIZES:
+            location = f"匯出測試{uuid.uuid4().hex[:8]}"
+            school_ids.append(await seed(maker, location, size))
+            output, old_ms, old_mb = await measure(lambda: materialized(maker, location))
+            streamed_output, new_ms, new_mb = await measure(lambda: streamed(maker, location, args.chunk_size))
+            _, gzip_ms, gzip_mb = await measure(lambda: streamed(maker, location, args.chunk_size, compress=True))
+            assert output == streamed_output
+            print(
+                f"{size:>7}{output / 1024 / 1024:>8.1f}MB{old_ms:>14.0f}ms{old_mb:>8.1f}MB"
+                f"{new_ms:>10.0f}ms{new_mb:>8.1f}MB{gzip_ms:>14.0f}ms{gzip_mb:>8.1f}MB"
+            )
+    finally:
+        async with maker() as session:
+            await session.execute(delete(Need).where(Need.school_id.in_(school_ids)))
+            await session.execute(delete(User).where(User.id.in_(school_ids)))
+            await session.commit()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunk-size", type=int, default=settings.export_chunk_size, help="伺服器端游標每次取回的列數")
+    parser.add_argument("--url", default=settings.test_database_url or settings.database_url, help="資料庫連線字串（預設為測試資料庫）")
+    args = parser.parse_args()
+    # 量測期間不擷取慢查詢，避免背景 EXPLAIN 干擾結果
+    settings.slow_query_log_enabled = False
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""索引效能測試：在獨立 schema 中以合成資料量測外鍵與篩選欄位索引加入前後的執行計畫與延遲"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncConnection  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db import create_engine  # noqa: E402
+
+SCHEMA = "bench_indexes"
+TABLES = ["need", "donation", "activity_log", "impact_story", "profile"]
+
+# 先前遷移已建立的索引（量測的「之前」狀態）
+EXISTING_INDEXES = [
+    "CREATE INDEX ON {s}.need (created_at, id)",
+    "CREATE INDEX ON {s}.need (status, created_at, id)",
+    "CREATE INDEX ON {s}.need (school_id, created_at, id)",
+    "CREATE INDEX ON {s}.need USING gin (sdgs)",
+]
+
+# 與 b7e4f0a3c915 遷移相同的索引
+NEW_INDEXES = [
+    "CREATE INDEX ON {s}.need (school_id, status) INCLUDE (id, student_count)",
+    "CREATE INDEX ON {s}.donation (company_id, status) INCLUDE (need_id)",
+    "CREATE INDEX ON {s}.donation (company_id, created_at DESC)",
+    "CREATE INDEX ON {s}.donation (need_id, status) INCLUDE (company_id)",
+    "CREATE INDEX ON {s}.impact_story (donation_id)",
+    "CREATE INDEX ON {s}.profile (user_id)",
+    "CREATE INDEX ON {s}.activity_log (user_id, created_at DESC)",
+    "CREATE INDEX ON {s}.activity_log (created_at DESC)",
+]
+
+# 以 md5(前綴 || 序號) 產生可重現的 UUID，查詢時可隨機挑選既有的鍵
+SEED_SQL = [
+    """
+    INSERT INTO {s}.need (id, created_at, school_id, title, description, category, location,
+                          student_count, urgency, sdgs, status)
+    SELECT md5('need' || g)::uuid, now() - random() * interval '730 days',
+           md5('school' || floor(random() * :schools)::int)::uuid,
+           '需求 ' || g, '合成資料', (ARRAY['教育', '科技', '體育', '藝術'])[1 + floor(random() * 4)::int],
+           '花蓮縣秀林鄉', 1 + floor(random() * 200)::int,
+           (ARRAY['high', 'medium', 'low'])[1 + floor(random() * 3)::int]::urgencylevel,
+           ARRAY[1 + floor(random() * 17)::int, 1 + floor(random() * 17)::int],
+           (ARRAY['active', 'in_progress', 'completed'])[1 + floor(random() * 3)::int]::needstatus
+    FROM generate_series(0, :needs - 1) AS g
+    """,
+    """
+    INSERT INTO {s}.donation (id, created_at, company_id, need_id, donation_type, status, progress)
+    SELECT md5('donation' || g)::uuid, now() - random() * interval '730 days',
+           md5('company' || floor(random() * :companies)::int)::uuid,
+           md5('need' || floor(random() * :needs)::int)::uuid,
+           '物資捐贈',
+           (ARRAY['pending', 'approved', 'in_progress', 'completed', 'cancelled'])[1 + floor(random() * 5)::int]::donationstatus,
+           floor(random() * 101)::int
+    FROM generate_series(0, :rows - 1) AS g
+    """,
+    """
+    INSERT INTO {s}.activity_log (id, created_at, user_id, activity_type, description)
+    SELECT md5('activity' || g)::uuid, now() - random() * interval '730 days',
+           CASE WHEN random() < 0.5
+                THEN md5('school' || floor(random() * :schools)::int)::uuid
+                ELSE md5('company' || floor(random() * :companies)::int)::uuid END,
+           (ARRAY['user_login', 'need_created', 'donation_created', 'donation_completed'])[1 + floor(random() * 4)::int]::activitytype,
+           '合成活動 ' || g
+    FROM generate_series(0, :rows - 1) AS g
+    """,
+    """
+    INSERT INTO {s}.impact_story (id, created_at, donation_id, title, content)
+    SELECT md5('story' || g)::uuid, now() - random() * interval '730 days',
+           md5('donation' || (g * 10))::uuid, '影響力故事 ' || g, '合成資料'
+    FROM generate_series(0, :stories - 1) AS g
+    """,
+    """
+    INSERT INTO {s}.profile (id, created_at, user_id, organization_name, contact_person, position, phone, address)
+    SELECT md5('profile' || prefix || g)::uuid, now(), md5(prefix || g)::uuid, prefix || g, '聯絡人', '職稱', '0900000000', '地址'
+    FROM (SELECT 'school' AS prefix, g FROM generate_series(0, :schools - 1) AS g
+          UNION ALL
+          SELECT 'company', g FROM generate_series(0, :companies - 1) AS g) AS users
+    """,
+]
+
+# 實際 CRUD 的查詢形狀；參數以 (前綴, 上限) 指定，每次量測隨機挑選一個既有的鍵
+QUERIES: List[Tuple[str, str, Tuple[str, str]]] = [
+    ("school dashboard", """
+        SELECT count(id), count(id) FILTER (WHERE status = 'active'),
+               count(id) FILTER (WHERE status = 'completed'),
+               coalesce(sum(student_count) FILTER (WHERE status = 'completed'), 0)
+        FROM {s}.need WHERE school_id = :key
+    """, ("school", "schools")),
+    ("company dashboard", """
+        SELECT count(d.id) FILTER (WHERE d.status = 'completed'),
+               coalesce(sum(n.student_count) FILTER (WHERE d.status = 'completed'), 0)
+        FROM {s}.donation d JOIN {s}.need n ON d.need_id = n.id
+        WHERE d.company_id = :key
+    """, ("company", "companies")),
+    ("my donations", """
+        SELECT * FROM {s}.donation WHERE company_id = :key ORDER BY created_at DESC
+    """, ("company", "companies")),
+    ("need donations", """
+        SELECT company_id, status FROM {s}.donation WHERE need_id = :key
+    """, ("need", "needs")),
+    ("user activity", """
+        SELECT * FROM {s}.activity_log WHERE user_id = :key ORDER BY created_at DESC LIMIT 20
+    """, ("school", "schools")),
+    ("recent activity", """
+        SELECT * FROM {s}.activity_log ORDER BY created_at DESC LIMIT 50
+    """, ("school", "schools")),
+    ("story by donation", """
+        SELECT * FROM {s}.impact_story WHERE donation_id = :key
+    """, ("donation", "stories")),
+    ("profile by user", """
+        SELECT * FROM {s}.profile WHERE user_id = :key
+    """, ("company", "companies")),
+]
+
+
+def dataset_sizes(rows: int) -> Dict[str, int]:
+    return {
+        "rows": rows,
+        "needs": max(rows // 4, 1),
+        "schools": max(rows // 200, 1),
+        "companies": max(rows // 500, 1),
+        "stories": max(rows // 10, 1),
+    }
+
+
+def _key(rng: random.Random, prefix: str, upper: int) -> str:
+    # impact_story 只對應每第 10 筆捐贈
+    index = rng.randrange(upper) * 10 if prefix == "donation" else rng.randrange(upper)
+    digest = hashlib.md5(f"{prefix}{index}".encode()).hexdigest()
+    return f"{digest[:8]}-{digest[8:12]}-{digest[12:16]}-{digest[16:20]}-{digest[20:]}"
+
+
+def plan_summary(plan: Dict[str, Any]) -> str:
+    """擷取計畫中的掃描節點，例如 'Index Only Scan using ix_x on need'"""
+    nodes = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        node_type = node["Node Type"]
+        if "Scan" in node_type:
+            index = f" using {node['Index Name']}" if node.get("Index Name") else ""
+            relation = f" on {node['Relation Name']}" if node.get("Relation Name") else ""
+            nodes.append(f"{node_type}{index}{relation}")
+        stack.extend(reversed(node.get("Plans", [])))
+    return "; ".join(nodes)
+
+
+async def seed(conn: AsyncConnection, sizes: Dict[str, int]) -> None:
+    await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    for table in TABLES:
+        # 只複製欄位與預設值，不含索引與外鍵
+        await conn.execute(text(f"CREATE TABLE {SCHEMA}.{table} (LIKE public.{table} INCLUDING DEFAULTS)"))
+        await conn.execute(text(f"ALTER TABLE {SCHEMA}.{table} ADD PRIMARY KEY (id)"))
+    for statement in SEED_SQL:
+        await conn.execute(text(statement.format(s=SCHEMA)), sizes)
+    for statement in EXISTING_INDEXES:
+        await conn.execute(text(statement.format(s=SCHEMA)))
+    await conn.execute(text(f"VACUUM ANALYZE {', '.join(f'{SCHEMA}.{t}' for t in TABLES)}"))
+
+
+async def measure(conn: AsyncConnection, sizes: Dict[str, int], iterations: int, seed_value: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name, sql, (prefix, size_name) in QUERIES:
+        rng = random.Random(seed_value)
+        statement = text(sql.format(s=SCHEMA))
+        explain = text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql.format(s=SCHEMA)}")
+        keys = [_key(rng, prefix, sizes[size_name]) for _ in range(iterations)]
+        params = [{"key": key} if ":key" in sql else {} for key in keys]
+        # 暖機一次，讓快取狀態一致
+        await conn.execute(statement, params[0])
+        timings = []
+        for p in params:
+            started = time.perf_counter()
+            (await conn.execute(statement, p)).all()
+            timings.append((time.perf_counter() - started) * 1000)
+        plan = (await conn.execute(explain, params[0])).scalar_one()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        root = plan[0]
+        results[name] = {
+            "p50_ms": statistics.median(timings),
+            "p95_ms": sorted(timings)[min(len(timings) - 1, int(len(timings) * 0.95))],
+            "plan": plan_summary(root["Plan"]),
+            "buffers": root["Plan"].get("Shared Hit Blocks", 0) + root["Plan"].get("Shared Read Blocks", 0),
+        }
+    return results
+
+
+async def run(args: argparse.Namespace) -> None:
+    sizes = dataset_sizes(args.rows)
+    engine = create_engine("ingestion")
+    try:
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            started = time.perf_counter()
+            await seed(conn, sizes)
+            print(f"seeded {sizes} in {time.perf_counter() - started:.1f}s")
+
+            before = await measure(conn, sizes, args.iterations, args.seed)
+
+            started = time.perf_counter()
+            for statement in NEW_INDEXES:
+                await conn.execute(text(statement.format(s=SCHEMA)))
+            await conn.execute(text(f"VACUUM ANALYZE {', '.join(f'{SCHEMA}.{t}' for t in TABLES)}"))
+            print(f"built {len(NEW_INDEXES)} indexes in {time.perf_counter() - started:.1f}s")
+
+            after = await measure(conn, sizes, args.iterations, args.seed)
+
+            print(f"\n{'query':<20}{'before p50':>12}{'after p50':>12}{'before p95':>12}{'after p95':>12}{'speedup':>10}{'buffers':>18}")
+            for name, _, _ in QUERIES:
+                b, a = before[name], after[name]
+                speedup = b["p50_ms"] / a["p50_ms"] if a["p50_ms"] > 0 else float("inf")
+                print(
+                    f"{name:<20}{b['p50_ms']:>10.2f}ms{a['p50_ms']:>10.2f}ms"
+                    f"{b['p95_ms']:>10.2f}ms{a['p95_ms']:>10.2f}ms{speedup:>9.1f}x"
+                    f"{b['buffers']:>9}→{a['buffers']:<8}"
+                )
+                print(f"  before: {b['plan']}")
+                print(f"  after:  {a['plan']}")
+
+            if not args.keep:
+                await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="donation 與 activity_log 的合成筆數")
+    parser.add_argument("--iterations", type=int, default=50, help="每個查詢的量測次數")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="保留 bench_indexes schema 供手動檢查")
+    args = parser.parse_args()
+    # 量測期間不擷取慢查詢，避免背景 EXPLAIN 干擾結果
+    settings.slow_query_log_enabled = False
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""指標 middleware 效能測試：比較有無 MetricsMiddleware 時每個請求的額外耗時"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.metrics import registry  # noqa: E402
+from app.core.middleware import MetricsMiddleware  # noqa: E402
+
+
+class _Route:
+    path = "/api/v1/needs/{need_id}"
+
+
+async def bare_app(scope, receive, send):
+    """模擬已完成路由比對、回傳小型 JSON 的端點"""
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"ok":true}'})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def run(app, requests: int) -> float:
+    """回傳每個請求的平均耗時（微秒）"""
+    headers = [(b"host", b"test"), (b"content-length", b"0")]
+    started = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/needs/1", "headers": headers}
+        await app(scope, _receive, _send)
+    return (time.perf_counter() - started) / requests * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200_000, help="模擬的請求數")
+    parser.add_argument("--repeat", type=int, default=5, help="重複次數（取最小值）")
+    args = parser.parse_args()
+
+    instrumented = MetricsMiddleware(bare_app)
+    baseline = min([await run(bare_app, args.requests) for _ in range(args.repeat)])
+    with_metrics = min([await run(instrumented, args.requests) for _ in range(args.repeat)])
+
+    started = time.perf_counter()
+    body = registry.render()
+    render_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{'requests':>10} {'baseline µs':>12} {'metrics µs':>12} {'overhead µs':>12}")
+    print(f"{args.requests:>10} {baseline:>12.2f} {with_metrics:>12.2f} {with_metrics - baseline:>12.2f}")
+    print(f"/metrics render: {render_ms:.2f} ms, {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""全文檢索效能測試：以合成的需求資料建立索引並量測查詢延遲"""
+import argparse
+import os
+import random
+import sys
+import resource
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import SearchIndex, highlight  # noqa: E402
+
+
+SUBJECTS = ["國小", "國中", "分校", "部落學校", "山區學校", "離島學校", "偏鄉小學"]
+ITEMS = [
+    "平板電腦", "筆記型電腦", "投影機", "課外讀物", "英語繪本", "科學實驗器材", "顯微鏡",
+    "籃球", "桌球桌", "直笛", "烏克麗麗", "營養午餐", "課後輔導", "程式教育", "數位學習",
+    "無線網路", "冷氣機", "飲水機", "書桌椅", "體育服裝", "美術用品", "天文望遠鏡",
+]
+PLACES = [
+    "花蓮縣秀林鄉", "臺東縣長濱鄉", "南投縣信義鄉", "新竹縣尖石鄉", "苗栗縣泰安鄉",
+    "嘉義縣阿里山鄉", "屏東縣霧臺鄉", "宜蘭縣大同鄉", "澎湖縣望安鄉", "高雄市桃源區",
+]
+PHRASES = [
+    "學生人數少但學習熱忱高", "希望縮短城鄉數位落差", "現有設備老舊且經常故障",
+    "孩子們放學後缺乏陪伴", "期待企業夥伴一同投入", "將用於日常教學與社團活動",
+]
+QUERIES = ["平板電腦", "英語繪本", "秀林鄉 籃球", "數位落差", "天文望遠鏡 離島", "課後輔導 陪伴", "顯微鏡"]
+
+
+def synthetic_documents(n: int, rng: random.Random):
+    """產生模擬的需求標題與描述"""
+    for _ in range(n):
+        place, subject, item = rng.choice(PLACES), rng.choice(SUBJECTS), rng.choice(ITEMS)
+        title = f"{place}{subject}需要{item}"
+        description = "，".join(rng.sample(PHRASES, 3)) + f"。預計採購{item}與{rng.choice(ITEMS)}。"
+        yield "need", uuid.uuid4(), title, description
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=1_000_000, help="合成需求筆數")
+    parser.add_argument("--queries", type=int, default=200, help="查詢次數")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    index = SearchIndex()
+
+    started = time.perf_counter()
+    index.add_many(synthetic_documents(args.docs, rng))
+    build_seconds = time.perf_counter() - started
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"indexed {index.document_count:,} docs in {build_seconds:.1f}s "
+          f"({index.document_count / build_seconds:,.0f} docs/s, peak RSS {peak_rss:,.0f} MiB)")
+
+    # 增量更新：模擬 update_need 重新索引
+    updates = list(synthetic_documents(1000, rng))
+    started = time.perf_counter()
+    for doc in updates:
+        index.add(*doc)
+    print(f"incremental add: {(time.perf_counter() - started) / len(updates) * 1e6:.1f} µs/doc")
+
+    latencies = []
+    for i in range(args.queries):
+        query = QUERIES[i % len(QUERIES)]
+        started = time.perf_counter()
+        hits = index.search(query, limit=20)
+        snippet = highlight(updates[0][3], query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies = np.array(latencies)
+    print(f"query latency over {args.queries} queries: "
+          f"p50 {np.percentile(latencies, 50):.2f} ms, p95 {np.percentile(latencies, 95):.2f} ms, "
+          f"max {latencies.max():.2f} ms ({len(hits)} hits, snippet {len(snippet)} chars)")
+
+
+if __name__ == "__main__":
+    main()
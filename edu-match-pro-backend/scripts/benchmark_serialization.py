@@ -0,0 +1,128 @@
+"""列表序列化效能測試：100 與 10,000 筆時，比較逐筆建立 Schema + FastAPI 驗證 + json 與投影 + orjson 的每筆成本"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asyncpg.pgproto.pgproto import UUID as PgUUID  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from app.core.serialization import ORJSONResponse  # noqa: E402
+from app.models.donation import Donation, DonationStatus  # noqa: E402
+from app.models.need import Need, NeedStatus, UrgencyLevel  # noqa: E402
+from app.schemas.donation_schemas import DONATION_PUBLIC, DonationPublic  # noqa: E402
+from app.schemas.need_schemas import NEED_PUBLIC, NeedPublic  # noqa: E402
+
+SIZES = [100, 10_000]
+
+
+def _pg_uuid() -> PgUUID:
+    # 與 asyncpg 查詢結果相同的 UUID 型別
+    return PgUUID(str(uuid.uuid4()))
+
+
+def make_needs(count: int) -> List[Need]:
+    started = datetime(2024, 1, 1)
+    return [
+        Need(
+            id=_pg_uuid(), school_id=_pg_uuid(), title=f"偏鄉學童平板電腦 {index}", description="需要平板進行數位學習",
+            category="資訊設備", location="臺東縣海端鄉", student_count=20, estimated_cost=30000,
+            urgency=UrgencyLevel.medium, sdgs=[4, 10], status=NeedStatus.in_progress,
+            created_at=started + timedelta(seconds=index, microseconds=index),
+            updated_at=started + timedelta(days=1, seconds=index)
+        )
+        for index in range(count)
+    ]
+
+
+def make_donations(count: int) -> List[Donation]:
+    donations = []
+    for need in make_needs(count):
+        donation = Donation(
+            id=_pg_uuid(), need_id=need.id, company_id=_pg_uuid(), donation_type="物資", description="平板二十台",
+            progress=0, status=DonationStatus.pending, created_at=need.created_at
+        )
+        donation.need = need
+        donations.append(donation)
+    return donations
+
+
+def need_public(need: Need) -> NeedPublic:
+    """舊的列表端點：逐欄建立 NeedPublic"""
+    return NeedPublic(
+        id=need.id, school_id=need.school_id, title=need.title, description=need.description,
+        category=need.category, location=need.location, student_count=need.student_count,
+        estimated_cost=need.estimated_cost, image_url=need.image_url, urgency=need.urgency, sdgs=need.sdgs,
+        status=need.status, created_at=need.created_at, updated_at=need.updated_at
+    )
+
+
+def donation_public(donation: Donation) -> DonationPublic:
+    """舊的列表端點：逐欄建立 DonationPublic（need 由 ORM 物件驗證）"""
+    return DonationPublic(
+        id=donation.id, need_id=donation.need_id, company_id=donation.company_id,
+        donation_type=donation.donation_type, description=donation.description, progress=donation.progress,
+        status=donation.status, donation_date=donation.created_at, completion_date=donation.completion_date,
+        need=donation.need, company=None
+    )
+
+
+async def schema_path(rows: List[Any], build: Callable, schema: type) -> bytes:
+    """舊路徑：建立 Schema、FastAPI 依 response_model 再驗證一次，最後以 json 編碼"""
+    field = create_response_field(name="response", type_=List[schema], mode="serialization")
+    content = await serialize_response(field=field, response_content=[build(row) for row in rows])
+    return JSONResponse(content).body
+
+
+async def projection_path(rows: List[Any], projection: Callable) -> bytes:
+    """新路徑：投影成 dict 後直接以 orjson 編碼"""
+    return ORJSONResponse(projection.many(rows)).body
+
+
+async def best_of(repeat: int, func: Callable, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def run(args: argparse.Namespace) -> None:
+    cases = [
+        ("NeedPublic", make_needs, need_public, NeedPublic, NEED_PUBLIC),
+        ("DonationPublic", make_donations, donation_public, DonationPublic, DONATION_PUBLIC),
+    ]
+    print(f"{'schema':<16}{'rows':>7}{'schema+json':>14}{'per row':>10}{'projection':>13}{'per row':>10}{'speedup':>9}")
+    for name, make, build, schema, projection in cases:
+        for size in SIZES:
+            rows = make(size)
+            # 兩種路徑的輸出必須相同
+            assert json.loads(await schema_path(rows, build, schema)) == json.loads(await projection_path(rows, projection))
+            repeat = max(args.repeat * 100 // size, 3)
+            old = await best_of(repeat, schema_path, rows, build, schema)
+            new = await best_of(repeat, projection_path, rows, projection)
+            print(
+                f"{name:<16}{size:>7}{old * 1000:>12.2f}ms{old / size * 1e6:>8.1f}us"
+                f"{new * 1000:>11.2f}ms{new / size * 1e6:>8.1f}us{old / new:>8.1f}x"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50, help="100 筆時的重複次數（取最快的一次；筆數越多次數越少）")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,23 @@
+import argparse
 import asyncio
 import csv
 import os
+import time
+from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-import sqlalchemy as sa
-import uuid
-from datetime import datetime
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import MetaData, Table, text
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
 
-from app.core.config import settings
+from app.db import create_engine
 
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 FARAWAY_PATH = os.path.join(DATA_DIR, "faraway3.csv")
 EDU_B_1_4_PATH = os.path.join(DATA_DIR, "edu_B_1_4.csv")
 
-
-async def get_session() -> AsyncSession:
-    engine = create_async_engine(settings.database_url, echo=False)
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
-    return async_session()
+DEFAULT_BATCH_SIZE = 5000
 
 
 def normalize_county(name: str) -> str:
@@ -54,201 +48,277 @@ def parse_decimal(value: Optional[str]) -> Optional[Decimal]:
         return None
 
 
-# --- wide-table upserts ---
-async def upsert_wide_edu(session: AsyncSession, row: Dict[str, Any]) -> None:
-    metadata = MetaData()
-    table = Table(
-        'wide_edu_B_1_4',
-        metadata,
-        sa.Column('id', sa.dialects.postgresql.UUID),
-        sa.Column('created_at', sa.DateTime),
-        sa.Column('updated_at', sa.DateTime),
-        sa.Column('學年度', sa.Text),
-        sa.Column('縣市別', sa.Text),
-        sa.Column('幼兒園[人]', sa.Integer),
-        sa.Column('國小[人]', sa.Integer),
-        sa.Column('國中[人]', sa.Integer),
-        sa.Column('高級中等學校-普通科[人]', sa.Integer),
-        sa.Column('高級中等學校-專業群科[人]', sa.Integer),
-        sa.Column('高級中等學校-綜合高中[人]', sa.Integer),
-        sa.Column('高級中等學校-實用技能學程[人]', sa.Integer),
-        sa.Column('高級中等學校-進修部[人]', sa.Integer),
-        sa.Column('大專校院(全部計入校本部)[人]', sa.Integer),
-        sa.Column('大專校院(跨縣市教學計入所在地縣市)[人]', sa.Integer),
-        sa.Column('宗教研修學院[人]', sa.Integer),
-        sa.Column('國民補習及大專進修學校及空大[人]', sa.Integer),
-        sa.Column('特殊教育學校[人]', sa.Integer),
-    )
+def _text(row: Dict[str, Any], key: str) -> str:
+    return (row.get(key) or "").strip()
 
-    def gi(key: str) -> Optional[int]:
-        return parse_int(row.get(key))
-
-    now = datetime.utcnow()
-    stmt = (
-        pg_insert(table)
-        .values(
-            id=str(uuid.uuid4()),
-            created_at=now,
-            updated_at=now,
-            **{
-                '學年度': (row.get('學年度') or '').strip(),
-                '縣市別': (row.get('縣市別') or row.get('縣市名稱') or '').strip(),
-                '幼兒園[人]': gi('幼兒園[人]'),
-                '國小[人]': gi('國小[人]'),
-                '國中[人]': gi('國中[人]'),
-                '高級中等學校-普通科[人]': gi('高級中等學校-普通科[人]') or gi('高中[人]'),
-                '高級中等學校-專業群科[人]': gi('高級中等學校-專業群科[人]'),
-                '高級中等學校-綜合高中[人]': gi('高級中等學校-綜合高中[人]'),
-                '高級中等學校-實用技能學程[人]': gi('高級中等學校-實用技能學程[人]'),
-                '高級中等學校-進修部[人]': gi('高級中等學校-進修部[人]'),
-                '大專校院(全部計入校本部)[人]': gi('大專校院(全部計入校本部)[人]'),
-                '大專校院(跨縣市教學計入所在地縣市)[人]': gi('大專校院(跨縣市教學計入所在地縣市)[人]'),
-                '宗教研修學院[人]': gi('宗教研修學院[人]'),
-                '國民補習及大專進修學校及空大[人]': gi('國民補習及大專進修學校及空大[人]'),
-                '特殊教育學校[人]': gi('特殊教育學校[人]'),
-            }
-        )
-        .on_conflict_do_update(
-            constraint='uq_wide_edu_year_county',
-            set_={
-                'updated_at': sa.literal(now),
-                '幼兒園[人]': sa.literal(gi('幼兒園[人]')),
-                '國小[人]': sa.literal(gi('國小[人]')),
-                '國中[人]': sa.literal(gi('國中[人]')),
-                '高級中等學校-普通科[人]': sa.literal(gi('高級中等學校-普通科[人]') or gi('高中[人]')),
-                '高級中等學校-專業群科[人]': sa.literal(gi('高級中等學校-專業群科[人]')),
-                '高級中等學校-綜合高中[人]': sa.literal(gi('高級中等學校-綜合高中[人]')),
-                '高級中等學校-實用技能學程[人]': sa.literal(gi('高級中等學校-實用技能學程[人]')),
-                '高級中等學校-進修部[人]': sa.literal(gi('高級中等學校-進修部[人]')),
-                '大專校院(全部計入校本部)[人]': sa.literal(gi('大專校院(全部計入校本部)[人]')),
-                '大專校院(跨縣市教學計入所在地縣市)[人]': sa.literal(gi('大專校院(跨縣市教學計入所在地縣市)[人]')),
-                '宗教研修學院[人]': sa.literal(gi('宗教研修學院[人]')),
-                '國民補習及大專進修學校及空大[人]': sa.literal(gi('國民補習及大專進修學校及空大[人]')),
-                '特殊教育學校[人]': sa.literal(gi('特殊教育學校[人]')),
-            }
-        )
+
+# --- 各資料表的欄位定義與 CSV 解析 ---
+@dataclass
+class TableSpec:
+    """寬表匯入設定：目標表、暫存表、欄位型別、唯一鍵與 CSV 列解析函式"""
+    name: str
+    path: str
+    table: str
+    staging_table: str
+    columns: Sequence[Tuple[str, str]]
+    key_columns: Sequence[str]
+    constraint: str
+    parse: Callable[[Dict[str, Any]], Optional[tuple]]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [name for name, _ in self.columns]
+
+
+EDU_COLUMNS = [
+    ("學年度", "text"),
+    ("縣市別", "text"),
+    ("幼兒園[人]", "integer"),
+    ("國小[人]", "integer"),
+    ("國中[人]", "integer"),
+    ("高級中等學校-普通科[人]", "integer"),
+    ("高級中等學校-專業群科[人]", "integer"),
+    ("高級中等學校-綜合高中[人]", "integer"),
+    ("高級中等學校-實用技能學程[人]", "integer"),
+    ("高級中等學校-進修部[人]", "integer"),
+    ("大專校院(全部計入校本部)[人]", "integer"),
+    ("大專校院(跨縣市教學計入所在地縣市)[人]", "integer"),
+    ("宗教研修學院[人]", "integer"),
+    ("國民補習及大專進修學校及空大[人]", "integer"),
+    ("特殊教育學校[人]", "integer"),
+]
+
+FARAWAY_COLUMNS = [
+    ("學年度", "text"),
+    ("縣市名稱", "text"),
+    ("鄉鎮市區", "text"),
+    ("學生等級", "text"),
+    ("本校代碼", "text"),
+    ("本校名稱", "text"),
+    ("分校分班名稱", "text"),
+    ("公/私立", "text"),
+    ("地區屬性", "text"),
+    ("班級數", "integer"),
+    ("男學生數[人]", "integer"),
+    ("女學生數[人]", "integer"),
+    ("原住民學生比率", "numeric(10, 4)"),
+    ("上學年男畢業生數[人]", "integer"),
+    ("上學年女畢業生數[人]", "integer"),
+]
+
+
+def parse_edu_row(row: Dict[str, Any]) -> Optional[tuple]:
+    """解析 edu_B_1_4.csv 的一列，缺少學年度或縣市時回傳 None"""
+    year = _text(row, "學年度")
+    county = _text(row, "縣市別") or _text(row, "縣市名稱")
+    if not year or not county:
+        return None
+    counts = [parse_int(row.get(name)) for name, _ in EDU_COLUMNS[2:]]
+    # 舊版資料只有「高中[人]」欄位
+    counts[3] = counts[3] or parse_int(row.get("高中[人]"))
+    return (year, county, *counts)
+
+
+def parse_faraway_row(row: Dict[str, Any]) -> Optional[tuple]:
+    """解析 faraway3.csv 的一列，缺少學年度、縣市或學校代碼時回傳 None"""
+    year = _text(row, "學年度")
+    county = normalize_county(_text(row, "縣市名稱"))
+    code = _text(row, "本校代碼")
+    if not year or not county or not code:
+        return None
+    return (
+        year,
+        county,
+        _text(row, "鄉鎮市區") or None,
+        _text(row, "學生等級") or None,
+        code,
+        _text(row, "本校名稱"),
+        _text(row, "分校分班名稱"),
+        _text(row, "公/私立") or None,
+        _text(row, "地區屬性") or None,
+        parse_int(row.get("班級數")),
+        parse_int(row.get("男學生數[人]")),
+        parse_int(row.get("女學生數[人]")),
+        parse_decimal(row.get("原住民學生比率")),
+        parse_int(row.get("上學年男畢業生數[人]")),
+        parse_int(row.get("上學年女畢業生數[人]")),
     )
-    await session.execute(stmt)
-
-
-async def upsert_wide_faraway(session: AsyncSession, row: Dict[str, Any]) -> None:
-    metadata = MetaData()
-    table = Table(
-        'wide_faraway3',
-        metadata,
-        sa.Column('id', sa.dialects.postgresql.UUID),
-        sa.Column('created_at', sa.DateTime),
-        sa.Column('updated_at', sa.DateTime),
-        sa.Column('學年度', sa.Text),
-        sa.Column('縣市名稱', sa.Text),
-        sa.Column('鄉鎮市區', sa.Text),
-        sa.Column('學生等級', sa.Text),
-        sa.Column('本校代碼', sa.Text),
-        sa.Column('本校名稱', sa.Text),
-        sa.Column('分校分班名稱', sa.Text),
-        sa.Column('公/私立', sa.Text),
-        sa.Column('地區屬性', sa.Text),
-        sa.Column('班級數', sa.Integer),
-        sa.Column('男學生數[人]', sa.Integer),
-        sa.Column('女學生數[人]', sa.Integer),
-        sa.Column('原住民學生比率', sa.Numeric(10, 4)),
-        sa.Column('上學年男畢業生數[人]', sa.Integer),
-        sa.Column('上學年女畢業生數[人]', sa.Integer),
+
+
+def table_specs(edu_path: str = EDU_B_1_4_PATH, faraway_path: str = FARAWAY_PATH) -> Dict[str, TableSpec]:
+    return {
+        "edu": TableSpec(
+            name="edu_B_1_4",
+            path=edu_path,
+            table="wide_edu_B_1_4",
+            staging_table="staging_wide_edu_B_1_4",
+            columns=EDU_COLUMNS,
+            key_columns=("學年度", "縣市別"),
+            constraint="uq_wide_edu_year_county",
+            parse=parse_edu_row,
+        ),
+        "faraway": TableSpec(
+            name="faraway3",
+            path=faraway_path,
+            table="wide_faraway3",
+            staging_table="staging_wide_faraway3",
+            columns=FARAWAY_COLUMNS,
+            key_columns=("學年度", "本校代碼", "分校分班名稱"),
+            constraint="uq_wide_faraway_year_code_branch",
+            parse=parse_faraway_row,
+        ),
+    }
+
+
+# --- 串流讀取與批次驗證 ---
+@dataclass
+class IngestStats:
+    name: str
+    rows: int = 0
+    rejected: int = 0
+    inserted: int = 0
+    updated: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def iter_batches(spec: TableSpec, batch_size: int, stats: IngestStats) -> Iterator[List[tuple]]:
+    """逐列讀取 CSV 並解析成批次，每筆資料尾端附上 CSV 行號（同鍵時以較後面的列為準）"""
+    if not os.path.exists(spec.path):
+        raise FileNotFoundError(spec.path)
+    batch: List[tuple] = []
+    with open(spec.path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            record = spec.parse(row)
+            if record is None:
+                stats.rejected += 1
+                continue
+            batch.append((*record, reader.line_num))
+            stats.rows += 1
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+# --- 暫存表與合併 ---
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+async def prepare_staging(conn: AsyncConnection, spec: TableSpec) -> None:
+    """依目前的欄位定義建立本次匯入專用的暫存表
+
+    TEMP 表只存在於這條連線、不寫 WAL，交易提交或回滾時自動刪除：
+    不會在 public 留下 Alembic 不認得的資料表，欄位定義變更後也不會沿用舊的結構。
+    """
+    columns = ", ".join(f"{_quote(name)} {sql_type}" for name, sql_type in spec.columns)
+    await conn.execute(text(
+        f"CREATE TEMP TABLE {_quote(spec.staging_table)} ({columns}, _line bigint NOT NULL) ON COMMIT DROP"
+    ))
+
+
+async def copy_batch(conn: AsyncConnection, spec: TableSpec, batch: List[tuple]) -> None:
+    """以 asyncpg COPY 將批次寫入暫存表"""
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        spec.staging_table,
+        records=batch,
+        columns=[*spec.column_names, "_line"],
     )
 
-    now = datetime.utcnow()
-    stmt = (
-        pg_insert(table)
-        .values(
-            id=str(uuid.uuid4()),
-            created_at=now,
-            updated_at=now,
-            **{
-                '學年度': (row.get('學年度') or '').strip(),
-                '縣市名稱': normalize_county((row.get('縣市名稱') or '').strip()),
-                '鄉鎮市區': (row.get('鄉鎮市區') or '').strip() or None,
-                '學生等級': (row.get('學生等級') or '').strip() or None,
-                '本校代碼': (row.get('本校代碼') or '').strip(),
-                '本校名稱': (row.get('本校名稱') or '').strip(),
-                '分校分班名稱': (row.get('分校分班名稱') or '').strip(),
-                '公/私立': (row.get('公/私立') or '').strip() or None,
-                '地區屬性': (row.get('地區屬性') or '').strip() or None,
-                '班級數': parse_int(row.get('班級數')),
-                '男學生數[人]': parse_int(row.get('男學生數[人]')),
-                '女學生數[人]': parse_int(row.get('女學生數[人]')),
-                '原住民學生比率': parse_decimal(row.get('原住民學生比率')),
-                '上學年男畢業生數[人]': parse_int(row.get('上學年男畢業生數[人]')),
-                '上學年女畢業生數[人]': parse_int(row.get('上學年女畢業生數[人]')),
-            }
-        )
-        .on_conflict_do_update(
-            constraint='uq_wide_faraway_year_code_branch',
-            set_={
-                'updated_at': sa.literal(now),
-                '縣市名稱': sa.literal(normalize_county((row.get('縣市名稱') or '').strip())),
-                '鄉鎮市區': sa.literal((row.get('鄉鎮市區') or '').strip() or None),
-                '學生等級': sa.literal((row.get('學生等級') or '').strip() or None),
-                '本校名稱': sa.literal((row.get('本校名稱') or '').strip()),
-                '分校分班名稱': sa.literal((row.get('分校分班名稱') or '').strip()),
-                '公/私立': sa.literal((row.get('公/私立') or '').strip() or None),
-                '地區屬性': sa.literal((row.get('地區屬性') or '').strip() or None),
-                '班級數': sa.literal(parse_int(row.get('班級數'))),
-                '男學生數[人]': sa.literal(parse_int(row.get('男學生數[人]'))),
-                '女學生數[人]': sa.literal(parse_int(row.get('女學生數[人]'))),
-                '原住民學生比率': sa.literal(parse_decimal(row.get('原住民學生比率'))),
-                '上學年男畢業生數[人]': sa.literal(parse_int(row.get('上學年男畢業生數[人]'))),
-                '上學年女畢業生數[人]': sa.literal(parse_int(row.get('上學年女畢業生數[人]'))),
-            }
-        )
+
+async def merge_staging(conn: AsyncConnection, spec: TableSpec) -> Tuple[int, int]:
+    """以單一 INSERT ... ON CONFLICT 將暫存表合併進寬表，回傳 (新增數, 更新數)"""
+    columns = ", ".join(_quote(name) for name in spec.column_names)
+    keys = ", ".join(_quote(name) for name in spec.key_columns)
+    updates = ", ".join(
+        f"{_quote(name)} = EXCLUDED.{_quote(name)}"
+        for name in spec.column_names if name not in spec.key_columns
     )
-    await session.execute(stmt)
-
-
-async def ingest_school_population_wide() -> int:
-    if not os.path.exists(EDU_B_1_4_PATH):
-        raise FileNotFoundError(EDU_B_1_4_PATH)
-    count = 0
-    async with await get_session() as session:
-        await session.begin()
-        with open(EDU_B_1_4_PATH, newline="", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                await upsert_wide_edu(session, row)
-                count += 1
-        await session.commit()
-    return count
-
-
-async def ingest_faraway_list_wide() -> int:
-    if not os.path.exists(FARAWAY_PATH):
-        raise FileNotFoundError(FARAWAY_PATH)
-    count = 0
-    async with await get_session() as session:
-        await session.begin()
-        with open(FARAWAY_PATH, newline="", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                await upsert_wide_faraway(session, row)
-                count += 1
-        await session.commit()
-    return count
-
-
-async def main() -> None:
-    w1 = await ingest_school_population_wide()
-    w2 = await ingest_faraway_list_wide()
-
-    async with await get_session() as session:
-        res1 = await session.execute(text('SELECT COUNT(*) FROM "wide_edu_B_1_4"'))
-        res2 = await session.execute(text('SELECT COUNT(*) FROM wide_faraway3'))
-        print({
-            'wide_edu_B_1_4': res1.scalar_one(),
-            'wide_faraway3': res2.scalar_one(),
-            'processed_csv_rows': {'edu_B_1_4': w1, 'faraway3': w2},
-        })
+    result = await conn.execute(text(f"""
+        WITH merged AS (
+            INSERT INTO {_quote(spec.table)} (id, created_at, updated_at, {columns})
+            SELECT gen_random_uuid(), now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc', {columns}
+            FROM (
+                SELECT DISTINCT ON ({keys}) *
+                FROM {_quote(spec.staging_table)}
+                ORDER BY {keys}, _line DESC
+            ) AS latest
+            ON CONFLICT ON CONSTRAINT {_quote(spec.constraint)} DO UPDATE SET
+                updated_at = EXCLUDED.updated_at, {updates}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged
+    """))
+    inserted, updated = result.one()
+    return inserted, updated
 
 
-if __name__ == "__main__":
-    asyncio.run(main())
+async def ingest_table(spec: TableSpec, batch_size: int, dry_run: bool = False, engine=None) -> IngestStats:
+    """串流解析 CSV，COPY 進暫存表後一次合併；dry_run 時只解析與驗證"""
+    stats = IngestStats(name=spec.name)
+    start = time.perf_counter()
+    if dry_run:
+        for _ in iter_batches(spec, batch_size, stats):
+            pass
+    else:
+        async with engine.begin() as conn:
+            await prepare_staging(conn, spec)
+            for batch in iter_batches(spec, batch_size, stats):
+                await copy_batch(conn, spec, batch)
+            stats.inserted, stats.updated = await merge_staging(conn, spec)
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+async def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="以 COPY 批次匯入 edu_B_1_4 與 faraway3 開放資料")
+    parser.add_argument("--edu", default=EDU_B_1_4_PATH, help="edu_B_1_4.csv 路徑")
+    parser.add_argument("--faraway", default=FARAWAY_PATH, help="faraway3.csv 路徑")
+    parser.add_argument("--only", choices=["edu", "faraway"], help="只匯入其中一個檔案")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每次 COPY 的列數")
+    parser.add_argument("--dry-run", action="store_true", help="只解析與驗證，不寫入資料庫")
+    args = parser.parse_args(argv)
+
+    specs = table_specs(edu_path=args.edu, faraway_path=args.faraway)
+    names = [args.only] if args.only else ["edu", "faraway"]
+    engine = None if args.dry_run else create_engine("ingestion")
+    try:
+        summary: Dict[str, Any] = {}
+        for name in names:
+            stats = await ingest_table(specs[name], args.batch_size, dry_run=args.dry_run, engine=engine)
+            summary[stats.name] = stats.as_dict()
+            print(
+                f"{stats.name}: {stats.rows} rows ({stats.rejected} rejected) "
+                f"in {stats.seconds:.2f}s, {stats.rows_per_second:,.0f} rows/s"
+            )
+
+        if engine is not None:
+            async with engine.connect() as conn:
+                summary["wide_edu_B_1_4"] = (await conn.execute(text('SELECT COUNT(*) FROM "wide_edu_B_1_4"'))).scalar_one()
+                summary["wide_faraway3"] = (await conn.execute(text("SELECT COUNT(*) FROM wide_faraway3"))).scalar_one()
+        summary["dry_run"] = args.dry_run
+        print(summary)
+    finally:
+        if engine is not None:
+            await engine.dispose()
 
 
+if __name__ == "__main__":
+    asyncio.run(main())
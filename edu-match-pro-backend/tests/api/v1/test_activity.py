@@ -0,0 +1,262 @@
+import asyncio
+import gzip
+import orjson
+import pytest
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+from sqlalchemy import event, text
+from httpx import AsyncClient, ASGITransport
+from main import app
+from conftest import register_and_login
+from app.core.config import settings
+from app.crud.activity_log_crud import (
+    archive_activity_log_partitions, create_activity_log, create_activity_log_partition,
+    ensure_activity_log_partitions, get_activity_logs_by_user, list_activity_log_partitions
+)
+from app.models.activity_log import ActivityLog, ActivityType
+from app.services.realtime import activity_event
+from app.services.activity_log_writer import ActivityLogWriter
+
+NEED = {
+    "title": "圖書室藏書擴充",
+    "description": "需要兒童繪本",
+    "category": "圖書",
+    "location": "屏東縣霧臺鄉",
+    "student_count": 15,
+    "urgency": "low",
+    "sdgs": [4]
+}
+
+
+@contextmanager
+def _activity_inserts(engine):
+    """記錄區塊內對 activity_log 執行的 INSERT 語句（executemany 只算一次）"""
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if "INSERT INTO activity_log" in statement:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _capture)
+
+
+@pytest.mark.asyncio
+async def test_donation_logs_are_written_in_the_same_transaction(test_session_maker):
+    """測試捐贈的兩筆活動日誌與捐贈在同一交易中以單一 INSERT 寫入"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        need = (await c.post("/api/v1/needs/", json=NEED, headers=school_headers)).json()
+
+        with _activity_inserts(test_session_maker.kw["bind"]) as inserts:
+            response = await c.post("/api/v1/donations/", json={
+                "need_id": need["id"], "donation_type": "物資"
+            }, headers=company_headers)
+        assert response.status_code == 201
+        assert len(inserts) == 1
+
+        school_logs = (await c.get("/api/v1/activity/my", headers=school_headers)).json()
+        company_logs = (await c.get("/api/v1/activity/my", headers=company_headers)).json()
+    assert [log["activity_type"] for log in school_logs] == ["donation_created", "need_created"]
+    assert [log["activity_type"] for log in company_logs] == ["donation_created"]
+
+
+@pytest.mark.asyncio
+async def test_async_delivery_batches_and_flushes_on_stop(monkeypatch, test_session_maker):
+    """測試非同步模式下日誌由寫入器批次寫入，停止時寫出剩餘資料"""
+    writer = ActivityLogWriter(engine=test_session_maker.kw["bind"])
+    monkeypatch.setattr("app.crud.activity_log_crud.activity_log_writer", writer)
+    monkeypatch.setattr(settings, "activity_log_delivery", "async")
+    monkeypatch.setattr(settings, "activity_log_flush_ms", 60_000)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        with _activity_inserts(writer.engine) as inserts:
+            for _ in range(3):
+                response = await c.post("/api/v1/needs/", json=NEED, headers=school_headers)
+                assert response.status_code == 201
+        assert inserts == []
+        assert writer.stats()["pending"] == 3
+
+        await writer.stop()
+        logs = (await c.get("/api/v1/activity/my", headers=school_headers)).json()
+
+    assert len(logs) == 3
+    assert writer.stats() | {"delivery": None} == {
+        "delivery": None, "pending": 0, "enqueued": 3, "written": 3, "batches": 1, "failed": 0, "rejected": 0
+    }
+
+
+
+@pytest.mark.asyncio
+async def test_async_delivery_waits_for_commit(monkeypatch, test_session_maker):
+    """測試非同步模式下日誌在交易提交後才交給寫入器，回滾的交易不留下日誌"""
+    writer = ActivityLogWriter(engine=test_session_maker.kw["bind"])
+    monkeypatch.setattr("app.crud.activity_log_crud.activity_log_writer", writer)
+    monkeypatch.setattr(settings, "activity_log_delivery", "async")
+    monkeypatch.setattr(settings, "activity_log_flush_ms", 60_000)
+
+    user_id = uuid.uuid4()
+    async with test_session_maker() as session:
+        await create_activity_log(session, user_id, ActivityType.user_login, "回滾的登入")
+        assert writer.stats()["pending"] == 0
+        await session.rollback()
+        await create_activity_log(session, user_id, ActivityType.user_login, "提交的登入")
+        await session.commit()
+    assert writer.stats()["pending"] == 1
+
+    await writer.stop()
+    async with test_session_maker() as session:
+        logs = await get_activity_logs_by_user(session, user_id)
+    assert [log.description for log in logs] == ["提交的登入"]
+
+@pytest.mark.asyncio
+async def test_old_partitions_are_archived_and_queries_span_partitions(test_session_maker, tmp_path):
+    """測試舊資料落入預設分區、建立月份分區時搬移，超過保留期限後匯出壓縮檔並移除"""
+    user_id = uuid.uuid4()
+    month = date(2001, 1, 1)
+    async with test_session_maker() as session:
+        await create_activity_log(session, user_id, ActivityType.user_login, "最近的登入")
+        session.add(ActivityLog(
+            user_id=user_id, activity_type=ActivityType.user_register, description="很久以前的註冊",
+            created_at=datetime(2001, 1, 15, 8, 30)
+        ))
+        await session.commit()
+
+        await create_activity_log_partition(session, month)
+        await session.commit()
+        assert (month, "activity_log_y2001m01") in await list_activity_log_partitions(session)
+
+        # 近期分區不足 limit 筆時會往舊分區補齊
+        logs = await get_activity_logs_by_user(session, user_id, limit=5)
+        assert [log.description for log in logs] == ["最近的登入", "很久以前的註冊"]
+
+        archived = await archive_activity_log_partitions(session, retention_months=12, archive_dir=str(tmp_path))
+        assert archived == [str(tmp_path / "activity_log_y2001m01.csv.gz")]
+        assert (month, "activity_log_y2001m01") not in await list_activity_log_partitions(session)
+        logs = await get_activity_logs_by_user(session, user_id, limit=5)
+        assert [log.description for log in logs] == ["最近的登入"]
+
+    with gzip.open(archived[0], "rt", encoding="utf-8") as f:
+        exported = f.read()
+    assert exported.startswith("id,created_at,")
+    assert "很久以前的註冊" in exported
+
+
+@pytest.mark.asyncio
+async def test_concurrent_partition_checks_create_each_month_once(test_session_maker):
+    """測試多個 worker 同時確保分區時，每個月份只建立一次且不會因重複建立而失敗"""
+    async def _ensure():
+        async with test_session_maker() as session:
+            return await ensure_activity_log_partitions(session, months_ahead=40)
+
+    async with test_session_maker() as session:
+        before = {name for _, name in await list_activity_log_partitions(session)}
+    results = await asyncio.gather(*(_ensure() for _ in range(3)))
+    created = [name for names in results for name in names]
+    try:
+        assert len(created) == len(set(created))
+        async with test_session_maker() as session:
+            after = {name for _, name in await list_activity_log_partitions(session)}
+        assert after - before == set(created)
+        assert len(after) >= 41
+    finally:
+        async with test_session_maker() as session:
+            for name in created:
+                await session.execute(text(f"ALTER TABLE activity_log DETACH PARTITION {name}"))
+                await session.execute(text(f"DROP TABLE {name}"))
+            await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_recent_activity_is_served_from_the_feed(monkeypatch, test_session_maker):
+    """測試最新活動由快取回應：首次請求載入後不再查詢資料庫，新寫入的活動立即出現且與資料庫一致"""
+    from app.core.query_stats import query_budget
+    from app.services.recent_activity import recent_activity_feed
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        await c.get("/api/v1/activity/recent?limit=5")
+        await c.post("/api/v1/needs/", json=NEED, headers=school_headers)
+
+        with query_budget(0):
+            response = await c.get("/api/v1/activity/recent?limit=5")
+        assert response.status_code == 200
+        recent = response.json()
+        assert recent[0]["activity_type"] == "need_created"
+
+        # 超過快取容量時改查資料庫，兩者的前幾筆必須相同
+        monkeypatch.setattr(recent_activity_feed, "capacity", 4)
+        from_db = (await c.get("/api/v1/activity/recent?limit=5")).json()
+    assert recent == from_db
+
+
+
+@pytest.mark.asyncio
+async def test_feed_reload_keeps_events_published_during_the_query(monkeypatch):
+    """測試重新載入最新活動時，查詢期間推播進來的活動不會因為替換緩衝區而遺失"""
+    from app.services.recent_activity import RecentActivityFeed
+    feed = RecentActivityFeed(10)
+    stored = ActivityLog(
+        user_id=uuid.uuid4(), activity_type=ActivityType.user_login, description="資料庫中的登入",
+        created_at=datetime(2030, 1, 1)
+    )
+    published = ActivityLog(
+        user_id=uuid.uuid4(), activity_type=ActivityType.need_created, description="查詢期間的新需求",
+        created_at=datetime(2030, 1, 2)
+    )
+
+    async def _query_while_publishing(session, limit):
+        feed.add(activity_event(published.model_dump()))
+        return [stored]
+
+    monkeypatch.setattr("app.crud.activity_log_crud.get_recent_activity_logs", _query_while_publishing)
+    await feed.prime(session=None)
+
+    assert [item["description"] for item in orjson.loads(feed.render(10))] == ["查詢期間的新需求", "資料庫中的登入"]
+
+def test_feed_renders_every_limit_from_one_cached_array():
+    """測試不同 limit 都由同一份完整輸出切片而成，內容與逐筆序列化一致"""
+    from app.services.recent_activity import RecentActivityFeed
+    feed = RecentActivityFeed(5)
+    for day in range(1, 5):
+        feed.add(activity_event(ActivityLog(
+            user_id=uuid.uuid4(), activity_type=ActivityType.user_login, description=f"登入 {day}",
+            created_at=datetime(2030, 1, day)
+        ).model_dump()))
+
+    full = feed.render(5)
+    for limit in range(0, 7):
+        rendered = feed.render(limit)
+        assert [item["description"] for item in orjson.loads(rendered)] == [f"登入 {day}" for day in (4, 3, 2, 1)][:limit]
+    assert feed._rendered is full
+
+@pytest.mark.asyncio
+async def test_activity_for_a_donation_is_queried_by_extra_data():
+    """測試依 extra_data 中的 donation_id 取得捐贈相關活動，且僅限捐贈雙方查看"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        other_headers = await register_and_login(c, "company")
+        need = (await c.post("/api/v1/needs/", json=NEED, headers=school_headers)).json()
+        donation = (await c.post("/api/v1/donations/", json={
+            "need_id": need["id"], "donation_type": "物資"
+        }, headers=company_headers)).json()
+
+        response = await c.get(f"/api/v1/activity/donation/{donation['id']}", headers=school_headers)
+        forbidden = await c.get(f"/api/v1/activity/donation/{donation['id']}", headers=other_headers)
+
+    assert response.status_code == 200
+    logs = response.json()
+    assert len(logs) == 2
+    assert all(log["extra_data"] == {"donation_id": donation["id"], "need_id": need["id"]} for log in logs)
+    assert forbidden.status_code == 403
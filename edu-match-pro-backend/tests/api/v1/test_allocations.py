@@ -0,0 +1,54 @@
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from main import app
+from conftest import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_optimize_allocation_within_budget():
+    """測試最佳化結果不超出預算且選出價值最高的組合"""
+    category = f"測試類別-{uuid.uuid4().hex[:6]}"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        # 預算 100 時最佳組合為 B + C（60 位學生），而非單獨的 A（50 位學生）
+        for title, students, cost in [("A", 50, 100), ("B", 30, 50), ("C", 30, 50)]:
+            await c.post("/api/v1/needs/", json={
+                "title": title,
+                "description": "測試需求",
+                "category": category,
+                "location": "測試地點",
+                "student_count": students,
+                "estimated_cost": cost,
+                "urgency": "medium",
+                "sdgs": [4]
+            }, headers=school_headers)
+        
+        company_headers = await register_and_login(c, "company")
+        response = await c.post("/api/v1/allocations/optimize", json={
+            "budget": 100,
+            "category_mix": {category: 1.0},
+            "mode": "exact"
+        }, headers=company_headers)
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["exact"] is True
+    assert data["total_cost"] <= 100
+    assert sorted(need["title"] for need in data["needs"]) == ["B", "C"]
+    assert data["total_students"] == 60
+
+
+@pytest.mark.asyncio
+async def test_optimize_allocation_rejects_invalid_mix():
+    """測試類別比例總和超過 1 時回傳 400"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        company_headers = await register_and_login(c, "company")
+        response = await c.post("/api/v1/allocations/optimize", json={
+            "budget": 1000,
+            "category_mix": {"圖書資源": 0.7, "硬體設備": 0.6}
+        }, headers=company_headers)
+    
+    assert response.status_code == 400
@@ -1,3 +1,5 @@
+import asyncio
+import threading
 import pytest
 import uuid
 from httpx import AsyncClient, ASGITransport
@@ -129,3 +131,102 @@ async def test_login_invalid_credentials():
     async with AsyncClient(transport=transport, base_url="http://test") as c:
         response = await c.post("/api/v1/auth/login", data=login_data)
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached():
+    """測試重複請求時由快取取得使用者，且舊格式 token 仍可使用"""
+    from app.core.cache import principal_cache
+    from app.core.security import create_access_token
+
+    email = f"test_{uuid.uuid4().hex[:8]}@example.com"
+    user_data = {
+        "email": email,
+        "password": "password123",
+        "role": "company"
+    }
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.post("/api/v1/auth/register", json=user_data)
+        login_response = await c.post("/api/v1/auth/login", data={"username": email, "password": "password123"})
+        headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+        first = await c.get("/api/v1/auth/users/me", headers=headers)
+        hits_before = principal_cache.hits
+        second = await c.get("/api/v1/auth/users/me", headers=headers)
+        assert principal_cache.hits == hits_before + 1
+        assert second.json() == first.json()
+
+        # 只帶 sub 的舊 token 以 email 查詢
+        principal_cache.invalidate(email)
+        legacy_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+        legacy = await c.get("/api/v1/auth/users/me", headers=legacy_headers)
+        assert legacy.status_code == 200
+        assert legacy.json()["role"] == "company"
+
+        stats = await c.get("/health/auth-cache")
+    assert stats.status_code == 200
+    assert stats.json()["hits"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_when_cost_changes(monkeypatch, test_session_maker):
+    """測試 bcrypt cost 變更後登入會重新雜湊密碼"""
+    from sqlalchemy import select
+    from app.core.config import settings
+    from app.models.user import User
+
+    email = f"test_{uuid.uuid4().hex[:8]}@example.com"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.post("/api/v1/auth/register", json={"email": email, "password": "password123", "role": "school"})
+        monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+        response = await c.post("/api/v1/auth/login", data={"username": email, "password": "password123"})
+    assert response.status_code == 200
+
+    async with test_session_maker() as session:
+        user = (await session.execute(select(User).where(User.email == email))).scalar_one()
+    assert user.password.startswith("$2b$04$")
+
+
+@pytest.mark.asyncio
+async def test_login_sheds_load_when_hash_queue_full(monkeypatch):
+    """測試雜湊佇列已滿時回應 429"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "password_hash_max_queue", 0)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        response = await c.post(
+            "/api/v1/auth/register",
+            json={"email": f"test_{uuid.uuid4().hex[:8]}@example.com", "password": "password123", "role": "school"}
+        )
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_hash_keeps_its_slot_until_the_thread_finishes():
+    """測試等待雜湊的請求被取消時，名額要等執行緒實際完成才釋放"""
+    from app.core import security
+
+    started, release = threading.Event(), threading.Event()
+
+    def _slow_hash():
+        started.set()
+        release.wait(5)
+        return "hashed"
+
+    task = asyncio.create_task(security._run_hash_job(_slow_hash))
+    await asyncio.to_thread(started.wait, 5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert security.hash_queue_depth() == 1
+
+    release.set()
+    for _ in range(100):
+        if security.hash_queue_depth() == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert security.hash_queue_depth() == 0
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import event
+from httpx import AsyncClient, ASGITransport
+from main import app
+from conftest import register_and_login
+from app.core.cache import principal_cache
+from app.core.config import settings
+
+NEED = {
+    "title": "音樂教室樂器",
+    "description": "需要直笛與鐵琴",
+    "category": "教學設備",
+    "location": "屏東縣霧臺鄉",
+    "student_count": 15,
+    "urgency": "medium",
+    "sdgs": [4]
+}
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_dashboard_requests_in_one_round_trip():
+    """測試批次請求：企業儀表板的子請求只驗證一次身分，結果與個別呼叫相同並附上各自耗時"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        need = (await c.post("/api/v1/needs/", json=NEED, headers=school_headers)).json()
+        await c.post("/api/v1/donations/", json={"need_id": need["id"], "donation_type": "物資"}, headers=company_headers)
+        donations = (await c.get("/api/v1/donations/my", headers=company_headers)).json()
+        stats = (await c.get("/api/v1/dashboard/company", headers=company_headers)).json()
+
+        hits_before = principal_cache.hits
+        response = await c.post("/api/v1/batch", json={"requests": [
+            {"id": "stats", "path": "/api/v1/dashboard/company"},
+            {"id": "donations", "path": "/api/v1/donations/my"},
+            {"id": "activity", "path": "/api/v1/activity/recent?limit=5"},
+            {"id": "recommended", "path": "/api/v1/recommendations/", "params": {"limit": 3}},
+            {"id": "school-only", "path": "/api/v1/needs/my"},
+        ]}, headers=company_headers)
+        hits_after = principal_cache.hits
+        rejected = await c.post("/api/v1/batch", json={"requests": [
+            {"id": "stream", "path": "/api/v1/realtime/events"}
+        ]}, headers=company_headers)
+
+    assert response.status_code == 200
+    results = {result["id"]: result for result in response.json()["responses"]}
+    assert list(results) == ["stats", "donations", "activity", "recommended", "school-only"]
+    assert results["stats"]["status"] == 200 and results["stats"]["body"] == stats
+    assert results["donations"]["body"] == donations
+    assert len(results["activity"]["body"]) <= 5
+    assert len(results["recommended"]["body"]) <= 3
+    assert results["school-only"]["status"] == 403
+    assert all(result["duration_ms"] > 0 and "server-timing" in result["headers"] for result in results.values())
+    # 只有批次請求本身驗證 token
+    assert hits_after == hits_before + 1
+    assert rejected.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_caps_concurrent_connections(monkeypatch, test_session_maker):
+    """測試批次子請求同時借出的連線數不超過 BATCH_MAX_CONCURRENCY"""
+    monkeypatch.setattr(settings, "batch_max_concurrency", 2)
+    engine = test_session_maker.kw["bind"].sync_engine
+    checked_out = peak = 0
+
+    def _checkout(*args):
+        nonlocal checked_out, peak
+        checked_out += 1
+        peak = max(peak, checked_out)
+
+    def _checkin(*args):
+        nonlocal checked_out
+        checked_out -= 1
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        headers = await register_and_login(c, "company")
+        event.listen(engine, "checkout", _checkout)
+        event.listen(engine, "checkin", _checkin)
+        try:
+            response = await c.post("/api/v1/batch", json={"requests": [
+                {"id": f"page-{index}", "path": "/api/v1/needs/", "params": {"limit": 5}} for index in range(8)
+            ]}, headers=headers)
+        finally:
+            event.remove(engine, "checkout", _checkout)
+            event.remove(engine, "checkin", _checkin)
+
+    assert [result["status"] for result in response.json()["responses"]] == [200] * 8
+    assert peak <= 2
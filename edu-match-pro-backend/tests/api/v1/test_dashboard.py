@@ -0,0 +1,57 @@
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from main import app
+from conftest import register_and_login
+from app.core.config import settings
+
+
+@pytest.mark.asyncio
+async def test_dashboard_rollups_match_live_queries(monkeypatch, test_session_maker):
+    """測試寫入路徑維護的彙總與即時查詢結果一致"""
+    from app.crud.dashboard_crud import rebuild_dashboard_rollups
+    from app.crud.donation_crud import update_donation_progress
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        need_ids = []
+        for student_count, sdgs in ((30, [4, 10]), (20, [4])):
+            response = await c.post("/api/v1/needs/", json={
+                "title": "教室設備更新",
+                "description": "需要新的投影機",
+                "category": "教學設備",
+                "location": "臺東縣達仁鄉",
+                "student_count": student_count,
+                "urgency": "medium",
+                "sdgs": sdgs
+            }, headers=school_headers)
+            need_ids.append(response.json()["id"])
+        donation = await c.post("/api/v1/donations/", json={
+            "need_id": need_ids[0], "donation_type": "物資"
+        }, headers=company_headers)
+        await c.put(f"/api/v1/needs/{need_ids[1]}", json={"student_count": 25}, headers=school_headers)
+        await c.put(f"/api/v1/needs/{need_ids[0]}", json={"sdgs": [4, 13]}, headers=school_headers)
+
+        async with test_session_maker() as session:
+            await update_donation_progress(session, uuid.UUID(donation.json()["id"]), 100)
+
+        school = (await c.get("/api/v1/dashboard/school", headers=school_headers)).json()
+        company = (await c.get("/api/v1/dashboard/company", headers=company_headers)).json()
+
+        # 重建後的彙總應與增量維護的結果相同
+        async with test_session_maker() as session:
+            await rebuild_dashboard_rollups(session)
+        assert (await c.get("/api/v1/dashboard/company", headers=company_headers)).json() == company
+
+        monkeypatch.setattr(settings, "dashboard_rollups_enabled", False)
+        live_school = (await c.get("/api/v1/dashboard/school", headers=school_headers)).json()
+        live_company = (await c.get("/api/v1/dashboard/company", headers=company_headers)).json()
+
+    assert school == live_school
+    assert school == {"totalNeeds": 2, "activeNeeds": 1, "completedNeeds": 0, "studentsBenefited": 0}
+    assert company == live_company
+    assert company["completedProjects"] == 1
+    assert company["studentsHelped"] == 30
+    assert company["sdgContributions"] == {"4": 1, "13": 1}
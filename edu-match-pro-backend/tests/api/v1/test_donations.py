@@ -0,0 +1,231 @@
+import asyncio
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import select
+from main import app
+from conftest import register_and_login
+from app.core.query_stats import collect_queries
+from app.crud.donation_crud import create_donation_bundle
+from app.models.need import Need
+from app.schemas.donation_schemas import DonationBundleCreate
+from app.models.profile import Profile
+
+NEED = {
+    "title": "科學實驗器材",
+    "description": "需要顯微鏡與實驗耗材",
+    "category": "教學設備",
+    "location": "南投縣信義鄉",
+    "student_count": 25,
+    "urgency": "high",
+    "sdgs": [4]
+}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_have_one_winner_and_conflicts_suggest_alternatives():
+    """測試多家企業同時認捐同一需求：只有一筆成功，其餘立即得到 409 與同類別的其他需求"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        companies = [await register_and_login(c, "company") for _ in range(8)]
+        hot = (await c.post("/api/v1/needs/", json=NEED, headers=school_headers)).json()
+        other = (await c.post("/api/v1/needs/", json=NEED | {"title": "數位顯微鏡"}, headers=school_headers)).json()
+
+        responses = await asyncio.gather(*(
+            c.post("/api/v1/donations/", json={"need_id": hot["id"], "donation_type": "物資"}, headers=headers)
+            for headers in companies
+        ))
+        missing = await c.post("/api/v1/donations/", json={
+            "need_id": str(uuid.uuid4()), "donation_type": "物資"
+        }, headers=companies[0])
+        claimed = (await c.get(f"/api/v1/needs/{hot['id']}")).json()
+
+    assert sorted(response.status_code for response in responses) == [201] + [409] * 7
+    conflict = next(response.json()["detail"] for response in responses if response.status_code == 409)
+    assert conflict["message"] == "需求已被認捐"
+    assert other["id"] in [alternative["id"] for alternative in conflict["alternatives"]]
+    assert hot["id"] not in [alternative["id"] for alternative in conflict["alternatives"]]
+    assert claimed["status"] == "in_progress"
+    assert missing.status_code == 404
+
+
+
+@pytest.mark.asyncio
+async def test_claim_waits_for_unrelated_row_lock(test_session_maker):
+    """測試需求因其他原因被鎖定（例如學校正在編輯後回滾）時，認捐等待鎖釋放並成功，而不是回傳 409"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        need = (await c.post("/api/v1/needs/", json=NEED, headers=school_headers)).json()
+
+        async with test_session_maker() as holder:
+            await holder.execute(select(Need).where(Need.id == uuid.UUID(need["id"])).with_for_update())
+            claim = asyncio.create_task(c.post(
+                "/api/v1/donations/", json={"need_id": need["id"], "donation_type": "物資"}, headers=company_headers
+            ))
+            await asyncio.sleep(0.3)
+            assert not claim.done()
+            await holder.rollback()
+        response = await claim
+
+    assert response.status_code == 201
+
+@pytest.mark.asyncio
+async def test_bundle_donation_modes():
+    """測試組合認捐：all_or_nothing 遇到已認捐的需求時不建立任何捐贈，best_effort 認捐其餘需求"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        rival_headers = await register_and_login(c, "company")
+        need_ids = [
+            (await c.post("/api/v1/needs/", json=NEED | {"title": f"實驗器材 {index}"}, headers=school_headers)).json()["id"]
+            for index in range(4)
+        ]
+        await c.post("/api/v1/donations/", json={"need_id": need_ids[0], "donation_type": "物資"}, headers=rival_headers)
+
+        atomic = await c.post("/api/v1/donations/bundle", json={
+            "need_ids": need_ids, "donation_type": "物資"
+        }, headers=company_headers)
+        untouched = (await c.get(f"/api/v1/needs/{need_ids[1]}")).json()
+        best_effort = await c.post("/api/v1/donations/bundle", json={
+            "need_ids": need_ids, "donation_type": "物資", "mode": "best_effort"
+        }, headers=company_headers)
+        logs = (await c.get("/api/v1/activity/my", headers=company_headers)).json()
+        dashboard = (await c.get("/api/v1/dashboard/school", headers=school_headers)).json()
+
+    assert atomic.status_code == 409
+    assert atomic.json()["detail"]["unavailable"] == [need_ids[0]]
+    assert untouched["status"] == "active"
+
+    assert best_effort.status_code == 201
+    result = best_effort.json()
+    assert sorted(donation["need_id"] for donation in result["donations"]) == sorted(need_ids[1:])
+    assert result["unavailable"] == [need_ids[0]]
+    assert sum(log["activity_type"] == "donation_created" for log in logs) == 3
+    assert dashboard["activeNeeds"] == 0 and dashboard["totalNeeds"] == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_all_or_nothing_bundle_releases_row_locks(test_session_maker):
+    """測試 all_or_nothing 失敗時立即釋放列鎖，不必等到 session 關閉"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        company = (await c.get("/api/v1/auth/users/me", headers=company_headers)).json()
+        free = (await c.post("/api/v1/needs/", json=NEED, headers=school_headers)).json()
+
+    bundle = DonationBundleCreate(need_ids=[uuid.UUID(free["id"]), uuid.uuid4()], donation_type="物資")
+    async with test_session_maker() as session, test_session_maker() as other:
+        donations, unavailable = await create_donation_bundle(session, bundle, uuid.UUID(company["id"]))
+        assert donations == [] and len(unavailable) == 1
+        # session 仍開著，其他交易可以立即鎖定同一需求
+        locked = await other.execute(
+            select(Need.id).where(Need.id == uuid.UUID(free["id"])).with_for_update(nowait=True)
+        )
+        assert locked.scalar_one() == uuid.UUID(free["id"])
+
+
+@pytest.mark.asyncio
+async def test_list_projection_matches_schema_serialization():
+    """測試列表端點的投影輸出與單筆端點（Schema 序列化）完全一致"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        need = (await c.post("/api/v1/needs/", json=NEED | {"estimated_cost": 12000}, headers=school_headers)).json()
+        created = (await c.post("/api/v1/donations/", json={
+            "need_id": need["id"], "donation_type": "物資", "description": "顯微鏡十台"
+        }, headers=company_headers)).json()
+        claimed = (await c.get(f"/api/v1/needs/{need['id']}")).json()
+        my_needs = (await c.get("/api/v1/needs/my", headers=school_headers)).json()
+        my_donations = await c.get("/api/v1/donations/my", headers=company_headers)
+
+    assert my_needs == [claimed]
+    assert my_donations.headers["content-type"] == "application/json"
+    assert my_donations.json() == [created]
+
+
+@pytest.mark.asyncio
+async def test_my_donations_sparse_fields_and_include():
+    """測試 fields= 與 include= 只回傳要求的捐贈欄位與需求欄位"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        need = (await c.post("/api/v1/needs/", json=NEED, headers=school_headers)).json()
+        donation = (await c.post("/api/v1/donations/", json={
+            "need_id": need["id"], "donation_type": "物資"
+        }, headers=company_headers)).json()
+
+        slim = await c.get("/api/v1/donations/my", params={
+            "fields": "status,donation_date", "include": "need.title,need.location"
+        }, headers=company_headers)
+        without_need = await c.get("/api/v1/donations/my", params={"fields": "progress"}, headers=company_headers)
+        full_need = await c.get("/api/v1/donations/my", params={"include": "need"}, headers=company_headers)
+        invalid = await c.get("/api/v1/donations/my", params={"include": "company"}, headers=company_headers)
+
+    assert slim.json() == [{
+        "id": donation["id"], "status": donation["status"], "donation_date": donation["donation_date"],
+        "need": {"id": need["id"], "title": NEED["title"], "location": NEED["location"]}
+    }]
+    assert without_need.json() == [{"id": donation["id"], "progress": 0}]
+    assert full_need.json()[0]["need"] == {key: value for key, value in donation["need"].items() if key != "school"}
+    assert {key: value for key, value in full_need.json()[0].items() if key != "need"} == {
+        key: value for key, value in donation.items() if key not in ("need", "company")
+    }
+    assert invalid.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_profiles_are_batch_loaded_with_constant_query_count(test_session_maker):
+    """測試捐贈與需求列表的企業、學校個人檔案以單一查詢載入，查詢數不隨列表筆數增加"""
+    location = f"臺東縣蘭嶼鄉{uuid.uuid4().hex[:6]}"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        schools = [await register_and_login(c, "school") for _ in range(3)]
+        small, large = await register_and_login(c, "company"), await register_and_login(c, "company")
+        users = [(await c.get("/api/v1/auth/users/me", headers=headers)).json() for headers in [*schools, small, large]]
+        async with test_session_maker() as session:
+            session.add_all(
+                Profile(
+                    user_id=user["id"], organization_name=f"機構 {index}", contact_person="王小明",
+                    position="主任", phone="089-000000", address=location
+                )
+                for index, user in enumerate(users)
+            )
+            await session.commit()
+
+        needs = [
+            (await c.post("/api/v1/needs/", json=NEED | {"location": location}, headers=headers)).json()
+            for headers in schools
+        ]
+        await c.post("/api/v1/donations/", json={"need_id": needs[0]["id"], "donation_type": "物資"}, headers=small)
+        for need in needs[1:]:
+            await c.post("/api/v1/donations/", json={"need_id": need["id"], "donation_type": "物資"}, headers=large)
+        # 先完成身分驗證的快取，只比較組裝回應的查詢
+        await c.get("/api/v1/donations/my", headers=small)
+        await c.get("/api/v1/donations/my", headers=large)
+
+        counts = {}
+        for name, headers in (("small", small), ("large", large)):
+            with collect_queries() as stats:
+                counts[name] = (await c.get("/api/v1/donations/my", headers=headers)).json(), stats
+        with collect_queries() as one_need:
+            single = (await c.get("/api/v1/needs/", params={"location": location, "limit": 1})).json()
+        with collect_queries() as all_needs:
+            listed = (await c.get("/api/v1/needs/", params={"location": location})).json()
+
+    (small_donations, small_stats), (large_donations, large_stats) = counts["small"], counts["large"]
+    assert len(small_donations) == 1 and len(large_donations) == 2
+    assert small_stats.count == large_stats.count
+    # 企業與兩所學校的個人檔案合併成一次查詢
+    assert [count for shape, count in large_stats.shapes.items() if "FROM profile" in shape] == [1]
+    assert {donation["company"]["organization_name"] for donation in large_donations} == {"機構 4"}
+    assert [donation["need"]["school"]["organization_name"] for donation in small_donations] == ["機構 0"]
+    assert len(single) == 1 and len(listed) == 3
+    assert one_need.count == all_needs.count
+    assert {need["school"]["organization_name"] for need in listed} == {"機構 0", "機構 1", "機構 2"}
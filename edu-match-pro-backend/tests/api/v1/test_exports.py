@@ -0,0 +1,64 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from main import app
+from conftest import register_and_login
+from app.core.config import settings
+
+NEED = {
+    "title": "圖書館書架",
+    "description": "需要新書架擺放捐贈書籍",
+    "category": "圖書",
+    "urgency": "low",
+    "student_count": 40,
+    "sdgs": [4, 10]
+}
+
+
+@pytest.mark.asyncio
+async def test_exports_stream_ndjson_csv_and_gzip(monkeypatch):
+    """測試匯出：分多段串流的 NDJSON、CSV 與 gzip 內容一致，捐贈只匯出自己的資料"""
+    monkeypatch.setattr(settings, "export_chunk_size", 2)
+    location = f"澎湖縣望安鄉{uuid.uuid4().hex[:6]}"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        needs = [
+            (await c.post("/api/v1/needs/", json=NEED | {"title": f"書架 {index}", "location": location},
+                          headers=school_headers)).json()
+            for index in range(5)
+        ]
+        await c.post("/api/v1/donations/", json={"need_id": needs[0]["id"], "donation_type": "物資"},
+                     headers=company_headers)
+
+        ndjson = await c.get("/api/v1/exports/needs", params={"location": location})
+        as_csv = await c.get("/api/v1/exports/needs", params={"location": location, "format": "csv"})
+        gzipped = await c.get("/api/v1/exports/needs", params={"location": location, "gzip": "true"})
+        donations = await c.get("/api/v1/exports/donations", headers=company_headers)
+        open_data = await c.get("/api/v1/exports/open-data/wide_faraway3", params={"format": "csv"})
+        unknown = await c.get("/api/v1/exports/open-data/pg_authid")
+
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [row["title"] for row in rows] == [need["title"] for need in needs]
+    assert rows[0]["sdgs"] == [4, 10] and rows[0]["status"] == "in_progress"
+
+    assert as_csv.text.startswith("\ufeff")
+    records = list(csv.DictReader(io.StringIO(as_csv.text.lstrip("\ufeff"))))
+    assert [record["id"] for record in records] == [need["id"] for need in needs]
+    assert records[0]["sdgs"] == "[4,10]" and records[0]["estimated_cost"] == ""
+
+    assert gzipped.headers["content-disposition"] == 'attachment; filename="needs.ndjson.gz"'
+    assert gzip.decompress(gzipped.content) == ndjson.content
+
+    exported = [json.loads(line) for line in donations.text.splitlines()]
+    assert [(row["need_id"], row["need_title"]) for row in exported] == [(needs[0]["id"], "書架 0")]
+
+    assert open_data.status_code == 200
+    assert next(csv.reader(io.StringIO(open_data.text.lstrip("\ufeff"))))[:4] == ["id", "created_at", "updated_at", "學年度"]
+    assert unknown.status_code == 422
@@ -0,0 +1,66 @@
+import csv
+import pytest
+from decimal import Decimal
+from sqlalchemy import text
+from scripts.ingest_school_tables import FARAWAY_COLUMNS, ingest_table, parse_edu_row, table_specs
+
+HEADER = [name for name, _ in FARAWAY_COLUMNS]
+YEAR = "999"
+
+
+def _write_faraway(path, rows):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def test_edu_row_falls_back_to_legacy_high_school_column():
+    """測試舊版 edu_B_1_4 只有「高中[人]」欄位時仍解析到普通科，缺少縣市的列被拒絕"""
+    row = parse_edu_row({"學年度": "95", "縣市名稱": "臺北市", "國小[人]": "1,234", "高中[人]": "56"})
+    assert row[:5] == ("95", "臺北市", None, 1234, None)
+    assert row[5] == 56
+    assert parse_edu_row({"學年度": "95", "縣市別": " "}) is None
+
+
+@pytest.mark.asyncio
+async def test_faraway_ingest_copies_and_merges_by_key(test_session_maker, tmp_path):
+    """測試 COPY 進暫存表後合併：同鍵以較後面的列為準、無效列被拒絕，再次匯入時更新既有資料"""
+    engine = test_session_maker.kw["bind"]
+    path = tmp_path / "faraway3.csv"
+    _write_faraway(path, [
+        [YEAR, "[01]新北市", "坪林區", "國小", "999001", "市立坪林國小", "漁光分班", "公立", "特偏", "3", "3", "1", "25", "2", "1"],
+        [YEAR, "[01]新北市", "坪林區", "國小", "999001", "市立坪林國小", "漁光分班", "公立", "特偏", "3", "4", "1", "25%", "2", "1"],
+        [YEAR, "[02]宜蘭縣", "大同鄉", "國小", "999002", "縣立四季國小", "", "公立", "特偏", "6", "1,006", "12", "", "0", "1"],
+        [YEAR, "[02]宜蘭縣", "大同鄉", "國小", "", "缺少代碼", "", "公立", "特偏", "6", "6", "12", "100", "0", "1"],
+    ])
+    spec = table_specs(faraway_path=str(path))["faraway"]
+    select = text(
+        'SELECT "本校代碼", "縣市名稱", "男學生數[人]", "原住民學生比率" FROM wide_faraway3 '
+        'WHERE "學年度" = :year ORDER BY "本校代碼"'
+    )
+    try:
+        stats = await ingest_table(spec, batch_size=2, engine=engine)
+        assert (stats.rows, stats.rejected, stats.inserted, stats.updated) == (3, 1, 2, 0)
+        async with engine.connect() as conn:
+            rows = (await conn.execute(select, {"year": YEAR})).all()
+        assert [tuple(row) for row in rows] == [
+            ("999001", "01新北市", 4, Decimal("25")),
+            ("999002", "02宜蘭縣", 1006, None),
+        ]
+
+        _write_faraway(path, [
+            [YEAR, "[01]新北市", "坪林區", "國小", "999001", "市立坪林國小", "漁光分班", "公立", "特偏", "3", "5", "1", "25", "2", "1"],
+        ])
+        stats = await ingest_table(spec, batch_size=2, engine=engine)
+        assert (stats.inserted, stats.updated) == (0, 1)
+        # 暫存表只存在於匯入交易中，不會留在資料庫
+        async with engine.connect() as conn:
+            leftover = await conn.execute(text("SELECT to_regclass(:name)"), {"name": spec.staging_table})
+            assert leftover.scalar_one() is None
+        async with engine.connect() as conn:
+            rows = (await conn.execute(select, {"year": YEAR})).all()
+        assert [row[2] for row in rows] == [5, 1006]
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text('DELETE FROM wide_faraway3 WHERE "學年度" = :year'), {"year": YEAR})
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from main import app
+from app.core.config import settings
+
+
+@pytest.mark.asyncio
+async def test_metrics_use_route_templates():
+    """測試指標以路由樣板而非實際路徑作為標籤"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.get(f"/api/v1/needs/{uuid.uuid4()}")
+        await c.get("/no-such-path")
+        response = await c.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/v1/needs/{need_id}",status="404"}' in body
+    assert 'route="<unmatched>"' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/needs/{need_id}",le="+Inf"}' in body
+    assert "http_requests_in_progress" in body
+
+
+@pytest.mark.asyncio
+async def test_metrics_merge_worker_snapshots(monkeypatch, tmp_path):
+    """測試多 worker 模式會合併其他 worker 寫出的快照"""
+    monkeypatch.setattr(settings, "metrics_multiproc_dir", str(tmp_path))
+    other_worker = {
+        "http_requests_total": {
+            "type": "counter",
+            "help": "Total HTTP requests.",
+            "labelnames": ["method", "route", "status"],
+            "samples": [[["GET", "/other-worker", "200"], 7]],
+        }
+    }
+    # 以父行程的 pid 模擬另一個仍在執行的 worker
+    with open(os.path.join(tmp_path, f"metrics_{os.getppid()}.json"), "w") as f:
+        json.dump(other_worker, f)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        response = await c.get("/metrics")
+
+    assert 'http_requests_total{method="GET",route="/other-worker",status="200"} 7' in response.text
+    assert os.path.exists(os.path.join(tmp_path, f"metrics_{os.getpid()}.json"))
+
+
+@pytest.mark.asyncio
+async def test_snapshots_are_written_in_the_background(monkeypatch, tmp_path):
+    """測試請求路徑不寫檔，快照由背景工作定期寫出，停止時再寫出最後一次"""
+    from app.core.metrics import registry
+    monkeypatch.setattr(settings, "metrics_multiproc_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "metrics_flush_seconds", 0)
+    path = os.path.join(tmp_path, f"metrics_{os.getpid()}.json")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.get("/")
+    assert not os.path.exists(path)
+
+    monkeypatch.setattr(settings, "metrics_flush_seconds", 0.01)
+    await registry.start()
+    try:
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            await asyncio.sleep(0.01)
+        assert os.path.exists(path)
+    finally:
+        await registry.stop()
+    with open(path) as f:
+        assert "http_requests_total" in json.load(f)
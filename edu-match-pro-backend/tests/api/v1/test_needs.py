@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from main import app
+from conftest import register_and_login
+from app.core.dataloader import DataLoader
+
+
+@pytest.mark.asyncio
+async def test_list_needs_keyset_pagination():
+    """測試依類別篩選並以游標翻頁"""
+    category = f"測試類別-{uuid.uuid4().hex[:6]}"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        created_ids = []
+        for i in range(3):
+            response = await c.post("/api/v1/needs/", json={
+                "title": f"需求 {i}",
+                "description": "測試需求",
+                "category": category,
+                "location": "花蓮縣秀林鄉",
+                "student_count": 10,
+                "urgency": "low",
+                "sdgs": [4]
+            }, headers=school_headers)
+            created_ids.append(response.json()["id"])
+        
+        # 前端跨來源呼叫，游標標頭必須列在 Access-Control-Expose-Headers 才讀得到
+        first_page = await c.get(
+            "/api/v1/needs/", params={"category": category, "limit": 2}, headers={"Origin": "http://localhost:3000"}
+        )
+        cursor = first_page.headers.get("X-Next-Cursor")
+        second_page = await c.get("/api/v1/needs/", params={"category": category, "limit": 2, "cursor": cursor})
+    
+    assert first_page.status_code == 200
+    assert cursor is not None
+    assert "x-next-cursor" in first_page.headers["Access-Control-Expose-Headers"].lower()
+    assert second_page.status_code == 200
+    assert "X-Next-Cursor" not in second_page.headers
+    ids = [need["id"] for need in first_page.json() + second_page.json()]
+    assert ids == list(reversed(created_ids))
+
+
+@pytest.mark.asyncio
+async def test_list_needs_filters():
+    """測試地點前綴與 SDG 篩選"""
+    category = f"測試類別-{uuid.uuid4().hex[:6]}"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        for location, sdgs in [("臺東縣長濱鄉", [4, 10]), ("南投縣信義鄉", [3])]:
+            await c.post("/api/v1/needs/", json={
+                "title": location,
+                "description": "測試需求",
+                "category": category,
+                "location": location,
+                "student_count": 10,
+                "urgency": "low",
+                "sdgs": sdgs
+            }, headers=school_headers)
+        
+        by_location = await c.get("/api/v1/needs/", params={"category": category, "location": "臺東縣"})
+        by_sdg = await c.get("/api/v1/needs/", params=[("category", category), ("sdg", 3), ("sdg", 17)])
+    
+    assert [need["location"] for need in by_location.json()] == ["臺東縣長濱鄉"]
+    assert [need["location"] for need in by_sdg.json()] == ["南投縣信義鄉"]
+
+
+@pytest.mark.asyncio
+async def test_list_needs_invalid_cursor():
+    """測試格式錯誤的游標回傳 400"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        response = await c.get("/api/v1/needs/", params={"cursor": "not-a-cursor"})
+    
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_needs_sparse_fields():
+    """測試 fields= 只回傳要求的欄位（含描述摘要），並可照常以游標翻頁"""
+    category = f"測試類別-{uuid.uuid4().hex[:6]}"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        created_ids = []
+        for i in range(3):
+            response = await c.post("/api/v1/needs/", json={
+                "title": f"需求 {i}",
+                "description": "長篇描述" * 100,
+                "category": category,
+                "location": "花蓮縣秀林鄉",
+                "student_count": 10,
+                "urgency": "low",
+                "sdgs": [4]
+            }, headers=school_headers)
+            created_ids.append(response.json()["id"])
+
+        params = {"category": category, "limit": 2, "fields": "title,description_snippet,urgency"}
+        first_page = await c.get("/api/v1/needs/", params=params)
+        second_page = await c.get("/api/v1/needs/", params=params | {"cursor": first_page.headers["X-Next-Cursor"]})
+        mine = await c.get("/api/v1/needs/my", params={"fields": "status"}, headers=school_headers)
+        invalid = await c.get("/api/v1/needs/", params={"fields": "title,password"})
+
+    needs = first_page.json() + second_page.json()
+    assert [need["id"] for need in needs] == list(reversed(created_ids))
+    assert set(needs[0]) == {"id", "title", "description_snippet", "urgency"}
+    assert needs[0]["description_snippet"] == ("長篇描述" * 30)
+    assert needs[0]["urgency"] == "low"
+    assert mine.json()[0] == {"id": created_ids[-1], "status": "active"}
+    assert invalid.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_dataloader_close_cancels_the_running_batch():
+    """測試請求結束時關閉載入器會取消仍在執行的批次，等待中的載入一併取消"""
+    started, finished = asyncio.Event(), []
+
+    async def _slow_batch(keys):
+        started.set()
+        await asyncio.sleep(10)
+        finished.append(keys)
+        return {}
+
+    loader = DataLoader(_slow_batch)
+    pending = loader.load("a")
+    await started.wait()
+    await loader.close()
+
+    assert pending.cancelled()
+    assert finished == []
+    assert loader._tasks == set()
+    # 關閉後登記的載入不會再查詢
+    again = loader.load("a")
+    assert again is not pending
+    await asyncio.sleep(0)
+    assert again.cancelled()
+    assert started.is_set() and loader.batches == 1
@@ -0,0 +1,139 @@
+import logging
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from main import app
+from conftest import register_and_login
+from app.core.config import settings
+from app.core.query_stats import QueryBudgetExceeded, collect_queries, query_budget
+from app.core.slow_query_log import _can_analyze, fingerprint, load_captures, slow_query_log, summarize
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(5)
+async def test_server_timing_header():
+    """測試回應帶有 SQL 統計的 Server-Timing 標頭"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        response = await c.get("/api/v1/needs/?limit=5")
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert "queries" in response.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_statement_is_flagged(test_session_maker, caplog):
+    """測試同一區塊內重複的語句會被標示為可能的 N+1"""
+    caplog.set_level(logging.WARNING, logger="app.core.query_stats")
+    async with test_session_maker() as session:
+        with collect_queries(label="n+1 test") as stats:
+            for value in range(6):
+                await session.execute(text("SELECT CAST(:value AS integer)"), {"value": value})
+    assert stats.count == 6
+    assert len(stats.repeated) == 1
+    assert "Possible N+1 query in n+1 test" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_query_budget_exceeded(test_session_maker):
+    """測試超過查詢預算時拋出例外"""
+    async with test_session_maker() as session:
+        with pytest.raises(QueryBudgetExceeded):
+            with query_budget(1):
+                await session.execute(text("SELECT 1"))
+                await session.execute(text("SELECT 2"))
+
+
+@pytest.mark.asyncio
+async def test_slow_query_is_logged_with_plan(test_session_maker, monkeypatch, tmp_path):
+    """測試超過門檻的查詢會連同參數型別（不含參數值）與 EXPLAIN ANALYZE 計畫寫入 JSONL，並可依指紋彙總"""
+    log_path = tmp_path / "slow_queries.jsonl"
+    monkeypatch.setattr(settings, "slow_query_threshold_ms", 50.0)
+    monkeypatch.setattr(settings, "slow_query_log_path", str(log_path))
+    async with test_session_maker() as session:
+        with collect_queries(label="GET /slow"):
+            for value in (1, 2):
+                await session.execute(
+                    text("SELECT count(*) FROM generate_series(1, 1000000) AS s WHERE s > CAST(:value AS integer)"),
+                    {"value": value}
+                )
+            await session.execute(text("SELECT 1"))
+    await slow_query_log.flush()
+
+    captures = load_captures(str(log_path))
+    assert [capture["parameter_types"] for capture in captures] == [["int"], ["int"]]
+    assert "parameters" not in captures[0]
+    assert captures[0]["request"] == "GET /slow"
+    assert captures[0]["analyzed"] is True
+    assert "Execution Time" in captures[0]["plan"][0]
+    # 同一形狀在節流期間不會再次執行 EXPLAIN
+    assert captures[1]["plan"] is None
+
+    summary = summarize(captures)
+    assert len(summary) == 1
+    assert summary[0]["count"] == 2
+    assert summary[0]["plan"] == captures[0]["plan"]
+
+
+@pytest.mark.asyncio
+async def test_slow_query_explain_is_bounded_and_skips_functions(test_session_maker, monkeypatch):
+    """測試 EXPLAIN ANALYZE 受 statement_timeout 限制、不使用觸發查詢的連線池，呼叫白名單以外函式的語句只取估計計畫"""
+    monkeypatch.setattr(settings, "slow_query_threshold_ms", 50.0)
+    monkeypatch.setattr(settings, "slow_query_log_path", None)
+    monkeypatch.setattr(settings, "slow_query_explain_interval_seconds", 0)
+    monkeypatch.setattr(settings, "slow_query_explain_timeout_ms", 10)
+    async with test_session_maker() as session:
+        await session.execute(text("SELECT count(*) FROM generate_series(1, 1000000) AS s WHERE s > 7"))
+        await session.execute(text("SELECT pg_sleep(0.06), 8"))
+    await slow_query_log.flush()
+
+    timed_out, sleeping = list(slow_query_log.recent)[-2:]
+    assert timed_out.plan is None
+    assert "statement timeout" in timed_out.explain_error
+    assert sleeping.analyzed is False
+    assert "Execution Time" not in sleeping.plan[0]
+    engine = test_session_maker.kw["bind"]
+    assert slow_query_log._explain_engine(engine.sync_engine) is not engine
+
+
+def test_analyze_is_limited_to_side_effect_free_functions():
+    """測試只有不呼叫白名單以外函式的唯讀查詢會重新執行"""
+    assert _can_analyze("SELECT count(*), coalesce(sum(x), 0) FROM t WHERE id IN ($1, $2) AND EXISTS (SELECT 1)")
+    assert _can_analyze("WITH recent AS (SELECT * FROM need) SELECT * FROM recent WHERE title = 'nextval('")
+    assert not _can_analyze("SELECT pg_advisory_xact_lock(hashtext('activity_log_partitions'))")
+    assert not _can_analyze("SELECT nextval('need_id_seq')")
+    assert not _can_analyze("SELECT * FROM need WHERE id = $1 FOR UPDATE")
+    assert not _can_analyze("UPDATE need SET status = $1")
+
+
+@pytest.mark.asyncio
+async def test_slow_query_endpoint_requires_admin_and_hides_parameters(test_session_maker, monkeypatch):
+    """測試慢查詢端點只允許管理者存取，彙總只含參數型別"""
+    monkeypatch.setattr(settings, "slow_query_threshold_ms", 50.0)
+    monkeypatch.setattr(settings, "slow_query_log_path", None)
+    async with test_session_maker() as session:
+        await session.execute(text("SELECT pg_sleep(0.06), CAST(:email AS text)"), {"email": "secret@example.com"})
+    await slow_query_log.flush()
+
+    email = f"admin_{uuid.uuid4().hex[:8]}@example.com"
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        headers = await register_and_login(c, "company", email)
+        anonymous = await c.get("/health/slow-queries")
+        forbidden = await c.get("/health/slow-queries", headers=headers)
+        monkeypatch.setattr(settings, "admin_emails", [email])
+        allowed = await c.get("/health/slow-queries", params={"limit": 100}, headers=headers)
+
+    assert anonymous.status_code == 401
+    assert forbidden.status_code == 403
+    assert allowed.status_code == 200
+    assert "secret@example.com" not in allowed.text
+    assert any(query["parameter_types"] == ["str"] for query in allowed.json()["queries"])
+
+
+def test_fingerprint_normalizes_literals_and_in_lists():
+    """測試指紋忽略常值、參數與 IN 清單長度"""
+    assert fingerprint("SELECT * FROM need WHERE id IN ($1, $2)  AND status = 'active'") == \
+        fingerprint("select * from need where id in ($1, $2, $3) and status = 'completed'")
+    assert fingerprint("SELECT * FROM need LIMIT 10") != fingerprint("SELECT * FROM donation LIMIT 10")
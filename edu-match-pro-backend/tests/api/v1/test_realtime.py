@@ -0,0 +1,93 @@
+import asyncio
+import json
+import pytest
+import orjson
+from fastapi.testclient import TestClient
+from main import app
+from conftest import register_and_login_sync
+from app.core.config import settings
+from app.services.realtime import PostgresBroadcast, RealtimeHub
+
+NEED = {
+    "title": "科學實驗器材",
+    "description": "需要顯微鏡",
+    "category": "教學設備",
+    "location": "南投縣信義鄉",
+    "student_count": 40,
+    "urgency": "high",
+    "sdgs": [4, 9]
+}
+
+
+def test_websocket_receives_own_and_public_activity():
+    """測試 WebSocket 訂閱者會收到自己的活動，未登入者只收到公開活動"""
+    c = TestClient(app)
+    school_token = register_and_login_sync(c, "school")
+    with c.websocket_connect(f"/api/v1/realtime/ws?token={school_token}") as private, \
+            c.websocket_connect("/api/v1/realtime/ws") as anonymous:
+        response = c.post("/api/v1/needs/", json=NEED, headers={"Authorization": f"Bearer {school_token}"})
+        assert response.status_code == 201
+
+        # 使用者主題與公開主題各送一次
+        own = [json.loads(private.receive_text()) for _ in range(2)]
+        public = json.loads(anonymous.receive_text())
+    assert [event["type"] for event in own] == ["activity", "activity"]
+    assert own[0]["data"]["activity_type"] == "need_created"
+    assert own[0]["data"]["extra_data"] == {"need_id": response.json()["id"]}
+    assert public == own[0]
+
+
+def test_websocket_rejects_invalid_token():
+    """測試無效的 token 會被拒絕"""
+    c = TestClient(app)
+    with pytest.raises(Exception):
+        with c.websocket_connect("/api/v1/realtime/ws?token=invalid") as ws:
+            ws.receive_text()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_drops_oldest_and_is_told_how_many(monkeypatch):
+    """測試慢速訂閱者的佇列滿時丟棄最舊的訊息，並先收到落後通知"""
+    monkeypatch.setattr(settings, "realtime_queue_size", 2)
+    hub = RealtimeHub()
+    slow = hub.subscribe(["public"])
+    other = hub.subscribe(["user:someone-else"])
+    for n in range(5):
+        hub.publish(["public"], "activity", {"n": n})
+
+    assert orjson.loads(await slow.get()) == {"type": "lagged", "dropped": 3}
+    assert [orjson.loads(await slow.get())["data"]["n"] for _ in range(2)] == [3, 4]
+    assert hub.stats()["delivered"] == 5
+
+    hub.unsubscribe(slow)
+    assert await slow.get() is None
+    assert hub.stats()["connections"] == 1
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(other.get(), 0.05)
+
+
+@pytest.mark.asyncio
+async def test_postgres_broadcast_reconnects_and_bounds_its_outbox(test_session_maker):
+    """測試 LISTEN 連線被中斷後會重新連線並繼續廣播，待送事件超過上限時丟棄最舊的"""
+    received = []
+    dsn = test_session_maker.kw["bind"].url.render_as_string(hide_password=False).replace("+asyncpg", "")
+    broadcast = PostgresBroadcast(lambda topic, message: received.append(message), dsn, "test_realtime", outbox_size=2)
+    await broadcast.start()
+    try:
+        await broadcast._connection.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+    except Exception:
+        pass
+    try:
+        # 重新連線前發布的事件只保留最新的兩筆
+        for n in range(4):
+            broadcast.publish("public", f"{n}".encode())
+        assert broadcast.stats()["broadcast_dropped"] == 2
+
+        for _ in range(100):
+            if len(received) == 2:
+                break
+            await asyncio.sleep(0.05)
+        assert received == [b"2", b"3"]
+        assert broadcast.stats()["broadcast_reconnects"] == 1
+    finally:
+        await broadcast.stop()
@@ -0,0 +1,46 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from main import app
+from conftest import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_recommendations_include_new_need():
+    """測試新建立的需求會出現在企業推薦中"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        company_headers = await register_and_login(c, "company")
+        # 先載入推薦引擎，之後的需求須透過增量更新加入
+        await c.get("/api/v1/recommendations/", headers=company_headers)
+        
+        school_headers = await register_and_login(c, "school")
+        need_data = {
+            "title": "偏鄉閱讀推廣",
+            "description": "需要課外讀物",
+            "category": "圖書資源",
+            "location": "花蓮縣秀林鄉",
+            "student_count": 50,
+            "urgency": "high",
+            "sdgs": [4, 10]
+        }
+        need_response = await c.post("/api/v1/needs/", json=need_data, headers=school_headers)
+        need_id = need_response.json()["id"]
+        
+        response = await c.get("/api/v1/recommendations/?limit=100", headers=company_headers)
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert need_id in [item["id"] for item in data]
+    scores = [item["match_score"] for item in data]
+    assert scores == sorted(scores, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_recommendations_forbidden_for_school():
+    """測試學校使用者無法取得推薦"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        response = await c.get("/api/v1/recommendations/", headers=school_headers)
+    
+    assert response.status_code == 403
@@ -0,0 +1,84 @@
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from main import app
+from conftest import register_and_login
+from app.core.config import settings
+from app.models.need import Need, UrgencyLevel
+from app.services.search_index import highlight, search_index
+
+
+@pytest.mark.asyncio
+async def test_search_follows_need_writes():
+    """測試搜尋結果會隨需求建立與更新即時反映，並標示命中文字"""
+    # 加入唯一代碼，避免與資料庫中既有的需求混淆
+    code = uuid.uuid4().hex[:8]
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        response = await c.post("/api/v1/needs/", json={
+            "title": f"鯨豚生態觀察課程 {code}",
+            "description": "希望帶學生到海邊認識鯨豚與海洋生態",
+            "category": "師資/技能",
+            "location": "花蓮縣豐濱鄉",
+            "student_count": 20,
+            "urgency": "medium",
+            "sdgs": [4, 14]
+        }, headers=school_headers)
+        need_id = response.json()["id"]
+        
+        first = await c.get("/api/v1/search/", params={"q": f"鯨豚 {code}", "type": "need"})
+        await c.put(f"/api/v1/needs/{need_id}", json={"title": f"珊瑚礁生態觀察課程 {code}"}, headers=school_headers)
+        renamed = await c.get("/api/v1/search/", params={"q": f"珊瑚礁 {code}"})
+    
+    assert first.status_code == 200
+    hit = first.json()[0]
+    assert hit["id"] == need_id
+    assert "<mark>鯨豚</mark>" in hit["title"]
+    assert "<mark>鯨豚</mark>" in hit["snippet"]
+    assert renamed.json()[0]["id"] == need_id
+
+
+def test_highlight_offsets_follow_length_changing_normalization():
+    """測試正規化改變長度時（İ 轉小寫變成兩個字元），標示位置仍對齊原文"""
+    assert highlight("İİ鯨豚課程", "鯨豚") == "İİ<mark>鯨豚</mark>課程"
+    assert highlight("ＡＢＣ台東", "abc 臺東") == "<mark>ＡＢＣ台東</mark>"
+
+
+@pytest.mark.asyncio
+async def test_sync_picks_up_late_commits_and_removes_deleted_needs(monkeypatch, test_session_maker):
+    """測試其他 worker 較晚提交的較早時間戳會被補上，刪除的需求在比對 id 後自索引移除"""
+    code = uuid.uuid4().hex[:8]
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        school = (await c.get("/api/v1/auth/users/me", headers=school_headers)).json()
+        monkeypatch.setattr(settings, "search_sync_seconds", 0)
+        # 同步進度推進到剛建立的需求
+        await c.post("/api/v1/needs/", json={
+            "title": f"浮潛課程 {code}", "description": "認識珊瑚礁", "category": "師資/技能",
+            "location": "臺東縣", "student_count": 10, "urgency": "low", "sdgs": [14]
+        }, headers=school_headers)
+        await c.get("/api/v1/search/", params={"q": code})
+
+        # 模擬其他 worker：時間戳早於目前的同步進度，且不經過本 worker 的增量更新
+        async with test_session_maker() as session:
+            late = Need(
+                school_id=uuid.UUID(school["id"]), title=f"獨木舟體驗 {code}", description="划獨木舟認識海岸",
+                category="師資/技能", location="臺東縣", student_count=10, urgency=UrgencyLevel.low, sdgs=[4],
+                created_at=datetime.utcnow() - timedelta(seconds=60)
+            )
+            session.add(late)
+            await session.commit()
+        found = (await c.get("/api/v1/search/", params={"q": f"獨木舟 {code}"})).json()
+
+        async with test_session_maker() as session:
+            await session.execute(delete(Need).where(Need.id == late.id))
+            await session.commit()
+        monkeypatch.setattr(settings, "search_reconcile_seconds", 0)
+        await c.get("/api/v1/search/", params={"q": code})
+
+    assert found[0]["id"] == str(late.id)
+    assert ("need", late.id) not in [key for key, _ in search_index.search(f"獨木舟 {code}")]
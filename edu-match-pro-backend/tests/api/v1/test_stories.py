@@ -0,0 +1,62 @@
+import pytest
+import uuid
+from httpx import AsyncClient, ASGITransport
+from main import app
+from conftest import register_and_login
+from app.models.impact_story import ImpactStory
+from app.schemas.story_schemas import ImpactMetrics
+
+NEED = {
+    "title": "偏鄉學童平板電腦",
+    "description": "需要平板進行數位學習",
+    "category": "資訊設備",
+    "location": "臺東縣海端鄉",
+    "student_count": 20,
+    "urgency": "medium",
+    "sdgs": [4]
+}
+
+
+@pytest.mark.asyncio
+async def test_impact_metric_total_across_company_stories(test_session_maker):
+    """測試加總企業故事中的單一指標：缺少該指標或不是數值的故事不列入"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        school_headers = await register_and_login(c, "school")
+        company_headers = await register_and_login(c, "company")
+        donation_ids = []
+        for _ in range(2):
+            need = (await c.post("/api/v1/needs/", json=NEED, headers=school_headers)).json()
+            donation = (await c.post("/api/v1/donations/", json={
+                "need_id": need["id"], "donation_type": "物資"
+            }, headers=company_headers)).json()
+            donation_ids.append(donation["id"])
+        company_id = donation["company_id"]
+
+        async with test_session_maker() as session:
+            for donation_id, metrics in zip(donation_ids * 2, [
+                {"students_reached": 20, "items_delivered": 20},
+                {"students_reached": 15},
+                {"items_delivered": 3},
+                {"students_reached": None},
+            ]):
+                session.add(ImpactStory(
+                    donation_id=uuid.UUID(donation_id), title="成果分享", content="學生們很開心",
+                    impact_metrics=metrics
+                ))
+            await session.commit()
+
+        response = await c.get(f"/api/v1/stories/company/{company_id}/metrics/students_reached")
+        stories = (await c.get("/api/v1/stories/", params={"limit": 4})).json()
+        single = (await c.get(f"/api/v1/stories/{stories[0]['id']}")).json()
+
+    assert response.json() == {"company_id": company_id, "metric": "students_reached", "total": 35.0, "stories": 2}
+    assert sorted(story["donation"]["id"] for story in stories) == sorted(donation_ids * 2)
+    assert all(story["donation"]["need"]["title"] == NEED["title"] for story in stories)
+    # 快速投影與 Schema 序列化的輸出一致：值為 null 的指標鍵不輸出
+    assert stories[0]["impact_metrics"] == {}
+    assert single == stories[0]
+    assert all(
+        story["impact_metrics"] == ImpactMetrics.model_validate(metrics).model_dump(mode="json")
+        for story, metrics in zip(stories, [{"students_reached": None}, {"items_delivered": 3}])
+    )
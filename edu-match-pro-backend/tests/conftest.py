@@ -1,16 +1,22 @@
 import pytest
 import pytest_asyncio
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import NullPool
+import uuid
+from typing import AsyncGenerator, Optional
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import text
 import psycopg2
+from fastapi.testclient import TestClient
 from httpx import AsyncClient, ASGITransport
 import subprocess
 import os
 
 from app.core.config import settings
-from app.db import get_session
+from app.db import create_engine, get_session
+from app.services.recommendation_engine import recommendation_engine
+from app.services.search_index import search_index
+from app.services.realtime import realtime_hub
+from app.services.recent_activity import recent_activity_feed
+from app.core.cache import principal_cache
 from main import app
 
 
@@ -41,7 +47,7 @@ def test_db_setup():
 
 @pytest.fixture(scope="session")
 def test_session_maker(test_db_setup):
-    engine = create_async_engine(settings.test_database_url, echo=False, poolclass=NullPool)
+    engine = create_engine("test")
     SessionLocal = async_sessionmaker(
         autocommit=False,
         autoflush=False,
@@ -65,6 +71,35 @@ def override_app_session(test_session_maker):
     app.dependency_overrides.clear()
 
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(max_queries): 測試期間的 SQL 數量超過上限時判定失敗"
+    )
+
+
+@pytest.fixture(autouse=True)
+def _enforce_query_budget(request):
+    """標記 query_budget 的測試會統計整個測試期間的 SQL 數量"""
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is None:
+        yield
+        return
+    from app.core.query_stats import query_budget
+    with query_budget(marker.args[0], label=request.node.name):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _reset_in_memory_state():
+    """每個測試開始前以各單例的 clear() 重設行程內的狀態，避免在測試之間洩漏"""
+    recommendation_engine.clear()
+    search_index.clear()
+    recent_activity_feed.clear()
+    principal_cache.clear()
+    realtime_hub.clear()
+    yield
+
+
 # 注意：避免在每個測試前後做 TRUNCATE 以免與 async session 交易衝突
 
 
@@ -73,4 +108,28 @@ async def async_client():
     """建立測試 HTTP 客戶端"""
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as client:
-        yield client
\ No newline at end of file
+        yield client
+
+
+def _credentials(role: str, email: Optional[str]) -> tuple:
+    email = email or f"test_{uuid.uuid4().hex[:8]}@example.com"
+    return (
+        {"email": email, "password": "password123", "role": role},
+        {"username": email, "password": "password123"},
+    )
+
+
+async def register_and_login(c: AsyncClient, role: str, email: Optional[str] = None) -> dict:
+    """註冊並登入指定角色的使用者，回傳授權 headers"""
+    register, login = _credentials(role, email)
+    await c.post("/api/v1/auth/register", json=register)
+    response = await c.post("/api/v1/auth/login", data=login)
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def register_and_login_sync(c: TestClient, role: str) -> str:
+    """同 register_and_login，供同步的 TestClient（WebSocket 測試）使用，回傳 access token"""
+    register, login = _credentials(role, None)
+    c.post("/api/v1/auth/register", json=register)
+    response = c.post("/api/v1/auth/login", data=login)
+    return response.json()["access_token"]